@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_site(apps, schema_editor):
+    """Existing guides, staff and schedules move to the default site."""
+    Site = apps.get_model('core', 'Site')
+    code = getattr(settings, 'DEFAULT_SITE_CODE', 'main')
+    Site.objects.get_or_create(code=code, defaults={'name': code.replace('-', ' ').title()})
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Site',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(help_text='Short name used in URLs (?site=) and commands', max_length=30, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(create_default_site, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,38 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class SiteManager(models.Manager):
+    def get_default(self):
+        """The site used when none is given (settings.DEFAULT_SITE_CODE), created on first use."""
+        code = getattr(settings, 'DEFAULT_SITE_CODE', 'main')
+        site, _ = self.get_or_create(code=code, defaults={'name': code.replace('-', ' ').title()})
+        return site
+
+
+class Site(models.Model):
+    """
+    An outlet (attraction and its restaurant) with its own staff, tour
+    slots and schedules.
+
+    Guides, restaurant staff, time slots, availability and daily schedules
+    each belong to one site; indexes on those tables lead with the site,
+    so a site's queries only touch its own rows.
+    """
+    code = models.SlugField(max_length=30, unique=True, help_text="Short name used in URLs (?site=) and commands")
+    name = models.CharField(max_length=100)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = SiteManager()
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+def default_site_id():
+    """Field default for the site foreign keys."""
+    return Site.objects.get_default().pk
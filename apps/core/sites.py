@@ -0,0 +1,41 @@
+"""
+Which site a request works on.
+"""
+from django.http import Http404
+
+from apps.core.models import Site
+
+SESSION_KEY = 'site_code'
+
+
+def site_for_request(request):
+    """
+    The site a page or API call works on: ?site=<code> (remembered in the
+    session, so the pages' API calls follow it), else the site chosen last,
+    else the default site.
+    """
+    code = request.GET.get('site')
+    if code:
+        site = Site.objects.filter(code=code, is_active=True).first()
+        if site is None:
+            raise Http404(f"Unknown site '{code}'")
+        if request.session.get(SESSION_KEY) != site.code:
+            request.session[SESSION_KEY] = site.code
+        return site
+
+    code = request.session.get(SESSION_KEY)
+    if code:
+        site = Site.objects.filter(code=code, is_active=True).first()
+        if site is not None:
+            return site
+    return Site.objects.get_default()
+
+
+def site_for_code(code=None):
+    """
+    The active site with this code, or the default site when no code is
+    given (management commands' --site). Raises Site.DoesNotExist.
+    """
+    if not code:
+        return Site.objects.get_default()
+    return Site.objects.get(code=code, is_active=True)
@@ -0,0 +1,16 @@
+"""
+SQLite backend that takes the write lock when a transaction starts.
+
+With the stock BEGIN (DEFERRED), two transactions that both read and then
+write can't upgrade their locks, and SQLite fails one of them straight
+away with "database is locked" without waiting on the busy timeout.
+BEGIN IMMEDIATE queues writers on the busy timeout instead. Reads outside
+atomic() blocks are unaffected.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.html import format_html
 from apps.guides.models import Guide, GuideAvailability
 from apps.scheduling.models import RestaurantStaff as BaseRestaurantStaff
 
@@ -9,7 +11,7 @@ class GuideInline(admin.StackedInline):
     model = Guide
     can_delete = True
     verbose_name_plural = 'Guide Profile (Optional - only fill if this user is a tour guide)'
-    fields = ['guide_type', 'phone', 'is_active']
+    fields = ['site', 'guide_type', 'phone', 'is_active']
     extra = 0
     max_num = 1
 
@@ -24,7 +26,7 @@ class RestaurantStaffInline(admin.StackedInline):
     model = BaseRestaurantStaff
     can_delete = True
     verbose_name_plural = 'Restaurant Staff Profile (Optional - only fill if this user is kitchen/serving staff)'
-    fields = ['staff_type', 'is_active', 'hire_date']
+    fields = ['site', 'staff_type', 'is_active', 'hire_date']
     extra = 0
     max_num = 1
 
@@ -66,16 +68,19 @@ admin.site.register(User, CustomUserAdmin)
 
 @admin.register(Guide)
 class GuideAdmin(admin.ModelAdmin):
-    list_display = ['get_full_name', 'guide_type', 'phone', 'is_active', 'created_at']
-    list_filter = ['guide_type', 'is_active']
+    list_display = ['get_full_name', 'site', 'guide_type', 'phone', 'is_active', 'created_at']
+    list_filter = ['site', 'guide_type', 'is_active']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'phone']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['calendar_feed_link', 'created_at', 'updated_at']
     fieldsets = [
         ('User Information', {
             'fields': ['user']
         }),
         ('Guide Details', {
-            'fields': ['guide_type', 'phone', 'is_active']
+            'fields': ['site', 'guide_type', 'phone', 'is_active']
+        }),
+        ('Calendar', {
+            'fields': ['calendar_feed_link']
         }),
         ('Timestamps', {
             'fields': ['created_at', 'updated_at'],
@@ -88,11 +93,22 @@ class GuideAdmin(admin.ModelAdmin):
     get_full_name.short_description = 'Name'
     get_full_name.admin_order_field = 'user__first_name'
 
+    def calendar_feed_link(self, obj):
+        """Private .ics subscription link to send to the guide."""
+        from apps.scheduling.models import CalendarFeed
+
+        feed = CalendarFeed.objects.filter(guide_id=obj.pk).only('token').first() if obj.pk else None
+        if feed is None:
+            return '-'
+        url = reverse('calendar_feed', args=[feed.token])
+        return format_html('<a href="{}">{}</a>', url, url)
+    calendar_feed_link.short_description = 'Calendar feed'
+
 
 @admin.register(GuideAvailability)
 class GuideAvailabilityAdmin(admin.ModelAdmin):
     list_display = ['guide', 'date', 'is_available', 'notes', 'created_at']
-    list_filter = ['is_available', 'date']
+    list_filter = ['site', 'is_available', 'date']
     search_fields = ['guide__user__username', 'guide__user__first_name', 'guide__user__last_name']
     date_hierarchy = 'date'
     readonly_fields = ['created_at', 'updated_at']
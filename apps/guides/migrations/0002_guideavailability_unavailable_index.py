@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guideavailability',
+            index=models.Index(condition=models.Q(('is_available', False)), fields=['date', 'guide'], name='guideavail_unavailable_idx'),
+        ),
+    ]
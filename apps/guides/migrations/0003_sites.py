@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:29
+
+import apps.core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('guides', '0002_guideavailability_unavailable_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='guideavailability',
+            name='guideavail_unavailable_idx',
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.PROTECT, related_name='guides', to='core.site'),
+        ),
+        migrations.AddField(
+            model_name='guideavailability',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.site'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='guide',
+            index=models.Index(fields=['site', 'is_active'], name='guide_site_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guideavailability',
+            index=models.Index(condition=models.Q(('is_available', False)), fields=['site', 'date', 'guide'], name='guideavail_unavailable_idx'),
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
 
+from apps.core.models import Site, default_site_id
+
 
 class Guide(models.Model):
     GUIDE_TYPE_CHOICES = [
@@ -11,6 +13,7 @@ class Guide(models.Model):
         ('PTA', 'Part-time Afternoon'),
     ]
 
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, default=default_site_id, related_name='guides')
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='guide_profile')
     guide_type = models.CharField(max_length=3, choices=GUIDE_TYPE_CHOICES)
     phone = models.CharField(max_length=20, blank=True)
@@ -20,6 +23,10 @@ class Guide(models.Model):
 
     class Meta:
         ordering = ['user__first_name', 'user__last_name']
+        indexes = [
+            # A site's active roster (auto-scheduler, eligibility, grids)
+            models.Index(fields=['site', 'is_active'], name='guide_site_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username} ({self.get_guide_type_display()})"
@@ -31,18 +38,40 @@ class Guide(models.Model):
         if self.user_id:
             try:
                 RestaurantStaff.objects.get(user=self.user)
-                raise ValidationError(
-                    f"User '{self.user.get_full_name() or self.user.username}' already has a Restaurant Staff profile. "
-                    "A user cannot be both a Tour Guide and Restaurant Staff. "
-                    "Please remove the Restaurant Staff profile first or choose a different user."
-                )
+                raise ValidationError(self._role_conflict_message())
             except RestaurantStaff.DoesNotExist:
                 pass  # Good, no conflict
 
+    @classmethod
+    def clean_batch(cls, guides):
+        """
+        Batch version of clean() used by the bulk-write helpers.
+        Checks role exclusivity for all guides with a single query.
+        """
+        from apps.scheduling.models import RestaurantStaff
+
+        user_ids = {g.user_id for g in guides if g.user_id}
+        conflicting = set(
+            RestaurantStaff.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        errors = [g._role_conflict_message() for g in guides if g.user_id in conflicting]
+        if errors:
+            raise ValidationError(errors)
+
+    def _role_conflict_message(self):
+        return (
+            f"User '{self.user.get_full_name() or self.user.username}' already has a Restaurant Staff profile. "
+            "A user cannot be both a Tour Guide and Restaurant Staff. "
+            "Please remove the Restaurant Staff profile first or choose a different user."
+        )
+
     def save(self, *args, **kwargs):
-        """Override save to run validation."""
+        """Override save to run validation; availability follows a site change."""
         self.full_clean()
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if not adding:
+            self.availabilities.exclude(site_id=self.site_id).update(site_id=self.site_id)
 
     def can_work_timeslot(self, timeslot):
         """Check if guide type is compatible with time slot."""
@@ -63,6 +92,8 @@ class Guide(models.Model):
 
 class GuideAvailability(models.Model):
     guide = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name='availabilities')
+    # Copy of guide.site, so per-site date lookups stay on the site's rows
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, editable=False, related_name='+')
     date = models.DateField()
     is_available = models.BooleanField(default=True)
     notes = models.TextField(blank=True)
@@ -72,6 +103,14 @@ class GuideAvailability(models.Model):
     class Meta:
         ordering = ['date']
         unique_together = ['guide', 'date']
+        indexes = [
+            # Who is unavailable at a site on a date (eligibility, auto-scheduler)
+            models.Index(
+                fields=['site', 'date', 'guide'],
+                condition=models.Q(is_available=False),
+                name='guideavail_unavailable_idx'
+            ),
+        ]
         verbose_name_plural = 'Guide availabilities'
 
     def __str__(self):
@@ -89,6 +128,18 @@ class GuideAvailability(models.Model):
             if self.date < date.today():
                 raise ValidationError("Cannot mark availability for past dates.")
 
+    @classmethod
+    def prepare_batch(cls, rows):
+        """Copy guide.site onto rows that lack it (used by the bulk-write helpers)."""
+        missing = {row.guide_id for row in rows if row.site_id is None and row.guide_id}
+        if missing:
+            site_ids = dict(Guide.objects.filter(id__in=missing).values_list('id', 'site_id'))
+            for row in rows:
+                if row.site_id is None:
+                    row.site_id = site_ids.get(row.guide_id)
+
     def save(self, *args, **kwargs):
+        if self.guide_id:
+            self.site_id = self.guide.site_id
         self.full_clean()
         super().save(*args, **kwargs)
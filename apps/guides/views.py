@@ -1,11 +1,13 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
 from datetime import date, timedelta
 from apps.guides.models import Guide, GuideAvailability
 from apps.guides.forms import AvailabilityForm
-from apps.scheduling.models import TourSession, DailySchedule
+from apps.scheduling.bulk import bulk_upsert_validated
+from apps.scheduling.models import TourSession, DailySchedule, CalendarFeed
 
 
 @login_required
@@ -42,11 +44,16 @@ def guide_dashboard(request):
         date__gte=today
     ).order_by('date')[:10]
 
+    # Subscription link for calendar apps (the feed is created with the guide)
+    feed = CalendarFeed.objects.filter(guide=guide).only('token').first()
+    calendar_feed_url = request.build_absolute_uri(reverse('calendar_feed', args=[feed.token])) if feed else None
+
     context = {
         'guide': guide,
         'upcoming_sessions': upcoming_sessions,
         'standby_days': standby_days,
         'recent_availability': recent_availability,
+        'calendar_feed_url': calendar_feed_url,
         'today': today,
     }
 
@@ -70,26 +77,26 @@ def mark_availability(request):
             is_available = form.cleaned_data['is_available'] == 'True'
             notes = form.cleaned_data['notes']
 
-            # Create or update availability for each date in range
-            created_count = 0
-            updated_count = 0
-            current_date = start_date
-
-            while current_date <= end_date:
-                availability, created = GuideAvailability.objects.update_or_create(
+            # Create or update availability for each date in range (one upsert)
+            dates = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+            existing_dates = set(
+                GuideAvailability.objects.filter(
                     guide=guide,
-                    date=current_date,
-                    defaults={
-                        'is_available': is_available,
-                        'notes': notes
-                    }
-                )
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-
-                current_date += timedelta(days=1)
+                    date__in=dates
+                ).values_list('date', flat=True)
+            )
+
+            bulk_upsert_validated(
+                [
+                    GuideAvailability(guide=guide, site_id=guide.site_id, date=d, is_available=is_available, notes=notes)
+                    for d in dates
+                ],
+                unique_fields=['guide', 'date'],
+                update_fields=['is_available', 'notes']
+            )
+
+            updated_count = len(existing_dates)
+            created_count = len(dates) - updated_count
 
             status = "available" if is_available else "unavailable"
             messages.success(
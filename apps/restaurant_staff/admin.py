@@ -6,8 +6,10 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django import forms
 from django.contrib import messages
+from django.urls import reverse
 from datetime import date, timedelta
 from apps.restaurant_staff.models import RestaurantStaff, StaffAvailability
+from apps.scheduling.bulk import bulk_upsert_validated
 
 
 class StaffAvailabilityForm(forms.ModelForm):
@@ -90,6 +92,7 @@ class RestaurantStaffAdmin(admin.ModelAdmin):
 
     list_display = [
         'get_full_name',
+        'site',
         'staff_type_badge',
         'is_active',
         'hire_date',
@@ -97,6 +100,7 @@ class RestaurantStaffAdmin(admin.ModelAdmin):
     ]
 
     list_filter = [
+        'site',
         'staff_type',
         'is_active',
         'hire_date'
@@ -111,16 +115,19 @@ class RestaurantStaffAdmin(admin.ModelAdmin):
 
     date_hierarchy = 'hire_date'
 
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['calendar_feed_link', 'created_at', 'updated_at']
 
     fieldsets = [
         ('Staff Information', {
             'description': 'Add kitchen or serving staff. First create a User account if one doesn\'t exist, then select it here. Note: A user cannot be both a Tour Guide and Restaurant Staff.',
-            'fields': ['user', 'staff_type', 'is_active']
+            'fields': ['user', 'site', 'staff_type', 'is_active']
         }),
         ('Employment Details', {
             'fields': ['hire_date']
         }),
+        ('Calendar', {
+            'fields': ['calendar_feed_link']
+        }),
         ('Timestamps', {
             'fields': ['created_at', 'updated_at'],
             'classes': ['collapse']
@@ -150,10 +157,22 @@ class RestaurantStaffAdmin(admin.ModelAdmin):
     staff_type_badge.short_description = 'Type'
     staff_type_badge.admin_order_field = 'staff_type'
 
+    def calendar_feed_link(self, obj):
+        """Private .ics subscription link to send to the staff member."""
+        from apps.scheduling.models import CalendarFeed
+
+        feed = CalendarFeed.objects.filter(staff_id=obj.pk).only('token').first() if obj.pk else None
+        if feed is None:
+            return '-'
+        url = reverse('calendar_feed', args=[feed.token])
+        return format_html('<a href="{}">{}</a>', url, url)
+
+    calendar_feed_link.short_description = 'Calendar feed'
+
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
         qs = super().get_queryset(request)
-        return qs.select_related('user')
+        return qs.with_people()
 
 
 @admin.register(StaffAvailability)
@@ -171,6 +190,7 @@ class StaffAvailabilityAdmin(admin.ModelAdmin):
     ]
 
     list_filter = [
+        'site',
         'is_available',
         'staff__staff_type',
         'date'
@@ -263,22 +283,23 @@ class StaffAvailabilityAdmin(admin.ModelAdmin):
             if end_date and end_date != start_date:
                 # Creating records for date range
                 days_count = (end_date - start_date).days + 1
-                current_date = start_date
-                first_obj = None
-
-                while current_date <= end_date:
-                    # Create or update existing availability record
-                    availability, created = StaffAvailability.objects.update_or_create(
-                        staff=staff,
-                        date=current_date,
-                        defaults={
-                            'is_available': is_available,
-                            'notes': notes
-                        }
-                    )
-                    if first_obj is None:
-                        first_obj = availability
-                    current_date += timedelta(days=1)
+
+                # Create or update existing availability records in one upsert
+                bulk_upsert_validated(
+                    [
+                        StaffAvailability(
+                            staff=staff,
+                            site_id=staff.site_id,
+                            date=start_date + timedelta(days=n),
+                            is_available=is_available,
+                            notes=notes
+                        )
+                        for n in range(days_count)
+                    ],
+                    unique_fields=['staff', 'date'],
+                    update_fields=['is_available', 'notes']
+                )
+                first_obj = StaffAvailability.objects.filter(staff=staff, date=start_date).first()
 
                 # Store info for response_add method
                 request._staff_availability_range = {
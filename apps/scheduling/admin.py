@@ -1,11 +1,20 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.contrib import messages
+from django.db.models import F, Count
+from django.utils import timezone
 from apps.scheduling.models import (
     TourTimeSlot, TourSession, DailySchedule, ShiftSwapRequest,
-    RestaurantStaff, StaffAvailability, DailyRestaurantSchedule, StaffShift
+    RestaurantStaff, StaffAvailability, DailyRestaurantSchedule, StaffShift, SchedulerRun,
+    SlotTemplate, SlotTemplateEntry, ScheduleChange, DaySnapshot
 )
+from apps.scheduling.calendar_feeds import refresh_feeds_for_tour_date, refresh_feeds_for_restaurant_date
+from apps.scheduling.changelog import ChangeLog, record
+from apps.scheduling.rosters import materialise_tour_date, materialise_restaurant_date
 from apps.scheduling.services import SchedulingService
+from apps.scheduling.slot_templates import migrate_sessions
+from apps.scheduling.swaps import approve_swap, reject_swap
+from apps.scheduling.undo import clear_redo
 
 
 # ============================================================================
@@ -17,7 +26,6 @@ from apps.scheduling.services import SchedulingService
 # Hidden from admin (managed via Schedule Manager or commands):
 # - Daily schedules
 # - Tour time slots
-# - Shift swap requests
 #
 # Managers use this admin to enter tour booking details.
 # Guide assignments are done via Schedule Manager interface.
@@ -42,6 +50,7 @@ class TourSessionAdmin(admin.ModelAdmin):
     ]
 
     list_filter = [
+        'daily_schedule__site',
         'status',
         'daily_schedule__date',
         'visitor_type',
@@ -115,13 +124,26 @@ class TourSessionAdmin(admin.ModelAdmin):
     date.admin_order_field = 'daily_schedule__date'
     date.short_description = 'Date'
 
+    def save_model(self, request, obj, form, change):
+        """Save, logging a guide change to the schedule change log."""
+        old_guide_id = form.initial.get('assigned_guide') if change else None
+        super().save_model(request, obj, form, change)
+        day = obj.daily_schedule
+        record(day.site_id, day.date, ScheduleChange.KIND_GUIDE, obj.id, old_guide_id, obj.assigned_guide_id)
+        clear_redo(DaySnapshot.KIND_TOUR, day)
+        if day.is_published:
+            materialise_tour_date(day)
+            refresh_feeds_for_tour_date(day, {old_guide_id, obj.assigned_guide_id})
+
     @admin.action(description='Clear booking details from selected sessions')
     def clear_booking_details(self, request, queryset):
         """Clear booking information from selected sessions."""
         count = queryset.update(
             visitor_count=None,
             visitor_type=None,
-            booking_channel=None
+            booking_channel=None,
+            version=F('version') + 1,
+            updated_at=timezone.now()
         )
         self.message_user(
             request,
@@ -152,7 +174,131 @@ class TourSessionAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
         qs = super().get_queryset(request)
-        return qs.select_related('daily_schedule', 'time_slot', 'assigned_guide__user')
+        return qs.with_people()
+
+
+# ============================================================================
+# SLOT TEMPLATES
+# ============================================================================
+
+class SlotTemplateEntryInline(admin.TabularInline):
+    model = SlotTemplateEntry
+    extra = 3
+    fields = ['weekday', 'start_time', 'duration_minutes']
+
+
+@admin.register(SlotTemplate)
+class SlotTemplateAdmin(admin.ModelAdmin):
+    """
+    Versioned tour slot templates. Add a new version effective from the
+    change date, then migrate future sessions onto it.
+    """
+
+    list_display = ['name', 'site', 'version', 'effective_from', 'effective_to', 'is_active', 'entry_count']
+    list_filter = ['site', 'is_active']
+    readonly_fields = ['version', 'created_at', 'updated_at']
+    inlines = [SlotTemplateEntryInline]
+    actions = ['copy_as_new_version', 'migrate_future_sessions']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(entry_total=Count('entries'))
+
+    def entry_count(self, obj):
+        return obj.entry_total
+
+    entry_count.short_description = 'Start times'
+
+    @admin.action(description='Copy as a new version (effective tomorrow)')
+    def copy_as_new_version(self, request, queryset):
+        """Duplicate templates with their entries, to edit without touching the original."""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        for template in queryset.prefetch_related('entries'):
+            entries = list(template.entries.all())
+            template.pk = None
+            template.version = None
+            template.effective_from = timezone.localdate() + timedelta(days=1)
+            template.save()
+            SlotTemplateEntry.objects.bulk_create([
+                SlotTemplateEntry(
+                    template=template,
+                    weekday=entry.weekday,
+                    start_time=entry.start_time,
+                    duration_minutes=entry.duration_minutes
+                )
+                for entry in entries
+            ])
+        self.message_user(request, f"Copied {queryset.count()} template(s)", level=messages.SUCCESS)
+
+    @admin.action(description='Migrate future sessions in these templates\' date ranges')
+    def migrate_future_sessions(self, request, queryset):
+        """Move unpublished days from tomorrow on, within the selected ranges, to their templates' slots."""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        templates_by_site = {}
+        for template in queryset.select_related('site'):
+            templates_by_site.setdefault(template.site, []).append(template)
+
+        for site, templates in templates_by_site.items():
+            start = max(timezone.localdate() + timedelta(days=1), min(t.effective_from for t in templates))
+            ends = [t.effective_to for t in templates]
+            end = None if None in ends else max(ends)
+            if end is not None and end < start:
+                self.message_user(
+                    request, f"{site}: the selected templates have no future dates.", level=messages.WARNING
+                )
+                continue
+
+            summary = migrate_sessions(site, start, end)
+            self.message_user(
+                request,
+                f"{site}: migrated {summary['days_migrated']} day(s): {summary['created']} session(s) created, "
+                f"{summary['remapped']} moved, {summary['deleted']} removed. "
+                f"Skipped {len(summary['skipped_published'])} published day(s); "
+                f"kept {len(summary['kept_with_bookings'])} session(s) with bookings.",
+                level=messages.WARNING if summary['kept_with_bookings'] or summary['unassigned_guides'] else messages.SUCCESS
+            )
+
+
+@admin.register(ShiftSwapRequest)
+class ShiftSwapRequestAdmin(admin.ModelAdmin):
+    """
+    Swap requests between guides. Approving re-checks the swap against the
+    live schedule (see apps.scheduling.swaps) and applies it.
+    """
+
+    list_display = ['requesting_guide', 'original_session', 'target_guide', 'target_session', 'status', 'created_at']
+    list_filter = ['status', 'original_session__daily_schedule__site']
+    list_select_related = [
+        'requesting_guide__user', 'target_guide__user',
+        'original_session__daily_schedule', 'original_session__time_slot', 'original_session__assigned_guide__user',
+        'target_session__daily_schedule', 'target_session__time_slot', 'target_session__assigned_guide__user',
+    ]
+    raw_id_fields = ['original_session', 'target_session']
+    readonly_fields = ['status', 'created_at', 'updated_at']
+    actions = ['approve_selected', 'reject_selected']
+
+    @admin.action(description='Approve selected swap requests')
+    def approve_selected(self, request, queryset):
+        """Apply each pending request that still fits the rules; report the ones that don't."""
+        approved = 0
+        for swap_request in queryset.filter(status='pending'):
+            try:
+                approve_swap(swap_request)
+                approved += 1
+            except Exception as e:
+                self.message_user(request, f"{swap_request}: {e}", level=messages.ERROR)
+        self.message_user(request, f"Approved {approved} swap request(s)", level=messages.SUCCESS)
+
+    @admin.action(description='Reject selected swap requests')
+    def reject_selected(self, request, queryset):
+        rejected = 0
+        for swap_request in queryset.filter(status='pending'):
+            reject_swap(swap_request)
+            rejected += 1
+        self.message_user(request, f"Rejected {rejected} swap request(s)", level=messages.SUCCESS)
 
 
 # ============================================================================
@@ -163,7 +309,6 @@ class TourSessionAdmin(admin.ModelAdmin):
 #
 # - TourTimeSlot: Managed via management command (generate_tour_slots)
 # - DailySchedule: Managed via Schedule Manager interface
-# - ShiftSwapRequest: Removed from MVP (future feature)
 #
 # To access Schedule Manager: /schedule/guide/
 # ============================================================================
@@ -184,12 +329,14 @@ class DailyRestaurantScheduleAdmin(admin.ModelAdmin):
 
     list_display = [
         'date',
+        'site',
         'staff_count_display',
         'is_published_badge',
         'published_at'
     ]
 
     list_filter = [
+        'site',
         'is_published',
         'date'
     ]
@@ -205,7 +352,7 @@ class DailyRestaurantScheduleAdmin(admin.ModelAdmin):
 
     fieldsets = [
         ('Schedule Information', {
-            'fields': ['date', 'is_published', 'published_at']
+            'fields': ['site', 'date', 'is_published', 'published_at']
         }),
         ('Notes', {
             'fields': ['notes']
@@ -244,6 +391,18 @@ class DailyRestaurantScheduleAdmin(admin.ModelAdmin):
     is_published_badge.short_description = 'Status'
     is_published_badge.admin_order_field = 'is_published'
 
+    def save_model(self, request, obj, form, change):
+        """Save, logging a publish change to the schedule change log."""
+        was_published = bool(form.initial.get('is_published')) if change else False
+        super().save_model(request, obj, form, change)
+        record(
+            obj.site_id, obj.date, ScheduleChange.KIND_RESTAURANT_PUBLISHED, obj.id,
+            int(was_published), int(obj.is_published)
+        )
+        if was_published or obj.is_published:
+            materialise_restaurant_date(obj)
+            refresh_feeds_for_restaurant_date(obj)
+
     @admin.action(description='Open Restaurant Schedule Manager')
     def open_restaurant_manager(self, request, queryset):
         """Redirect to restaurant schedule manager."""
@@ -272,6 +431,7 @@ class StaffShiftAdmin(admin.ModelAdmin):
     ]
 
     list_filter = [
+        'daily_schedule__site',
         'duration_hours',
         'staff__staff_type',
         'daily_schedule__date'
@@ -312,6 +472,52 @@ class StaffShiftAdmin(admin.ModelAdmin):
     date_display.short_description = 'Date'
     date_display.admin_order_field = 'daily_schedule__date'
 
+    def save_model(self, request, obj, form, change):
+        """Save, logging the new shift or its staff change to the schedule change log."""
+        old_staff_id = form.initial.get('staff') if change else None
+        super().save_model(request, obj, form, change)
+        day = obj.daily_schedule
+        if change:
+            record(day.site_id, day.date, ScheduleChange.KIND_SHIFT_STAFF, obj.id, old_staff_id, obj.staff_id)
+        else:
+            record(day.site_id, day.date, ScheduleChange.KIND_SHIFT_ADDED, obj.id, None, obj.staff_id)
+        clear_redo(DaySnapshot.KIND_RESTAURANT, day)
+        if day.is_published:
+            materialise_restaurant_date(day)
+            refresh_feeds_for_restaurant_date(day, {old_staff_id, obj.staff_id})
+
+    def delete_model(self, request, obj):
+        record(
+            obj.daily_schedule.site_id, obj.daily_schedule.date,
+            ScheduleChange.KIND_SHIFT_REMOVED, obj.id, obj.staff_id, None
+        )
+        day = obj.daily_schedule
+        super().delete_model(request, obj)
+        clear_redo(DaySnapshot.KIND_RESTAURANT, day)
+        if day.is_published:
+            materialise_restaurant_date(day)
+            refresh_feeds_for_restaurant_date(day, {obj.staff_id})
+
+    def delete_queryset(self, request, queryset):
+        removed, staff_by_day = {}, {}
+        for shift_id, staff_id, site_id, day_id, day in queryset.values_list(
+            'id', 'staff_id', 'daily_schedule__site_id', 'daily_schedule_id', 'daily_schedule__date'
+        ):
+            removed.setdefault(site_id, []).append((day, shift_id, staff_id))
+            staff_by_day.setdefault(day_id, set()).add(staff_id)
+        for site_id, shifts in removed.items():
+            changes = ChangeLog(site_id)
+            for day, shift_id, staff_id in shifts:
+                changes.add(day, ScheduleChange.KIND_SHIFT_REMOVED, shift_id, staff_id, None)
+            changes.save()
+        days = list(DailyRestaurantSchedule.objects.filter(id__in=queryset.values('daily_schedule_id')))
+        super().delete_queryset(request, queryset)
+        for day in days:
+            clear_redo(DaySnapshot.KIND_RESTAURANT, day)
+            if day.is_published:
+                materialise_restaurant_date(day)
+                refresh_feeds_for_restaurant_date(day, staff_by_day[day.id])
+
     def staff_type_display(self, obj):
         """Display staff type."""
         if obj.staff:
@@ -352,4 +558,93 @@ class StaffShiftAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
         qs = super().get_queryset(request)
-        return qs.select_related('daily_schedule', 'staff__user')
+        return qs.with_people()
+
+
+# ============================================================================
+# SCHEDULER RUN TELEMETRY ADMIN
+# ============================================================================
+
+@admin.register(SchedulerRun)
+class SchedulerRunAdmin(admin.ModelAdmin):
+    """Read-only list of auto-scheduler runs, to spot slow days and trends."""
+
+    list_display = [
+        'started_at',
+        'kind',
+        'date',
+        'source',
+        'algorithm',
+        'total_ms',
+        'phase_breakdown',
+        'queries',
+        'candidates_evaluated',
+        'assigned_count',
+        'unfillable_count',
+    ]
+
+    list_filter = [
+        'site',
+        'kind',
+        'source',
+        'algorithm',
+        'started_at',
+    ]
+
+    search_fields = [
+        'inputs_hash',
+        'fingerprint',
+    ]
+
+    date_hierarchy = 'date'
+
+    def phase_breakdown(self, obj):
+        """Milliseconds per phase, e.g. load 3.1 / search 40.2."""
+        return ' / '.join(f'{name} {ms}' for name, ms in obj.phase_ms.items() if ms)
+
+    phase_breakdown.short_description = 'Phases (ms)'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# ============================================================================
+# SCHEDULE CHANGE LOG ADMIN
+# ============================================================================
+
+@admin.register(ScheduleChange)
+class ScheduleChangeAdmin(admin.ModelAdmin):
+    """Read-only view of the append-only schedule change log."""
+
+    list_display = [
+        'id',
+        'created_at',
+        'date',
+        'kind',
+        'object_id',
+        'old_value',
+        'new_value',
+        'user',
+    ]
+
+    list_filter = [
+        'site',
+        'kind',
+        'date',
+    ]
+
+    list_select_related = ['user']
+
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
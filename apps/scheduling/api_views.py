@@ -5,12 +5,93 @@ Phase 2: Editing and validation
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 import json
 
-from apps.scheduling.models import TourSession, DailySchedule, TourTimeSlot, DailyRestaurantSchedule, StaffShift, RestaurantStaff
+from django.db import transaction
+from django.db.models import F, Q, Count, Avg, Max
+from django.utils import timezone
+
+from apps.scheduling.models import TourSession, DailySchedule, DailyRestaurantSchedule, StaffShift, RestaurantStaff, VersionConflict, PublishedRoster, SchedulerRun, ShiftSwapRequest, ScheduleChange, DaySnapshot
+from apps.core.sites import site_for_request
 from apps.guides.models import Guide
 from apps.scheduling.services import SchedulingService, RestaurantSchedulingService
+from apps.scheduling.calendar_feeds import (
+    refresh_feeds_for_tour_date, refresh_feeds_for_restaurant_date, tour_guide_ids, restaurant_staff_ids
+)
+from apps.scheduling.changelog import CHANGES_PAGE_MAX, ChangeLog, record, changes_since, latest_cursor
+from apps.scheduling.rosters import materialise_tour_date, materialise_restaurant_date, roster_payload
+from apps.scheduling.serializers import (
+    json_response, session_payload, shift_payload, eligible_guides_payload, restaurant_day_payload
+)
+from apps.scheduling.forecasting import forecast_range
+from apps.scheduling.local_search import MAX_TIME_BUDGET_MS
+from apps.scheduling.slot_templates import slots_for_schedule
+from apps.scheduling.scenarios import Scenario, ScenarioExpired, load_scenario, discard_scenario
+from apps.scheduling.swaps import SwapIndex, SWAP_WINDOW_DAYS, approve_swap, reject_swap
+from apps.scheduling.telemetry import run_summary
+from apps.scheduling.undo import push_snapshot, clear_redo, history, undo, redo
+
+
+class RowLocked(Exception):
+    """Raised when another editor currently holds the row lock."""
+
+
+def _lock_for_edit(queryset, pk):
+    """
+    Lock one row for the rest of the transaction without waiting for it.
+
+    On PostgreSQL a row locked by another editor is skipped (SKIP LOCKED) and
+    RowLocked is raised, so edits on other sessions/dates never queue behind
+    it. SQLite ignores FOR UPDATE and relies on its database-level lock.
+    """
+    try:
+        return queryset.select_for_update(skip_locked=True, of=('self',)).get(pk=pk)
+    except queryset.model.DoesNotExist:
+        if queryset.model.objects.filter(pk=pk).exists():
+            raise RowLocked(
+                f"{queryset.model._meta.verbose_name.capitalize()} {pk} is being edited by someone else. "
+                "Try again in a moment."
+            )
+        raise
+
+
+def _locked_response(error):
+    """423 response: the row is busy, not changed, so there is nothing to refresh."""
+    return JsonResponse({
+        'success': False,
+        'locked': True,
+        'error': str(error)
+    }, status=423)
+
+
+def _sync_published_tour_day(daily_schedule, guide_ids=None):
+    """
+    After an edit to a tour day, rewrite its rosters and feeds if guides
+    can see it. guide_ids are the guides the edit touched, before and
+    after; by default the feeds of the guides on the day now.
+    """
+    if daily_schedule.is_published:
+        materialise_tour_date(daily_schedule)
+        refresh_feeds_for_tour_date(daily_schedule, guide_ids)
+
+
+def _sync_published_restaurant_day(daily_schedule, staff_ids=None):
+    """Restaurant counterpart of _sync_published_tour_day()."""
+    if daily_schedule.is_published:
+        materialise_restaurant_date(daily_schedule)
+        refresh_feeds_for_restaurant_date(daily_schedule, staff_ids)
+
+
+def _conflict_response(error, current):
+    """409 response carrying the row as it is now, so the editor can refresh."""
+    return JsonResponse({
+        'success': False,
+        'conflict': True,
+        'error': str(error),
+        'current': current
+    }, status=409)
 
 
 @staff_member_required
@@ -27,21 +108,48 @@ def assign_guide(request):
         visitor_count = data.get('visitor_count')
         visitor_type = data.get('visitor_type')
         booking_channel = data.get('booking_channel')
-
-        session = TourSession.objects.get(id=session_id)
-
-        # Update assignment
-        if guide_id:
-            session.assigned_guide = Guide.objects.get(id=guide_id)
-        else:
-            session.assigned_guide = None
-
-        # Update booking details
-        session.visitor_count = visitor_count if visitor_count else None
-        session.visitor_type = visitor_type if visitor_type else None
-        session.booking_channel = booking_channel if booking_channel else None
-
-        session.save()
+        version = data.get('version')
+
+        with transaction.atomic():
+            session = _lock_for_edit(
+                TourSession.objects.select_related('daily_schedule', 'time_slot', 'assigned_guide__user'),
+                session_id
+            )
+
+            # Reject edits made against a stale copy of the session
+            if version is not None and int(version) != session.version:
+                raise VersionConflict(session)
+
+            guide = Guide.objects.select_related('user').get(
+                id=guide_id, site_id=session.daily_schedule.site_id
+            ) if guide_id else None
+            new_values = {
+                'assigned_guide': guide,
+                'visitor_count': visitor_count if visitor_count else None,
+                'visitor_type': visitor_type if visitor_type else None,
+                'booking_channel': booking_channel if booking_channel else None,
+            }
+
+            old_guide_id = session.assigned_guide_id
+            changed_fields = []
+            if session.assigned_guide_id != (guide.id if guide else None):
+                changed_fields.append('assigned_guide')
+            for field in ('visitor_count', 'visitor_type', 'booking_channel'):
+                if getattr(session, field) != new_values[field]:
+                    changed_fields.append(field)
+
+            for field, value in new_values.items():
+                setattr(session, field, value)
+
+            # Conditional write of the changed columns only
+            if changed_fields:
+                session.save_versioned(session.version, changed_fields)
+                record(
+                    session.daily_schedule.site_id, session.daily_schedule.date,
+                    ScheduleChange.KIND_GUIDE, session.id, old_guide_id, session.assigned_guide_id
+                )
+                clear_redo(DaySnapshot.KIND_TOUR, session.daily_schedule)
+                _sync_published_tour_day(session.daily_schedule, {old_guide_id, session.assigned_guide_id})
 
         # Validate
         service = SchedulingService()
@@ -50,10 +158,16 @@ def assign_guide(request):
         return JsonResponse({
             'success': True,
             'session_id': session.id,
+            'version': session.version,
             'errors': errors,
             'booking_summary': session.get_booking_summary() if session.assigned_guide else None
         })
 
+    except RowLocked as e:
+        return _locked_response(e)
+    except VersionConflict as e:
+        current = TourSession.objects.select_related('time_slot', 'assigned_guide__user').get(id=e.instance.pk)
+        return _conflict_response(e, session_payload(current))
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -68,16 +182,37 @@ def unassign_guide(request):
     try:
         data = json.loads(request.body)
         session_id = data.get('session_id')
-
-        session = TourSession.objects.get(id=session_id)
-        session.assigned_guide = None
-        session.save()
+        version = data.get('version')
+
+        with transaction.atomic():
+            session = _lock_for_edit(TourSession.objects.select_related('daily_schedule'), session_id)
+
+            # Reject edits made against a stale copy of the session
+            if version is not None and int(version) != session.version:
+                raise VersionConflict(session)
+
+            if session.assigned_guide_id is not None:
+                old_guide_id = session.assigned_guide_id
+                session.assigned_guide = None
+                session.save_versioned(session.version, ['assigned_guide'])
+                record(
+                    session.daily_schedule.site_id, session.daily_schedule.date,
+                    ScheduleChange.KIND_GUIDE, session.id, old_guide_id, None
+                )
+                clear_redo(DaySnapshot.KIND_TOUR, session.daily_schedule)
+                _sync_published_tour_day(session.daily_schedule, {old_guide_id})
 
         return JsonResponse({
             'success': True,
-            'session_id': session.id
+            'session_id': session.id,
+            'version': session.version
         })
 
+    except RowLocked as e:
+        return _locked_response(e)
+    except VersionConflict as e:
+        current = TourSession.objects.select_related('time_slot', 'assigned_guide__user').get(id=e.instance.pk)
+        return _conflict_response(e, session_payload(current))
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -93,21 +228,14 @@ def get_eligible_guides(request, session_id):
     Filters by guide type, availability, and current assignments.
     """
     try:
-        session = TourSession.objects.get(id=session_id)
+        session = TourSession.objects.with_people().get(id=session_id)
         service = SchedulingService()
 
         eligible_guides = service.get_available_guides_for_session(session)
 
-        guides_data = [{
-            'id': guide.id,
-            'name': guide.user.get_full_name() or guide.user.username,
-            'type': guide.get_guide_type_display(),
-            'type_code': guide.guide_type
-        } for guide in eligible_guides]
-
-        return JsonResponse({
+        return json_response({
             'success': True,
-            'guides': guides_data
+            'guides': eligible_guides_payload(eligible_guides)
         })
 
     except Exception as e:
@@ -122,21 +250,9 @@ def get_eligible_guides(request, session_id):
 def get_session_data(request, session_id):
     """Get full data for a session including current assignment and booking details."""
     try:
-        session = TourSession.objects.get(id=session_id)
-
-        data = {
-            'success': True,
-            'session_id': session.id,
-            'time_slot': str(session.time_slot),
-            'assigned_guide_id': session.assigned_guide.id if session.assigned_guide else None,
-            'assigned_guide_name': session.assigned_guide.user.get_full_name() if session.assigned_guide else None,
-            'visitor_count': session.visitor_count,
-            'visitor_type': session.visitor_type,
-            'booking_channel': session.booking_channel,
-            'notes': session.notes
-        }
+        session = TourSession.objects.select_related('time_slot', 'assigned_guide__user').get(id=session_id)
 
-        return JsonResponse(data)
+        return json_response({'success': True, **session_payload(session)})
 
     except Exception as e:
         return JsonResponse({
@@ -154,14 +270,23 @@ def update_standby(request):
         date_str = data.get('date')
         guide_id = data.get('guide_id')
 
-        schedule = DailySchedule.objects.get(date=date_str)
+        with transaction.atomic():
+            schedule = DailySchedule.objects.select_for_update().get(site=site_for_request(request), date=date_str)
+            old_standby_id = schedule.standby_guide_id
 
-        if guide_id:
-            schedule.standby_guide = Guide.objects.get(id=guide_id)
-        else:
-            schedule.standby_guide = None
+            if guide_id:
+                schedule.standby_guide = Guide.objects.get(id=guide_id, site_id=schedule.site_id)
+            else:
+                schedule.standby_guide = None
 
-        schedule.save()
+            schedule.save()
+            record(
+                schedule.site_id, schedule.date,
+                ScheduleChange.KIND_STANDBY, schedule.id, old_standby_id, schedule.standby_guide_id
+            )
+            if old_standby_id != schedule.standby_guide_id:
+                clear_redo(DaySnapshot.KIND_TOUR, schedule)
+                _sync_published_tour_day(schedule, {old_standby_id, schedule.standby_guide_id})
 
         return JsonResponse({
             'success': True,
@@ -180,7 +305,7 @@ def update_standby(request):
 def get_schedule_stats(request, date_str):
     """Get statistics for a daily schedule."""
     try:
-        schedule = DailySchedule.objects.get(date=date_str)
+        schedule = DailySchedule.objects.get(site=site_for_request(request), date=date_str)
 
         total = schedule.sessions.count()
         assigned = schedule.sessions.exclude(assigned_guide__isnull=True).count()
@@ -208,6 +333,94 @@ def get_schedule_stats(request, date_str):
         }, status=400)
 
 
+# ============================================================================
+# Date Range API (week / month views)
+# ============================================================================
+
+RANGE_MAX_DAYS = 62
+
+
+def _parse_date_range(request):
+    """
+    Date range from ?start=&end=, ?week=<any date in the week> or ?month=YYYY-MM.
+    Raises ValueError for a missing, reversed or too-long range.
+    """
+    from calendar import monthrange
+    from datetime import datetime, timedelta
+
+    if request.GET.get('month'):
+        month_start = datetime.strptime(request.GET['month'], '%Y-%m').date()
+        start = month_start
+        end = month_start.replace(day=monthrange(month_start.year, month_start.month)[1])
+    elif request.GET.get('week'):
+        day = datetime.strptime(request.GET['week'], '%Y-%m-%d').date()
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=6)
+    elif request.GET.get('start') and request.GET.get('end'):
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+    else:
+        raise ValueError('Provide start and end, week, or month')
+
+    if end < start:
+        raise ValueError('End date must be on or after start date')
+    if (end - start).days + 1 > RANGE_MAX_DAYS:
+        raise ValueError(f'Date range cannot exceed {RANGE_MAX_DAYS} days')
+    return start, end
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def schedule_range(request):
+    """
+    Tour schedule stats and assignments for a week, month or date range.
+    Columnar JSON; guides and slots are referenced by table index.
+    """
+    try:
+        start, end = _parse_date_range(request)
+        service = SchedulingService(site_for_request(request))
+        return json_response({
+            'success': True,
+            **service.get_range_data(start, end)
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def coverage_heatmap_data(request):
+    """
+    Month-at-a-glance problem indicators for tours and restaurant
+    (?month=YYYY-MM, or any range accepted by the range endpoints).
+    """
+    try:
+        import time
+        from apps.scheduling.services import get_coverage_heatmap
+
+        started = time.perf_counter()
+        start, end = _parse_date_range(request)
+        days = get_coverage_heatmap(start, end, site_for_request(request))
+
+        return json_response({
+            'success': True,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'days': days,
+            'generated_ms': round((time.perf_counter() - started) * 1000, 1)
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
 @staff_member_required
 @require_http_methods(["POST"])
 def auto_assign_day(request):
@@ -219,18 +432,37 @@ def auto_assign_day(request):
         data = json.loads(request.body)
         date_str = data.get('date')
         assign_standby = data.get('assign_standby', True)
+        seed = data.get('seed')
+        # Optional local-search improvement after the greedy pass
+        time_budget_ms = min(max(int(data.get('time_budget_ms') or 0), 0), MAX_TIME_BUDGET_MS)
 
-        schedule = DailySchedule.objects.get(date=date_str)
         service = SchedulingService()
 
-        # Run auto-scheduler
-        results = service.auto_schedule_day(schedule, assign_standby=assign_standby)
+        with transaction.atomic():
+            schedule = DailySchedule.objects.select_for_update().get(site=site_for_request(request), date=date_str)
+            push_snapshot(DaySnapshot.KIND_TOUR, schedule, 'Auto-assign')
+            guide_ids = tour_guide_ids(schedule)
+
+            # Run auto-scheduler
+            results = service.auto_schedule_day(
+                schedule,
+                assign_standby=assign_standby,
+                seed=int(seed) if seed is not None else None,
+                time_budget_ms=time_budget_ms,
+                source=SchedulerRun.SOURCE_API
+            )
+            _sync_published_tour_day(schedule, guide_ids | tour_guide_ids(schedule))
 
         return JsonResponse({
             'success': True,
             'assigned_count': results['assigned_count'],
             'unfillable_count': results['unfillable_count'],
             'unfillable_sessions': results['unfillable_sessions'],
+            'standby_guide_id': results['standby_guide_id'],
+            'seed': results['seed'],
+            'fingerprint': results['fingerprint'],
+            'improvement': results.get('improvement'),
+            'run_id': results['run_id'],
             'errors': results.get('errors', [])
         })
 
@@ -259,21 +491,42 @@ def clear_all_assignments(request):
         from datetime import datetime
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
 
-        # Get daily schedule
-        daily_schedule = DailySchedule.objects.get(date=date_obj)
-
-        # Clear all assignments
-        TourSession.objects.filter(daily_schedule=daily_schedule).update(
-            assigned_guide=None,
-            visitor_count=None,
-            visitor_type=None,
-            booking_channel=None
-        )
+        with transaction.atomic():
+            # Get daily schedule
+            daily_schedule = DailySchedule.objects.select_for_update().get(
+                site=site_for_request(request), date=date_obj
+            )
+            push_snapshot(DaySnapshot.KIND_TOUR, daily_schedule, 'Clear all')
+            cleared_guide_ids = tour_guide_ids(daily_schedule)
+            changes = ChangeLog(daily_schedule.site_id)
+            for session_id, guide_id in TourSession.objects.filter(
+                daily_schedule=daily_schedule, assigned_guide__isnull=False
+            ).values_list('id', 'assigned_guide_id'):
+                changes.add(date_obj, ScheduleChange.KIND_GUIDE, session_id, guide_id, None)
+
+            # Clear all assignments
+            TourSession.objects.filter(daily_schedule=daily_schedule).update(
+                assigned_guide=None,
+                visitor_count=None,
+                visitor_type=None,
+                booking_channel=None,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+
+            # Clear standby guide
+            was_published = daily_schedule.is_published
+            changes.add(date_obj, ScheduleChange.KIND_STANDBY, daily_schedule.id, daily_schedule.standby_guide_id, None)
+            changes.add(date_obj, ScheduleChange.KIND_TOUR_PUBLISHED, daily_schedule.id, int(was_published), 0)
+            daily_schedule.standby_guide = None
+            daily_schedule.is_published = False
+            daily_schedule.save()
+            changes.save()
 
-        # Clear standby guide
-        daily_schedule.standby_guide = None
-        daily_schedule.is_published = False
-        daily_schedule.save()
+            # Drop the day from guides' calendar feeds and rosters
+            if was_published:
+                refresh_feeds_for_tour_date(daily_schedule, cleared_guide_ids)
+                materialise_tour_date(daily_schedule)
 
         return JsonResponse({
             'success': True,
@@ -303,9 +556,10 @@ def export_schedule_csv(request, date_str):
     from django.http import HttpResponse
 
     try:
-        schedule = DailySchedule.objects.get(date=date_str)
-        guides = Guide.objects.filter(is_active=True).order_by('user__first_name')
-        time_slots = TourTimeSlot.objects.all().order_by('start_time')
+        site = site_for_request(request)
+        schedule = DailySchedule.objects.get(site=site, date=date_str)
+        guides = Guide.objects.filter(site=site, is_active=True).order_by('user__first_name')
+        time_slots = slots_for_schedule(schedule, schedule.date, site)
 
         # Create CSV response
         response = HttpResponse(content_type='text/csv; charset=utf-8')
@@ -382,15 +636,23 @@ def publish_schedule(request):
         data = json.loads(request.body)
         date_str = data.get('date')
 
-        schedule = DailySchedule.objects.get(date=date_str)
+        schedule = DailySchedule.objects.get(site=site_for_request(request), date=date_str)
         service = SchedulingService()
 
         # Validate before publishing
         can_publish, errors = service.can_publish_schedule(schedule)
 
         if can_publish:
-            schedule.is_published = True
-            schedule.save()
+            with transaction.atomic():
+                record(
+                    schedule.site_id, schedule.date,
+                    ScheduleChange.KIND_TOUR_PUBLISHED, schedule.id, int(schedule.is_published), 1
+                )
+                schedule.is_published = True
+                schedule.published_at = timezone.now()
+                schedule.save()
+                refresh_feeds_for_tour_date(schedule)
+                materialise_tour_date(schedule)
             return JsonResponse({
                 'success': True,
                 'message': 'Schedule published successfully'
@@ -414,6 +676,34 @@ def publish_schedule(request):
         }, status=400)
 
 
+@staff_member_required
+@require_http_methods(["POST"])
+def publish_schedule_range(request):
+    """
+    Publish or unpublish every tour day in ?start=&end=, ?week= or ?month=.
+    Body: {action: 'publish' (default) | 'unpublish'}. Days with blockers
+    stay drafts and are listed with their blockers.
+    """
+    try:
+        data = json.loads(request.body or '{}')
+        start, end = _parse_date_range(request)
+        service = SchedulingService(site_for_request(request))
+        results = service.publish_range(start, end, publish=data.get('action', 'publish') != 'unpublish')
+
+        return JsonResponse({
+            'success': True,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            **results
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
 # ============================================================================
 # Restaurant Staff Scheduling API Endpoints (Phase 5)
 # ============================================================================
@@ -434,11 +724,17 @@ def restaurant_auto_assign(request):
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
 
         # Get or create daily schedule
-        daily_schedule, created = DailyRestaurantSchedule.objects.get_or_create(date=date_obj)
+        site = site_for_request(request)
+        daily_schedule, created = DailyRestaurantSchedule.objects.get_or_create(site=site, date=date_obj)
 
         # Run auto-scheduler
-        service = RestaurantSchedulingService()
-        results = service.auto_schedule_day(daily_schedule, pattern=pattern)
+        service = RestaurantSchedulingService(site)
+        with transaction.atomic():
+            DailyRestaurantSchedule.objects.select_for_update().filter(pk=daily_schedule.pk).first()
+            push_snapshot(DaySnapshot.KIND_RESTAURANT, daily_schedule, 'Auto-assign')
+            staff_ids = restaurant_staff_ids(daily_schedule)
+            results = service.auto_schedule_day(daily_schedule, pattern=pattern, source=SchedulerRun.SOURCE_API)
+            _sync_published_restaurant_day(daily_schedule, staff_ids | restaurant_staff_ids(daily_schedule))
 
         total_assigned = results['kitchen_assigned'] + results['serving_assigned']
 
@@ -449,6 +745,7 @@ def restaurant_auto_assign(request):
             'serving_assigned': results['serving_assigned'],
             'total_staff': results['total_staff'],
             'unfillable_count': results['unfillable_count'],
+            'run_id': results['run_id'],
             'errors': results.get('errors', []),
             'message': f"Assigned {results['kitchen_assigned']} kitchen and {results['serving_assigned']} serving staff (total: {results['total_staff']} staff)"
         })
@@ -473,15 +770,33 @@ def restaurant_clear_all(request):
         from datetime import datetime
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
 
-        # Get daily schedule
-        daily_schedule = DailyRestaurantSchedule.objects.get(date=date_obj)
-
-        # Delete all shifts
-        StaffShift.objects.filter(daily_schedule=daily_schedule).delete()
+        with transaction.atomic():
+            # Get daily schedule
+            daily_schedule = DailyRestaurantSchedule.objects.select_for_update().get(
+                site=site_for_request(request), date=date_obj
+            )
+            push_snapshot(DaySnapshot.KIND_RESTAURANT, daily_schedule, 'Clear all')
+            shifts = StaffShift.objects.filter(daily_schedule=daily_schedule)
+            changes = ChangeLog(daily_schedule.site_id)
+            cleared_staff_ids = set()
+            for shift_id, staff_id in shifts.values_list('id', 'staff_id'):
+                changes.add(date_obj, ScheduleChange.KIND_SHIFT_REMOVED, shift_id, staff_id, None)
+                cleared_staff_ids.add(staff_id)
+
+            # Delete all shifts
+            shifts.delete()
+
+            # Unpublish
+            was_published = daily_schedule.is_published
+            changes.add(date_obj, ScheduleChange.KIND_RESTAURANT_PUBLISHED, daily_schedule.id, int(was_published), 0)
+            daily_schedule.is_published = False
+            daily_schedule.save()
+            changes.save()
 
-        # Unpublish
-        daily_schedule.is_published = False
-        daily_schedule.save()
+            # Drop the day from staff calendar feeds and rosters
+            if was_published:
+                refresh_feeds_for_restaurant_date(daily_schedule, cleared_staff_ids)
+                materialise_restaurant_date(daily_schedule)
 
         return JsonResponse({
             'success': True,
@@ -514,7 +829,7 @@ def restaurant_publish(request):
         from datetime import datetime
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
 
-        daily_schedule = DailyRestaurantSchedule.objects.get(date=date_obj)
+        daily_schedule = DailyRestaurantSchedule.objects.get(site=site_for_request(request), date=date_obj)
         service = RestaurantSchedulingService()
 
         # Validate before publishing
@@ -522,9 +837,16 @@ def restaurant_publish(request):
 
         if can_publish:
             from django.utils import timezone
-            daily_schedule.is_published = True
-            daily_schedule.published_at = timezone.now()
-            daily_schedule.save()
+            with transaction.atomic():
+                record(
+                    daily_schedule.site_id, daily_schedule.date,
+                    ScheduleChange.KIND_RESTAURANT_PUBLISHED, daily_schedule.id, int(daily_schedule.is_published), 1
+                )
+                daily_schedule.is_published = True
+                daily_schedule.published_at = timezone.now()
+                daily_schedule.save()
+                refresh_feeds_for_restaurant_date(daily_schedule)
+                materialise_restaurant_date(daily_schedule)
 
             return JsonResponse({
                 'success': True,
@@ -549,6 +871,33 @@ def restaurant_publish(request):
         }, status=400)
 
 
+@staff_member_required
+@require_http_methods(["POST"])
+def restaurant_publish_range(request):
+    """
+    Publish or unpublish every restaurant day in ?start=&end=, ?week= or
+    ?month=. Body: {action: 'publish' (default) | 'unpublish'}.
+    """
+    try:
+        data = json.loads(request.body or '{}')
+        start, end = _parse_date_range(request)
+        service = RestaurantSchedulingService(site_for_request(request))
+        results = service.publish_range(start, end, publish=data.get('action', 'publish') != 'unpublish')
+
+        return JsonResponse({
+            'success': True,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            **results
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
 @staff_member_required
 @require_http_methods(["POST"])
 def restaurant_assign_shift(request):
@@ -559,36 +908,62 @@ def restaurant_assign_shift(request):
         data = json.loads(request.body)
         shift_id = data.get('shift_id')
         staff_id = data.get('staff_id')  # Can be None to unassign
-
-        shift = StaffShift.objects.get(id=shift_id)
-
-        if staff_id:
-            staff = RestaurantStaff.objects.get(id=staff_id)
-
-            # Validate: Check if staff is already assigned on this day
-            existing_shifts = StaffShift.objects.filter(
-                daily_schedule=shift.daily_schedule,
-                staff=staff
-            ).exclude(id=shift_id)
-
-            if existing_shifts.exists():
-                return JsonResponse({
-                    'success': False,
-                    'error': f'{staff.user.get_full_name()} is already assigned to another shift on this day'
-                }, status=400)
-
-            shift.staff = staff
-        else:
-            shift.staff = None
-
-        shift.save()
+        version = data.get('version')
+
+        with transaction.atomic():
+            shift = _lock_for_edit(StaffShift.objects.select_related('staff__user'), shift_id)
+
+            # Reject edits made against a stale copy of the shift
+            if version is not None and int(version) != shift.version:
+                raise VersionConflict(shift)
+
+            if staff_id:
+                # Serialise assignments within this day so the one-shift-per-day
+                # check below can't race; other dates are not blocked
+                daily_schedule = DailyRestaurantSchedule.objects.select_for_update().filter(
+                    id=shift.daily_schedule_id
+                ).first()
+                staff = RestaurantStaff.objects.select_related('user').get(id=staff_id, site_id=daily_schedule.site_id)
+
+                # Validate: Check if staff is already assigned on this day
+                existing_shifts = StaffShift.objects.filter(
+                    daily_schedule_id=shift.daily_schedule_id,
+                    staff=staff
+                ).exclude(id=shift_id)
+
+                if existing_shifts.exists():
+                    return JsonResponse({
+                        'success': False,
+                        'error': f'{staff.user.get_full_name()} is already assigned to another shift on this day'
+                    }, status=400)
+            else:
+                staff = None
+
+            # Conditional write of the staff column only
+            if shift.staff_id != (staff.id if staff else None):
+                old_staff_id = shift.staff_id
+                shift.staff = staff
+                shift.save_versioned(shift.version, ['staff'])
+                daily_schedule = DailyRestaurantSchedule.objects.get(id=shift.daily_schedule_id)
+                record(
+                    daily_schedule.site_id, daily_schedule.date,
+                    ScheduleChange.KIND_SHIFT_STAFF, shift.id, old_staff_id, shift.staff_id
+                )
+                clear_redo(DaySnapshot.KIND_RESTAURANT, daily_schedule)
+                _sync_published_restaurant_day(daily_schedule, {old_staff_id, shift.staff_id})
 
         return JsonResponse({
             'success': True,
             'shift_id': shift.id,
+            'version': shift.version,
             'staff_name': shift.staff.user.get_full_name() if shift.staff else None
         })
 
+    except RowLocked as e:
+        return _locked_response(e)
+    except VersionConflict as e:
+        current = StaffShift.objects.select_related('staff__user').get(id=e.instance.pk)
+        return _conflict_response(e, shift_payload(current))
     except StaffShift.DoesNotExist:
         return JsonResponse({
             'success': False,
@@ -616,38 +991,13 @@ def restaurant_schedule_data(request, date_str):
         from datetime import datetime
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
 
-        daily_schedule = DailyRestaurantSchedule.objects.get(date=date_obj)
-        service = RestaurantSchedulingService()
-
-        # Get shifts
-        shifts = StaffShift.objects.filter(daily_schedule=daily_schedule).select_related('staff__user')
+        daily_schedule = DailyRestaurantSchedule.objects.get(site=site_for_request(request), date=date_obj)
 
-        # Get summary
-        summary = service.get_schedule_summary(daily_schedule)
-
-        # Get validation
-        validation = service.validate_coverage(daily_schedule)
-
-        shifts_data = []
-        for shift in shifts:
-            shifts_data.append({
-                'id': shift.id,
-                'staff_id': shift.staff.id if shift.staff else None,
-                'staff_name': shift.staff.user.get_full_name() if shift.staff else None,
-                'staff_type': shift.staff.staff_type if shift.staff else None,
-                'start_time': shift.start_time.strftime('%H:%M'),
-                'end_time': shift.end_time.strftime('%H:%M'),
-                'duration_hours': shift.duration_hours,
-                'is_full_day': shift.is_full_day
-            })
-
-        return JsonResponse({
+        return json_response({
             'success': True,
             'date': date_str,
             'is_published': daily_schedule.is_published,
-            'shifts': shifts_data,
-            'summary': summary,
-            'validation': validation
+            **restaurant_day_payload(daily_schedule)
         })
 
     except DailyRestaurantSchedule.DoesNotExist:
@@ -662,6 +1012,28 @@ def restaurant_schedule_data(request, date_str):
         }, status=400)
 
 
+@staff_member_required
+@require_http_methods(["GET"])
+def restaurant_schedule_range(request):
+    """
+    Restaurant summary, coverage and shifts for a week, month or date range.
+    Columnar JSON; staff are referenced by table index.
+    """
+    try:
+        start, end = _parse_date_range(request)
+        service = RestaurantSchedulingService(site_for_request(request))
+        return json_response({
+            'success': True,
+            **service.get_range_data(start, end)
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
 @staff_member_required
 @require_http_methods(["GET"])
 def restaurant_export_csv(request, date_str):
@@ -675,7 +1047,7 @@ def restaurant_export_csv(request, date_str):
         from datetime import datetime
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
 
-        daily_schedule = DailyRestaurantSchedule.objects.get(date=date_obj)
+        daily_schedule = DailyRestaurantSchedule.objects.get(site=site_for_request(request), date=date_obj)
         shifts = StaffShift.objects.filter(daily_schedule=daily_schedule).select_related('staff__user').order_by('start_time')
 
         # Create CSV response
@@ -713,3 +1085,446 @@ def restaurant_export_csv(request, date_str):
             'success': False,
             'error': str(e)
         }, status=400)
+
+
+# ============================================================================
+# Published Roster API
+# ============================================================================
+
+ROSTER_MAX_DAYS = 90
+
+
+def _roster_window(request):
+    from datetime import timedelta
+    from django.utils import timezone
+
+    days = min(max(int(request.GET.get('days', 30)), 1), ROSTER_MAX_DAYS)
+    start = timezone.localdate()
+    return start, start + timedelta(days=days - 1)
+
+
+@login_required
+@require_http_methods(["GET"])
+def my_roster(request):
+    """
+    Published roster for the logged-in guide or staff member.
+    Reads the materialised PublishedRoster row; ?days=N (default 30, max 90).
+    """
+    try:
+        start, end = _roster_window(request)
+        roster = PublishedRoster.objects.filter(
+            Q(guide__user=request.user) | Q(staff__user=request.user)
+        ).first()
+
+        if roster is None and not (
+            Guide.objects.filter(user=request.user).exists() or
+            RestaurantStaff.objects.filter(user=request.user).exists()
+        ):
+            return JsonResponse({
+                'success': False,
+                'error': 'You are not registered as a guide or restaurant staff'
+            }, status=404)
+
+        return json_response({
+            'success': True,
+            **roster_payload(roster, start, end)
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def person_roster(request, person_type, person_id):
+    """
+    Published roster for any guide or staff member (managers).
+    person_type is 'guide' or 'staff'; ?days=N (default 30, max 90).
+    """
+    try:
+        if person_type == 'guide':
+            owner = Guide.objects.get(id=person_id)
+        elif person_type == 'staff':
+            owner = RestaurantStaff.objects.get(id=person_id)
+        else:
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown person type: {person_type}'
+            }, status=400)
+
+        start, end = _roster_window(request)
+        roster = PublishedRoster.objects.filter(**{person_type: owner}).first()
+
+        return json_response({
+            'success': True,
+            **roster_payload(roster, start, end)
+        })
+
+    except (Guide.DoesNotExist, RestaurantStaff.DoesNotExist):
+        return JsonResponse({
+            'success': False,
+            'error': f'{person_type.capitalize()} {person_id} not found'
+        }, status=404)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+# ============================================================================
+# Scheduler Run Telemetry
+# ============================================================================
+
+SCHEDULER_RUNS_MAX = 500
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def scheduler_runs(request):
+    """
+    Recorded auto-scheduler runs of the current site, newest first.
+    Optional filters: ?kind=tour|restaurant, ?source=, a date range
+    (start/end, week or month, on the solved date) and ?limit=N (default 100).
+    Also returns per-kind averages over the filtered runs.
+    """
+    try:
+        runs = SchedulerRun.objects.filter(site=site_for_request(request))
+        if request.GET.get('kind'):
+            runs = runs.filter(kind=request.GET['kind'])
+        if request.GET.get('source'):
+            runs = runs.filter(source=request.GET['source'])
+        if any(request.GET.get(key) for key in ('start', 'end', 'week', 'month')):
+            start, end = _parse_date_range(request)
+            runs = runs.filter(date__range=(start, end))
+
+        limit = min(max(int(request.GET.get('limit', 100)), 1), SCHEDULER_RUNS_MAX)
+
+        summary = {
+            kind: {
+                'runs': count,
+                'avg_ms': round(avg_ms, 1),
+                'max_ms': max_ms,
+                'avg_queries': round(avg_queries, 1),
+            }
+            for kind, count, avg_ms, max_ms, avg_queries in runs.order_by().values_list('kind').annotate(
+                count=Count('id'), avg_ms=Avg('total_ms'), max_ms=Max('total_ms'), avg_queries=Avg('queries')
+            )
+        }
+
+        return json_response({
+            'success': True,
+            'summary': summary,
+            'runs': [run_summary(run) for run in runs[:limit]]
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+# ============================================================================
+# What-if Scenario API
+# ============================================================================
+
+def _scenario_error(error):
+    """Map scenario exceptions to responses (404 expired, 409 conflict, 400 otherwise)."""
+    if isinstance(error, ScenarioExpired):
+        status = 404
+    elif isinstance(error, VersionConflict):
+        status = 409
+    else:
+        status = 400
+    return JsonResponse({
+        'success': False,
+        'conflict': status == 409,
+        'error': str(error)
+    }, status=status)
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def scenario_fork(request):
+    """Fork a day's tour schedule into an in-memory scenario. Body: {date}."""
+    try:
+        data = json.loads(request.body)
+        schedule = DailySchedule.objects.get(site=site_for_request(request), date=data.get('date'))
+        scenario = Scenario.fork(schedule)
+        return json_response({'success': True, **scenario.payload()})
+
+    except DailySchedule.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': f"No schedule found for {data.get('date')}"
+        }, status=404)
+    except Exception as e:
+        return _scenario_error(e)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def scenario_detail(request, token):
+    """A scenario's current state, validation and diff against the live day."""
+    try:
+        scenario = load_scenario(site_for_request(request), token)
+        return json_response({'success': True, **scenario.payload()})
+
+    except Exception as e:
+        return _scenario_error(e)
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def scenario_apply(request, token):
+    """
+    Apply hypothetical changes to a scenario. Body: {changes: [...]}
+    (see Scenario.apply for the ops). Changes apply in order; if one fails,
+    none are kept. Returns the new state plus each change's result.
+    """
+    try:
+        data = json.loads(request.body)
+        scenario = load_scenario(site_for_request(request), token)
+
+        results = [scenario.apply(change) for change in data.get('changes', [])]
+        scenario.save()
+
+        return json_response({'success': True, 'results': results, **scenario.payload()})
+
+    except Exception as e:
+        return _scenario_error(e)
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def scenario_commit(request, token):
+    """Write a scenario's diff to the live day in one transaction."""
+    try:
+        scenario = load_scenario(site_for_request(request), token)
+        with transaction.atomic():
+            daily_schedule = DailySchedule.objects.select_for_update().get(id=scenario.daily_schedule_id)
+            push_snapshot(DaySnapshot.KIND_TOUR, daily_schedule, 'Scenario commit')
+            guide_ids = tour_guide_ids(daily_schedule)
+            written = scenario.commit()
+            daily_schedule.refresh_from_db()
+            _sync_published_tour_day(daily_schedule, guide_ids | tour_guide_ids(daily_schedule))
+        return JsonResponse({'success': True, 'date': scenario.date.isoformat(), **written})
+
+    except Exception as e:
+        return _scenario_error(e)
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def scenario_discard(request, token):
+    """Drop a scenario without writing anything."""
+    discard_scenario(site_for_request(request), token)
+    return JsonResponse({'success': True})
+
+
+# ============================================================================
+# Demand Forecast API
+# ============================================================================
+
+@staff_member_required
+@require_http_methods(["GET"])
+def demand_forecast(request):
+    """
+    Visitor-demand forecast per tour slot, with a restaurant curve, for a
+    week, month or date range (see apps.scheduling.forecasting).
+    """
+    try:
+        start, end = _parse_date_range(request)
+        return json_response({
+            'success': True,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'days': forecast_range(start, end, site_for_request(request))
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+# ============================================================================
+# Shift Swap API
+# ============================================================================
+
+@staff_member_required
+@require_http_methods(["GET"])
+def swap_candidates(request, session_id):
+    """
+    Guides who could cover a session, and sessions its guide could swap
+    for, within ?days= (default SWAP_WINDOW_DAYS) either side of its date.
+    """
+    try:
+        session = TourSession.objects.select_related('daily_schedule', 'time_slot').get(
+            id=session_id, daily_schedule__site=site_for_request(request)
+        )
+        index = SwapIndex.around(session, int(request.GET.get('days', SWAP_WINDOW_DAYS)))
+
+        return json_response({
+            'success': True,
+            'session_id': session.id,
+            'date': session.daily_schedule.date.isoformat(),
+            'time_slot': str(session.time_slot),
+            'assigned_guide_id': session.assigned_guide_id,
+            'start_date': index.start_date.isoformat(),
+            'end_date': index.end_date.isoformat(),
+            **index.candidates_payload(session.id)
+        })
+
+    except TourSession.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': f'Session {session_id} not found'
+        }, status=404)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def swap_decide(request, swap_id, decision):
+    """Approve (re-check and apply) or reject a pending swap request. Body: {admin_notes}."""
+    try:
+        data = json.loads(request.body or '{}')
+        swap_request = ShiftSwapRequest.objects.get(
+            id=swap_id, original_session__daily_schedule__site=site_for_request(request)
+        )
+        if decision == 'approve':
+            swap_request = approve_swap(swap_request, data.get('admin_notes', ''))
+        else:
+            swap_request = reject_swap(swap_request, data.get('admin_notes', ''))
+
+        return JsonResponse({
+            'success': True,
+            'swap_id': swap_request.id,
+            'status': swap_request.status
+        })
+
+    except ShiftSwapRequest.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': f'Swap request {swap_id} not found'
+        }, status=404)
+    except VersionConflict as e:
+        return JsonResponse({
+            'success': False,
+            'conflict': True,
+            'error': str(e)
+        }, status=409)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+# ============================================================================
+# Schedule Change Log API
+# ============================================================================
+
+@staff_member_required
+@require_http_methods(["GET"])
+def schedule_changes(request):
+    """
+    The site's schedule changes after ?cursor= (the cursor returned by the
+    previous call), oldest first, up to ?limit= rows, optionally only
+    ?kind= (repeatable). Without a cursor returns no changes, only the
+    current cursor to poll from.
+    """
+    try:
+        site = site_for_request(request)
+        if 'cursor' not in request.GET:
+            return json_response({'success': True, 'cursor': latest_cursor(site), 'has_more': False})
+
+        return json_response({
+            'success': True,
+            **changes_since(
+                site,
+                cursor=int(request.GET['cursor']),
+                limit=int(request.GET.get('limit', CHANGES_PAGE_MAX)),
+                kinds=request.GET.getlist('kind') or None
+            )
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+# ============================================================================
+# Undo / Redo API
+# ============================================================================
+
+_UNDO_DAY_MODELS = {
+    DaySnapshot.KIND_TOUR: DailySchedule,
+    DaySnapshot.KIND_RESTAURANT: DailyRestaurantSchedule,
+}
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def undo_history(request, kind):
+    """Labels of the bulk edits that can be undone and redone on ?date=, newest first."""
+    try:
+        date_str = request.GET.get('date')
+        daily_schedule = _UNDO_DAY_MODELS[kind].objects.get(site=site_for_request(request), date=date_str)
+        return json_response({'success': True, 'date': date_str, **history(kind, daily_schedule)})
+
+    except (DailySchedule.DoesNotExist, DailyRestaurantSchedule.DoesNotExist):
+        return JsonResponse({
+            'success': False,
+            'error': f'No schedule found for {date_str}'
+        }, status=404)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def undo_redo(request, kind, action):
+    """Undo the day's last bulk edit, or redo the last one undone. Body: {date}."""
+    try:
+        data = json.loads(request.body)
+        date_str = data.get('date')
+
+        from datetime import datetime
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+
+        step = undo if action == 'undo' else redo
+        result = step(kind, site_for_request(request), date_obj)
+
+        return JsonResponse({
+            'success': True,
+            'date': date_str,
+            **result,
+            'message': f"{action.capitalize()}: {result['label']}"
+        })
+
+    except (DailySchedule.DoesNotExist, DailyRestaurantSchedule.DoesNotExist):
+        return JsonResponse({
+            'success': False,
+            'error': f'No schedule found for {date_str}'
+        }, status=404)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
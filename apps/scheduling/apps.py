@@ -5,3 +5,9 @@ class SchedulingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.scheduling'
     verbose_name = 'Scheduling'
+
+    def ready(self):
+        from apps.scheduling import calendar_feeds, lazy_loads
+
+        lazy_loads.install()
+        calendar_feeds.install()
@@ -0,0 +1,154 @@
+"""
+Trusted bulk-write helpers for schedulers, generators and imports.
+
+Model.save() on TourTimeSlot, StaffShift, Guide, RestaurantStaff and
+GuideAvailability runs full_clean() for every row, which costs one query per
+foreign key plus the cross-model role check for Guide/RestaurantStaff.
+Code that builds many rows at once validates them here in a single pass and
+persists them with bulk_create/bulk_update instead.
+
+Interactive paths (forms, admin, single-row API edits) keep using save().
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+
+def validate_batch(instances):
+    """
+    Validate a batch of instances of one model without per-row queries.
+
+    Runs clean_fields() and clean() in memory for every row. Foreign keys are
+    checked with one query per relation, and models that define a
+    clean_batch() classmethod use it instead of their per-row clean().
+    Models that define prepare_batch() get it first, to fill fields that
+    save() would derive (e.g. the availability site copies).
+    Uniqueness is left to the database constraints.
+
+    Raises ValidationError listing every problem found.
+    """
+    if not instances:
+        return
+
+    model = type(instances[0])
+    prepare_batch = getattr(model, 'prepare_batch', None)
+    if prepare_batch is not None:
+        prepare_batch(instances)
+    fk_fields = [f for f in model._meta.concrete_fields if f.many_to_one or f.one_to_one]
+    clean_batch = getattr(model, 'clean_batch', None)
+
+    errors = []
+    for obj in instances:
+        try:
+            obj.clean_fields(exclude=[f.name for f in fk_fields])
+            if clean_batch is None:
+                obj.clean()
+        except ValidationError as e:
+            errors.extend(f"{model.__name__} {_describe(obj)}: {message}" for message in e.messages)
+
+    # Check foreign keys with one query per relation
+    for field in fk_fields:
+        to_check = set()
+        for obj in instances:
+            value = getattr(obj, field.attname)
+            if value is None:
+                if not field.null:
+                    errors.append(f"{model.__name__} {_describe(obj)}: {field.name} is required")
+            elif not (field.is_cached(obj) and getattr(obj, field.name).pk == value):
+                to_check.add(value)
+
+        if to_check:
+            related = field.remote_field.model
+            found = set(related._base_manager.filter(pk__in=to_check).values_list('pk', flat=True))
+            for missing in sorted(to_check - found):
+                errors.append(f"{related.__name__} {missing} does not exist")
+
+    if clean_batch is not None:
+        try:
+            clean_batch(instances)
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+    if errors:
+        raise ValidationError(errors)
+
+
+def bulk_create_validated(instances, batch_size=None, ignore_conflicts=False):
+    """
+    Validate new instances in one pass and insert them with bulk_create.
+
+    With ignore_conflicts, rows that hit a unique constraint (e.g. created by
+    a concurrent run) are skipped instead of failing the whole batch.
+    """
+    instances = list(instances)
+    if not instances:
+        return []
+
+    validate_batch(instances)
+    model = type(instances[0])
+    with transaction.atomic():
+        return model.objects.bulk_create(
+            instances, batch_size=batch_size, ignore_conflicts=ignore_conflicts
+        )
+
+
+def bulk_upsert_validated(instances, unique_fields, update_fields, batch_size=None):
+    """
+    Validate instances in one pass and insert-or-update them in one statement.
+
+    Uses INSERT ... ON CONFLICT (unique_fields) DO UPDATE, supported by both
+    SQLite and PostgreSQL, in place of an update_or_create() loop.
+    """
+    instances = list(instances)
+    if not instances:
+        return []
+
+    validate_batch(instances)
+    model = type(instances[0])
+    update_fields = list(update_fields)
+    if 'updated_at' in {f.name for f in model._meta.concrete_fields}:
+        update_fields.append('updated_at')
+
+    with transaction.atomic():
+        return model.objects.bulk_create(
+            instances,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+
+
+def bulk_update_validated(instances, fields, batch_size=None):
+    """
+    Validate changed instances in one pass and write `fields` with bulk_update.
+
+    Also stamps updated_at and bumps version where the model has them, so
+    editors holding an older version see the change.
+    """
+    instances = list(instances)
+    if not instances:
+        return 0
+
+    validate_batch(instances)
+    model = type(instances[0])
+    field_names = {f.name for f in model._meta.concrete_fields}
+    fields = list(fields)
+
+    if 'updated_at' in field_names:
+        now = timezone.now()
+        for obj in instances:
+            obj.updated_at = now
+        fields.append('updated_at')
+
+    if 'version' in field_names:
+        for obj in instances:
+            obj.version += 1
+        fields.append('version')
+
+    with transaction.atomic():
+        return model.objects.bulk_update(instances, fields, batch_size=batch_size)
+
+
+def _describe(obj):
+    return f"#{obj.pk}" if obj.pk else "(new)"
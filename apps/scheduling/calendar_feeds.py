@@ -0,0 +1,320 @@
+"""
+iCalendar (.ics) feeds for guides and restaurant staff.
+
+Each person gets one CalendarFeed row with a secret token. The feed body is
+rendered from published schedules only and stored, so the feed URL serves a
+stored response (with an ETag) instead of querying schedules on every poll.
+
+Feeds are rebuilt, looked up by person, for the people on a date when that
+date is published or cleared, for the people an edit moves on or off a
+published date, and lazily once a day so the rolling window moves forward.
+Feeds are created when the person is, or on first use for people added
+before feeds existed.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from apps.guides.models import Guide
+from apps.scheduling.models import (
+    CalendarFeed, DailySchedule, TourSession, StaffShift, RestaurantStaff
+)
+
+# Rolling window of published schedule included in every feed
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 90
+
+PRODID = '-//Jiak99 Planner//Schedule Feed//EN'
+
+
+# ============================================================================
+# FEED LOOKUP AND REBUILDS
+# ============================================================================
+
+def install():
+    """Give each new guide and staff member a feed (from AppConfig.ready)."""
+    # No sender filter: admin saves restaurant staff through a proxy model
+    post_save.connect(_create_feed, dispatch_uid='calendar_feed_for_new_person')
+
+
+def _create_feed(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    model = sender._meta.concrete_model
+    if model is Guide:
+        CalendarFeed.objects.create(guide=instance)
+    elif model is RestaurantStaff:
+        CalendarFeed.objects.create(staff=instance)
+
+
+def feed_is_stale(feed):
+    """True if the feed was never built or was built before today."""
+    return feed.generated_at is None or timezone.localdate(feed.generated_at) < timezone.localdate()
+
+
+def rebuild_feed(feed):
+    """Render a feed from the published schedule and store it if it changed."""
+    today = timezone.localdate()
+    start = today - timedelta(days=FEED_PAST_DAYS)
+    end = today + timedelta(days=FEED_FUTURE_DAYS)
+
+    if feed.guide_id:
+        body = render_guide_calendar(feed.guide, start, end)
+    else:
+        body = render_staff_calendar(feed.staff, start, end)
+
+    feed.generated_at = timezone.now()
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+    if etag == feed.etag:
+        CalendarFeed.objects.filter(pk=feed.pk).update(generated_at=feed.generated_at)
+        return feed
+
+    feed.body = body
+    feed.etag = etag
+    feed.save(update_fields=['body', 'etag', 'generated_at'])
+    return feed
+
+
+def tour_guide_ids(daily_schedule):
+    """Ids of the guides with a tour or standby on a tour date."""
+    guide_ids = set(
+        TourSession.objects.filter(
+            daily_schedule=daily_schedule,
+            assigned_guide__isnull=False
+        ).values_list('assigned_guide_id', flat=True)
+    )
+    if daily_schedule.standby_guide_id:
+        guide_ids.add(daily_schedule.standby_guide_id)
+    return guide_ids
+
+
+def restaurant_staff_ids(daily_schedule):
+    """Ids of the staff with a shift on a restaurant date."""
+    return set(
+        StaffShift.objects.filter(
+            daily_schedule=daily_schedule,
+            staff__isnull=False
+        ).values_list('staff_id', flat=True)
+    )
+
+
+def refresh_feeds_for_tour_date(daily_schedule, guide_ids=None):
+    """
+    Rebuild guides' feeds after one tour date is published, cleared or
+    edited while published.
+
+    Feeds are looked up by guide: by default the guides on the day now.
+    A change that can take guides off the day passes guide_ids instead,
+    the guides it touched before and after (see tour_guide_ids()), so
+    removed guides lose the event.
+    """
+    if guide_ids is None:
+        guide_ids = tour_guide_ids(daily_schedule)
+    _rebuild_feeds(CalendarFeed.objects.filter(guide_id__in=set(guide_ids) - {None}).select_related('guide__user'))
+
+
+def refresh_feeds_for_tour_dates(schedules):
+    """
+    refresh_feeds_for_tour_date() for many dates at once (a range
+    publish): the guides are looked up in one query and each feed is
+    rebuilt once, however many of the dates it lists.
+    """
+    guide_ids = set(
+        TourSession.objects.filter(
+            daily_schedule__in=schedules,
+            assigned_guide__isnull=False
+        ).values_list('assigned_guide_id', flat=True)
+    )
+    guide_ids.update(schedule.standby_guide_id for schedule in schedules)
+    _rebuild_feeds(CalendarFeed.objects.filter(guide_id__in=guide_ids - {None}).select_related('guide__user'))
+
+
+def refresh_feeds_for_restaurant_date(daily_schedule, staff_ids=None):
+    """
+    Restaurant counterpart of refresh_feeds_for_tour_date(): by default
+    the staff on the day now, else the staff_ids the change touched.
+    """
+    if staff_ids is None:
+        staff_ids = restaurant_staff_ids(daily_schedule)
+    _rebuild_feeds(CalendarFeed.objects.filter(staff_id__in=set(staff_ids) - {None}).select_related('staff__user'))
+
+
+def refresh_feeds_for_restaurant_dates(schedules):
+    """Restaurant counterpart of refresh_feeds_for_tour_dates()."""
+    staff_ids = set(
+        StaffShift.objects.filter(
+            daily_schedule__in=schedules,
+            staff__isnull=False
+        ).values_list('staff_id', flat=True)
+    )
+    _rebuild_feeds(CalendarFeed.objects.filter(staff_id__in=staff_ids).select_related('staff__user'))
+
+
+def _rebuild_feeds(feeds):
+    for feed in feeds:
+        rebuild_feed(feed)
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def render_guide_calendar(guide, start, end):
+    """Tour sessions and standby days for a guide, published schedules only."""
+    sessions = TourSession.objects.filter(
+        assigned_guide=guide,
+        daily_schedule__date__gte=start,
+        daily_schedule__date__lte=end,
+        daily_schedule__is_published=True
+    ).select_related('daily_schedule', 'time_slot').order_by('daily_schedule__date', 'time_slot__start_time')
+
+    standby_days = DailySchedule.objects.filter(
+        standby_guide=guide,
+        date__gte=start,
+        date__lte=end,
+        is_published=True
+    ).order_by('date')
+
+    events = []
+    for session in sessions:
+        description = session.get_booking_summary() if session.has_booking_details() else ''
+        events.append(_timed_event(
+            uid=f'tour-{_uid_date(session.daily_schedule.date)}-{session.time_slot.start_time:%H%M}-g{guide.id}',
+            day=session.daily_schedule.date,
+            start_time=session.time_slot.start_time,
+            end_time=session.time_slot.end_time,
+            summary='Tour',
+            description=description,
+            stamp=session.updated_at,
+        ))
+
+    for schedule in standby_days:
+        events.append(_all_day_event(
+            uid=f'standby-{_uid_date(schedule.date)}-g{guide.id}',
+            day=schedule.date,
+            summary='Standby',
+            description=schedule.notes,
+            stamp=schedule.updated_at,
+        ))
+
+    name = guide.user.get_full_name() or guide.user.username
+    return _calendar(f'Tours - {name}', events)
+
+
+def render_staff_calendar(staff, start, end):
+    """Restaurant shifts for a staff member, published schedules only."""
+    shifts = StaffShift.objects.filter(
+        staff=staff,
+        daily_schedule__date__gte=start,
+        daily_schedule__date__lte=end,
+        daily_schedule__is_published=True
+    ).select_related('daily_schedule').order_by('daily_schedule__date', 'start_time')
+
+    events = [
+        _timed_event(
+            uid=f'shift-{_uid_date(shift.daily_schedule.date)}-s{staff.id}',
+            day=shift.daily_schedule.date,
+            start_time=shift.start_time,
+            end_time=shift.end_time,
+            summary=f'{staff.get_staff_type_display()} shift ({shift.duration_hours}h)',
+            description=shift.notes,
+            stamp=shift.updated_at,
+        )
+        for shift in shifts
+    ]
+
+    return _calendar(f'Restaurant shifts - {staff.get_full_name()}', events)
+
+
+def _calendar(name, events):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+        f'X-WR-TIMEZONE:{timezone.get_current_timezone_name()}',
+    ]
+    for event in events:
+        lines.extend(event)
+    lines.append('END:VCALENDAR')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+def _timed_event(uid, day, start_time, end_time, summary, description, stamp):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, start_time), tz)
+    end = timezone.make_aware(datetime.combine(day, end_time), tz)
+    event = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@jiak99',
+        f'DTSTAMP:{_ics_datetime(stamp)}',
+        f'DTSTART:{_ics_datetime(start)}',
+        f'DTEND:{_ics_datetime(end)}',
+        f'SUMMARY:{_escape(summary)}',
+    ]
+    if description:
+        event.append(f'DESCRIPTION:{_escape(description)}')
+    event.append('END:VEVENT')
+    return event
+
+
+def _all_day_event(uid, day, summary, description, stamp):
+    event = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@jiak99',
+        f'DTSTAMP:{_ics_datetime(stamp)}',
+        f'DTSTART;VALUE=DATE:{_uid_date(day)}',
+        f'DTEND;VALUE=DATE:{_uid_date(day + timedelta(days=1))}',
+        f'SUMMARY:{_escape(summary)}',
+        'TRANSP:TRANSPARENT',
+    ]
+    if description:
+        event.append(f'DESCRIPTION:{_escape(description)}')
+    event.append('END:VEVENT')
+    return event
+
+
+def _ics_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _uid_date(day):
+    """
+    Local schedule date as YYYYMMDD.
+
+    Event UIDs are built from the date rather than row ids so they stay
+    stable when shifts are regenerated.
+    """
+    return day.strftime('%Y%m%d')
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold content lines longer than 75 octets (RFC 5545 section 3.1)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Don't split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts)
@@ -0,0 +1,143 @@
+"""
+Append-only schedule change log.
+
+Every write path that changes an assignment, a standby, a shift or a
+day's published flag adds ScheduleChange rows in the same transaction:
+
+    changes = ChangeLog(daily_schedule.site_id)
+    changes.add(day, ScheduleChange.KIND_GUIDE, session.id, old_guide_id, new_guide_id)
+    changes.save()
+
+Rows record the acting user set by ChangeActorMiddleware (or acting_as()
+in scripts); scheduler runs from commands have none. Consumers poll
+changes_since() with the last id they saw instead of rescanning days.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from apps.scheduling.models import ScheduleChange
+
+# Rows returned per changes_since() call at most
+CHANGES_PAGE_MAX = 1000
+
+# Kinds that record an event rather than a value change (an unstaffed
+# shift is added or removed with no staff either side)
+_EVENT_KINDS = {ScheduleChange.KIND_SHIFT_ADDED, ScheduleChange.KIND_SHIFT_REMOVED}
+
+_actor = ContextVar('schedule_change_actor', default=None)
+
+
+@contextmanager
+def acting_as(user):
+    """Attribute changes made inside the block to `user` (may be a lazy request.user)."""
+    token = _actor.set(user)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+class ChangeActorMiddleware:
+    """Attribute a request's schedule changes to the logged-in user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with acting_as(request.user):
+            return self.get_response(request)
+
+
+def current_user_id():
+    """Id of the user changes are attributed to right now, or None."""
+    user = _actor.get()
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+class ChangeLog:
+    """Collects one operation's changes for a single bulk insert."""
+
+    def __init__(self, site_id):
+        self.site_id = site_id
+        self.rows = []
+        self.user_id = current_user_id()
+
+    def add(self, day, kind, object_id, old_value, new_value):
+        """Queue a change; no-ops (old == new) are dropped, except shifts added or removed."""
+        if old_value == new_value and kind not in _EVENT_KINDS:
+            return
+        self.rows.append(ScheduleChange(
+            site_id=self.site_id,
+            date=day,
+            kind=kind,
+            object_id=object_id,
+            old_value=old_value,
+            new_value=new_value,
+            user_id=self.user_id,
+        ))
+
+    def save(self):
+        """Insert the queued rows; call inside the transaction that made the changes."""
+        if self.rows:
+            ScheduleChange.objects.bulk_create(self.rows)
+        count = len(self.rows)
+        self.rows = []
+        return count
+
+
+def record(site_id, day, kind, object_id, old_value, new_value):
+    """Log a single change."""
+    changes = ChangeLog(site_id)
+    changes.add(day, kind, object_id, old_value, new_value)
+    return changes.save()
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def latest_cursor(site):
+    """Id of the site's newest change (0 if none), to start polling from now."""
+    return ScheduleChange.objects.filter(site=site).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def changes_since(site, cursor=0, limit=CHANGES_PAGE_MAX, kinds=None):
+    """
+    The site's changes after `cursor` (an id from a previous call), oldest
+    first, as columnar lists. One index range scan on (site, id).
+
+    Ids are assigned at insert, so on PostgreSQL a long transaction can
+    commit an id below a cursor already handed out; consumers that must
+    not miss a change can re-read from a little before their cursor.
+
+    Returns: dict with
+        - changes: {'id', 'date', 'kind', 'object_id', 'old', 'new', 'user_id', 'at'} lists
+        - cursor: pass back as `cursor` for the next page (unchanged if empty)
+        - has_more: True if more changes are waiting
+    """
+    limit = max(1, min(limit, CHANGES_PAGE_MAX))
+    queryset = ScheduleChange.objects.filter(site=site, id__gt=cursor)
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    rows = list(queryset.order_by('id').values_list(
+        'id', 'date', 'kind', 'object_id', 'old_value', 'new_value', 'user_id', 'created_at'
+    )[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    columns = {key: [] for key in ('id', 'date', 'kind', 'object_id', 'old', 'new', 'user_id', 'at')}
+    for change_id, day, kind, object_id, old_value, new_value, user_id, created_at in rows:
+        columns['id'].append(change_id)
+        columns['date'].append(day.isoformat())
+        columns['kind'].append(kind)
+        columns['object_id'].append(object_id)
+        columns['old'].append(old_value)
+        columns['new'].append(new_value)
+        columns['user_id'].append(user_id)
+        columns['at'].append(created_at.isoformat())
+
+    return {
+        'changes': columns,
+        'cursor': rows[-1][0] if rows else cursor,
+        'has_more': has_more,
+    }
@@ -0,0 +1,246 @@
+"""
+Visitor-demand forecasting from TourSession booking history.
+
+History is rolled up per weekday x time slot from the last HISTORY_WEEKS
+of sessions (visitor_count, visitor_type, booking_channel). Each cell's
+expected demand is an exponentially weighted mean of its weekly
+observations (recent weeks count more, see HALF_LIFE_WEEKS), shrunk
+towards the slot's mean over all weekdays when a cell has little history.
+
+Each site has its own model. The fitted model lives in the cache (keyed by
+site) and is refreshed incrementally: each
+refresh reads only sessions updated since the last one, plus days that
+entered the history window, and refits only the slots they touch.
+Per-date forecasts are cached under the model's generation and the
+version of their weekday's fit, so they are recomputed only after new
+bookings for that weekday arrive (or the model is rebuilt, e.g. after the
+cache lost it, and its versions start again from 0).
+
+Forecasts feed tour slot planning (expected visitors per slot) and a
+restaurant curve: expected tour visitors finishing in each half hour of
+restaurant opening, a proxy for post-tour diners.
+"""
+import secrets
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.scheduling.models import TourSession, TourTimeSlot
+
+HISTORY_WEEKS = 12
+HALF_LIFE_WEEKS = 4     # An observation's weight halves every 4 weeks back
+PRIOR_WEIGHT = 1.0      # Weight of the slot's all-weekday mean in each cell
+
+# Restaurant opening hours covered by the curve (half-hour periods)
+RESTAURANT_OPEN = time(10, 0)
+RESTAURANT_LAST_PERIOD = time(21, 30)
+
+FORECAST_CACHE_TIMEOUT = getattr(settings, 'FORECAST_CACHE_TIMEOUT', 6 * 3600)
+
+_MODEL_KEY = 'scheduling:demand_model:{site_id}'
+
+
+class DemandModel:
+    """Weekday x slot booking history of one site and its fitted demand levels."""
+
+    def __init__(self, site_id):
+        self.site_id = site_id
+        self.history = {}       # (weekday, 'HH:MM') -> {date: (visitors, visitor_type, booking_channel)}
+        self.fitted = {}        # (weekday, 'HH:MM') -> forecast dict for the cell
+        self.versions = [0] * 7  # Bumped when a weekday's fit changes
+        self.generation = secrets.token_hex(8)  # New for each rebuilt model
+        self.synced_at = None   # Latest updated_at read so far
+        self.history_end = None  # History covers dates before this one
+
+    def refresh(self, today):
+        """
+        Bring history up to `today` (exclusive) and refit the slots that
+        changed. Returns the set of refitted slot start times.
+        """
+        window_start = today - timedelta(weeks=HISTORY_WEEKS)
+        rows = TourSession.objects.filter(
+            daily_schedule__site_id=self.site_id,
+            daily_schedule__date__gte=window_start,
+            daily_schedule__date__lt=today
+        )
+        if self.history_end is not None:
+            # Only edits since the last refresh, and days that became history
+            changed = Q(daily_schedule__date__gte=self.history_end)
+            if self.synced_at is not None:
+                changed |= Q(updated_at__gte=self.synced_at)
+            rows = rows.filter(changed)
+
+        dirty_slots = set()
+        for day, start, visitors, visitor_type, channel, updated_at in rows.values_list(
+            'daily_schedule__date', 'time_slot__start_time',
+            'visitor_count', 'visitor_type', 'booking_channel', 'updated_at'
+        ):
+            slot = start.strftime('%H:%M')
+            days = self.history.setdefault((day.weekday(), slot), {})
+            observation = (visitors or 0, visitor_type, channel)
+            if days.get(day) != observation:
+                days[day] = observation
+                dirty_slots.add(slot)
+            if self.synced_at is None or updated_at > self.synced_at:
+                self.synced_at = updated_at
+
+        # Drop days that left the window
+        for (weekday, slot), days in self.history.items():
+            expired = [day for day in days if day < window_start]
+            for day in expired:
+                del days[day]
+            if expired:
+                dirty_slots.add(slot)
+
+        self.history_end = today
+        for slot in dirty_slots:
+            self._fit_slot(slot, today)
+        return dirty_slots
+
+    def _fit_slot(self, slot, today):
+        """Refit the 7 weekday cells of one slot."""
+        def weighted(days):
+            return [
+                (0.5 ** ((today - day).days / 7 / HALF_LIFE_WEEKS), observation)
+                for day, observation in days.items()
+            ]
+
+        cells = {weekday: weighted(self.history.get((weekday, slot), {})) for weekday in range(7)}
+        all_weight = sum(w for obs in cells.values() for w, _ in obs)
+        slot_mean = sum(w * o[0] for obs in cells.values() for w, o in obs) / all_weight if all_weight else 0.0
+
+        for weekday, obs in cells.items():
+            weight = sum(w for w, _ in obs)
+            level = (sum(w * o[0] for w, o in obs) + PRIOR_WEIGHT * slot_mean) / (weight + PRIOR_WEIGHT)
+
+            by_type, by_channel = {}, {}
+            for w, (visitors, visitor_type, channel) in obs:
+                if visitor_type:
+                    by_type[visitor_type] = by_type.get(visitor_type, 0) + w * visitors
+                if channel:
+                    by_channel[channel] = by_channel.get(channel, 0) + w * visitors
+
+            self.fitted[(weekday, slot)] = {
+                'expected_visitors': round(level, 1),
+                'local_share': _shares(by_type).get('local'),
+                'channel_shares': _shares(by_channel),
+                'observations': len(obs),
+            }
+            self.versions[weekday] += 1
+
+    def cell(self, weekday, slot):
+        return self.fitted.get((weekday, slot), {
+            'expected_visitors': 0.0,
+            'local_share': None,
+            'channel_shares': {},
+            'observations': 0,
+        })
+
+
+def _shares(totals):
+    total = sum(totals.values())
+    return {key: round(value / total, 2) for key, value in totals.items()} if total else {}
+
+
+def get_demand_model(site, today=None):
+    """A site's cached model, refreshed up to today; stored back when it changed."""
+    today = today or timezone.localdate()
+    key = _MODEL_KEY.format(site_id=site.id)
+    model = cache.get(key) or DemandModel(site.id)
+    history_end = model.history_end
+    if model.refresh(today) or history_end != today:
+        cache.set(key, model, None)
+    return model
+
+
+def forecast_range(start_date, end_date, site, today=None):
+    """
+    Demand forecast at a site for every date from start_date to end_date.
+
+    Returns a list of per-day dicts:
+        - date, weekday
+        - slots: per time slot, expected_visitors, local_share,
+          channel_shares, observations, and booked_visitors already
+          recorded on the date's session (None if no session)
+        - expected_total / booked_total
+        - restaurant_curve: [{'time': 'HH:MM', 'expected_visitors': x}]
+          for tour visitors finishing in each half hour
+    """
+    model = get_demand_model(site, today)
+    slots = list(TourTimeSlot.objects.filter(site=site).order_by('start_time'))
+
+    booked = {}
+    for day, start, visitors in TourSession.objects.filter(
+        daily_schedule__site=site,
+        daily_schedule__date__range=(start_date, end_date)
+    ).values_list('daily_schedule__date', 'time_slot__start_time', 'visitor_count'):
+        booked[(day, start.strftime('%H:%M'))] = visitors or 0
+
+    # Model part of each day, cached per date, model and weekday fit version
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    keys = {
+        day: f'scheduling:forecast:{site.id}:{day.isoformat()}:{model.generation}:{model.versions[day.weekday()]}'
+        for day in dates
+    }
+    cached = cache.get_many(keys.values())
+    missing = {}
+
+    forecast = []
+    for day in dates:
+        day_forecast = cached.get(keys[day])
+        if day_forecast is None:
+            day_forecast = _forecast_day(model, day, slots)
+            missing[keys[day]] = day_forecast
+
+        day_slots = [
+            {**slot, 'booked_visitors': booked.get((day, slot['start']))}
+            for slot in day_forecast['slots']
+        ]
+        forecast.append({
+            **day_forecast,
+            'slots': day_slots,
+            'booked_total': sum(slot['booked_visitors'] or 0 for slot in day_slots),
+        })
+
+    if missing:
+        cache.set_many(missing, FORECAST_CACHE_TIMEOUT)
+    return forecast
+
+
+def _forecast_day(model, day, slots):
+    weekday = day.weekday()
+    day_slots = []
+    curve = {}
+    for slot in slots:
+        start = slot.start_time.strftime('%H:%M')
+        cell = model.cell(weekday, start)
+        day_slots.append({'time_slot': str(slot), 'start': start, **cell})
+
+        period = _half_hour(slot.end_time)
+        if RESTAURANT_OPEN <= period <= RESTAURANT_LAST_PERIOD:
+            key = period.strftime('%H:%M')
+            curve[key] = curve.get(key, 0) + cell['expected_visitors']
+
+    periods = []
+    minutes = RESTAURANT_OPEN.hour * 60 + RESTAURANT_OPEN.minute
+    last = RESTAURANT_LAST_PERIOD.hour * 60 + RESTAURANT_LAST_PERIOD.minute
+    while minutes <= last:
+        key = f'{minutes // 60:02d}:{minutes % 60:02d}'
+        periods.append({'time': key, 'expected_visitors': round(curve.get(key, 0.0), 1)})
+        minutes += 30
+
+    return {
+        'date': day.isoformat(),
+        'weekday': day.strftime('%A'),
+        'slots': day_slots,
+        'expected_total': round(sum(slot['expected_visitors'] for slot in day_slots), 1),
+        'restaurant_curve': periods,
+    }
+
+
+def _half_hour(value):
+    """Start of the half-hour period containing a time."""
+    return time(value.hour, 0 if value.minute < 30 else 30)
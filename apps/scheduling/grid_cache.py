@@ -0,0 +1,84 @@
+"""
+Fragment caching support for the schedule grid pages.
+
+The grid bodies of schedule_manager.html, schedule_overview.html and
+kitchen_staff_grid.html are wrapped in {% cache %} blocks keyed by the site,
+the date and a version stamp for that site's day. The stamp is derived from the rows the
+grid is drawn from (the day's schedule row, the version/updated_at of its
+sessions or shifts, the active roster and the day's availability), so any
+assignment write produces a new key and the old fragment is never served.
+
+Grid rows are passed to the template as lazy callables, so on a cache hit
+neither the grid queries nor the template loops run.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+
+from apps.guides.models import Guide, GuideAvailability
+from apps.scheduling.models import (
+    DailySchedule, TourSession, DailyRestaurantSchedule, StaffShift, RestaurantStaff
+)
+
+# Upper bound on staleness for changes the stamp can't see (e.g. a user's
+# name edited in the admin)
+GRID_CACHE_TIMEOUT = getattr(settings, 'GRID_CACHE_TIMEOUT', 600)
+
+
+def tour_day_stamp(site, view_date):
+    """Version stamp for everything the tour grids show for one date at a site."""
+    return _stamp(
+        site.id,
+        DailySchedule.objects.filter(site=site, date=view_date).values_list(
+            'id', 'updated_at', 'standby_guide_id', 'is_published'
+        ).first(),
+        TourSession.objects.filter(daily_schedule__site=site, daily_schedule__date=view_date).aggregate(
+            count=Count('id'), versions=Sum('version'), changed=Max('updated_at')
+        ),
+        Guide.objects.filter(site=site, is_active=True).aggregate(
+            count=Count('id'), changed=Max('updated_at')
+        ),
+        GuideAvailability.objects.filter(site=site, date=view_date).aggregate(
+            count=Count('id'), changed=Max('updated_at')
+        ),
+    )
+
+
+def restaurant_day_stamp(site, view_date):
+    """Version stamp for everything the restaurant grid shows for one date at a site."""
+    return _stamp(
+        site.id,
+        DailyRestaurantSchedule.objects.filter(site=site, date=view_date).values_list(
+            'id', 'updated_at', 'is_published'
+        ).first(),
+        StaffShift.objects.filter(daily_schedule__site=site, daily_schedule__date=view_date).aggregate(
+            count=Count('id'), versions=Sum('version'), changed=Max('updated_at')
+        ),
+        RestaurantStaff.objects.filter(site=site, is_active=True).aggregate(
+            count=Count('id'), changed=Max('updated_at')
+        ),
+    )
+
+
+def lazy_grid_context(build, names):
+    """
+    Context entries that call build() only when a template first reads one.
+
+    build() returns a dict holding every name in `names`; it runs at most
+    once per request, and not at all when the cached fragment is served.
+    """
+    built = {}
+
+    def getter(name):
+        def get():
+            if not built:
+                built.update(build())
+            return built[name]
+        return get
+
+    return {name: getter(name) for name in names}
+
+
+def _stamp(*parts):
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()[:16]
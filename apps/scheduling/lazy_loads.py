@@ -0,0 +1,70 @@
+"""
+Development guard against lazy foreign-key loads in scheduler code.
+
+Reading a foreign key that was not select_related() costs one query per
+row, which is easy to miss inside loops. When SCHEDULER_LAZY_LOAD_GUARD is
+on (default: DEBUG), code running under forbid_lazy_loads() raises
+LazyLoadError at the first such access instead of silently querying.
+
+Scheduler entry points are wrapped with @forbid_lazy_loads(); use the
+TourSession/StaffShift for_day() and with_people() queryset helpers to load
+what they read. When the guard is off, forbid_lazy_loads() only sets a flag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+
+_forbidden = ContextVar('scheduler_lazy_loads_forbidden', default=False)
+_installed = False
+
+
+class LazyLoadError(RuntimeError):
+    """Raised when guarded scheduler code reads an FK that wasn't loaded."""
+
+
+@contextmanager
+def forbid_lazy_loads():
+    """Context manager / decorator marking code that must not lazy-load."""
+    token = _forbidden.set(True)
+    try:
+        yield
+    finally:
+        _forbidden.reset(token)
+
+
+@contextmanager
+def allow_lazy_loads():
+    """Re-allow lazy loads inside a guarded block (e.g. a rare fallback)."""
+    token = _forbidden.set(False)
+    try:
+        yield
+    finally:
+        _forbidden.reset(token)
+
+
+def guard_enabled():
+    return getattr(settings, 'SCHEDULER_LAZY_LOAD_GUARD', settings.DEBUG)
+
+
+def install():
+    """Patch FK access to honour forbid_lazy_loads(). Called from AppConfig.ready()."""
+    global _installed
+    if _installed or not guard_enabled():
+        return
+
+    # get_object() only runs on a cache miss: the related row wasn't
+    # select_related, prefetched or assigned, so reading it queries
+    original_get_object = ForwardManyToOneDescriptor.get_object
+
+    def get_object(self, instance):
+        if _forbidden.get():
+            raise LazyLoadError(
+                f"Lazy load of {type(instance).__name__}.{self.field.name} in scheduler code. "
+                f"Load it with select_related('{self.field.name}') or with_people()."
+            )
+        return original_get_object(self, instance)
+
+    ForwardManyToOneDescriptor.get_object = get_object
+    _installed = True
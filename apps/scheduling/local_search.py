@@ -0,0 +1,198 @@
+"""
+Anytime local-search improvement for a day's tour assignments.
+
+Runs after the greedy pass in SchedulingService.auto_schedule_day() when a
+time budget is given. Simulated annealing over two neighbourhoods:
+
+- move: give one session to another guide (or fill an unfilled session)
+- swap: exchange the guides of two sessions
+
+The objective is a weighted sum, lowest first:
+    UNFILLED_COST per unfilled session
+  + STANDBY_TOUR_COST per tour given to the reserved standby
+  + GUIDE_COST per guide working that day
+  + tours**2 per guide (fairness: spreads tours among the guides used)
+
+Each term depends on one guide's tour count, so a move changes the cost of
+at most two guides and its delta is computed in O(1). Feasibility of a move
+is checked only for the receiving guide(s), over their at most
+MAX_TOURS_PER_DAY tours; giving up a tour never breaks the rules.
+
+The best solution seen is kept, so whatever the budget, the result is never
+worse than the greedy input.
+"""
+import math
+import random
+import time as time_module
+
+UNFILLED_COST = 10000
+STANDBY_TOUR_COST = 1000
+GUIDE_COST = 100
+
+MAX_TOURS_PER_DAY = 4
+MAX_CONSECUTIVE_TOURS = 2
+MIN_GAP_MINUTES = 30       # Buffer after every tour
+BREAK_GAP_MINUTES = 90     # 30-min buffer + 60-min break, needed for 3+ tours
+
+# Upper bound on a request's improvement phase, to keep requests short
+MAX_TIME_BUDGET_MS = 10000
+
+# Annealing temperature falls geometrically from START to END over the budget
+START_TEMPERATURE = 150.0
+END_TEMPERATURE = 0.5
+
+
+def improve_assignment(sessions, guides, assignment, fixed_slots=None, standby_id=None,
+                       time_budget_ms=200, seed=0, max_iterations=None):
+    """
+    Improve a day's assignment within time_budget_ms.
+
+    Args:
+        sessions: movable TourSession objects (time_slot loaded)
+        guides: candidate Guide objects (available on the day)
+        assignment: dict session_id -> guide_id or None (the starting solution)
+        fixed_slots: dict guide_id -> [TourTimeSlot] of tours that stay put
+        standby_id: reserved standby guide, penalised per tour
+        time_budget_ms: wall-clock budget; the best solution so far is returned
+        seed: RNG seed; with max_iterations set, runs are reproducible
+        max_iterations: optional cap on moves tried
+
+    Returns: dict with
+        - assignment: improved dict session_id -> guide_id or None
+        - cost_before / cost_after: objective values
+        - iterations: moves tried
+        - elapsed_ms: time spent
+    """
+    started = time_module.perf_counter()
+    deadline = started + time_budget_ms / 1000
+    rng = random.Random(seed)
+    fixed_slots = fixed_slots or {}
+
+    guide_ids = [guide.id for guide in guides]
+    guide_index = {guide_id: g for g, guide_id in enumerate(guide_ids)}
+    spans = [_span(session.time_slot) for session in sessions]
+
+    # Guides each session can go to (type only; timing is checked per move)
+    compatible = [
+        [guide_index[guide.id] for guide in guides if guide.can_work_timeslot(session.time_slot)]
+        for session in sessions
+    ]
+
+    # Current state: who has each session, and each guide's tours (fixed + movable)
+    current = [guide_index.get(assignment.get(session.id)) for session in sessions]
+    tours = [sorted(_span(slot) for slot in fixed_slots.get(guide_id, [])) for guide_id in guide_ids]
+    for i, g in enumerate(current):
+        if g is not None:
+            tours[g].append(spans[i])
+            tours[g].sort()
+    counts = [len(guide_tours) for guide_tours in tours]
+    is_standby = [guide_id == standby_id for guide_id in guide_ids]
+
+    def guide_cost(g, n):
+        cost = (GUIDE_COST if n else 0) + n * n
+        return cost + STANDBY_TOUR_COST * n if is_standby[g] else cost
+
+    cost = UNFILLED_COST * current.count(None) + sum(guide_cost(g, n) for g, n in enumerate(counts))
+    cost_before = cost
+    best_cost, best = cost, list(current)
+
+    iterations = 0
+    if sessions and guides:
+        temperature = START_TEMPERATURE
+        cooling = math.log(END_TEMPERATURE / START_TEMPERATURE)
+        while max_iterations is None or iterations < max_iterations:
+            iterations += 1
+            if iterations % 64 == 0:
+                now = time_module.perf_counter()
+                if now >= deadline:
+                    break
+                temperature = START_TEMPERATURE * math.exp(cooling * (now - started) / (deadline - started))
+
+            i = rng.randrange(len(sessions))
+            a = current[i]
+            if not compatible[i]:
+                continue
+
+            if a is None or rng.random() < 0.5:
+                # Move session i from a (or unfilled) to b
+                b = rng.choice(compatible[i])
+                if b == a or not _fits(tours[b], spans[i]):
+                    continue
+                delta = guide_cost(b, counts[b] + 1) - guide_cost(b, counts[b])
+                if a is None:
+                    delta -= UNFILLED_COST
+                else:
+                    delta += guide_cost(a, counts[a] - 1) - guide_cost(a, counts[a])
+                if not _accept(delta, temperature, rng):
+                    continue
+                if a is not None:
+                    tours[a].remove(spans[i])
+                    counts[a] -= 1
+                tours[b].append(spans[i])
+                tours[b].sort()
+                counts[b] += 1
+                current[i] = b
+                cost += delta
+            else:
+                # Swap the guides of sessions i and j; tour counts are unchanged
+                j = rng.randrange(len(sessions))
+                b = current[j]
+                if b is None or b == a or b not in compatible[i] or a not in compatible[j]:
+                    continue
+                a_tours = [span for span in tours[a] if span != spans[i]]
+                b_tours = [span for span in tours[b] if span != spans[j]]
+                if not (_fits(a_tours, spans[j]) and _fits(b_tours, spans[i])):
+                    continue
+                tours[a] = sorted(a_tours + [spans[j]])
+                tours[b] = sorted(b_tours + [spans[i]])
+                current[i], current[j] = b, a
+
+            if cost < best_cost:
+                best_cost, best = cost, list(current)
+
+    return {
+        'assignment': {
+            session.id: (guide_ids[best[i]] if best[i] is not None else None)
+            for i, session in enumerate(sessions)
+        },
+        'cost_before': cost_before,
+        'cost_after': best_cost,
+        'iterations': iterations,
+        'elapsed_ms': round((time_module.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _span(slot):
+    """(start, end) of a time slot in minutes after midnight."""
+    return (
+        slot.start_time.hour * 60 + slot.start_time.minute,
+        slot.end_time.hour * 60 + slot.end_time.minute,
+    )
+
+
+def _fits(guide_tours, span):
+    """True if adding span to a guide's sorted tours keeps every daily rule."""
+    if len(guide_tours) >= MAX_TOURS_PER_DAY or span in guide_tours:
+        return False
+    spans = sorted(guide_tours + [span])
+
+    consecutive = 1
+    has_break = False
+    for (_, prev_end), (next_start, _) in zip(spans, spans[1:]):
+        gap = next_start - prev_end
+        if gap < MIN_GAP_MINUTES:
+            return False
+        if gap == MIN_GAP_MINUTES:
+            consecutive += 1
+            if consecutive > MAX_CONSECUTIVE_TOURS:
+                return False
+        else:
+            consecutive = 1
+        if gap >= BREAK_GAP_MINUTES:
+            has_break = True
+
+    return len(spans) < 3 or has_break
+
+
+def _accept(delta, temperature, rng):
+    return delta <= 0 or rng.random() < math.exp(-delta / temperature)
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand, CommandError
+from apps.core.models import Site
+from apps.core.sites import site_for_code
 from apps.scheduling.services import SchedulingService
-from apps.scheduling.models import DailySchedule
+from apps.scheduling.models import DailySchedule, SchedulerRun
 from datetime import date, datetime
 import calendar
 
@@ -26,6 +28,22 @@ class Command(BaseCommand):
             dest='assign_standby',
             help='Do not assign standby guide'
         )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Tie-breaking seed (defaults to one derived from the date)'
+        )
+        parser.add_argument(
+            '--time-budget-ms',
+            type=int,
+            default=0,
+            help='Improve the greedy result by local search for up to this many milliseconds'
+        )
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Site code (defaults to the default site)'
+        )
 
     def handle(self, *args, **options):
         # Parse date
@@ -39,11 +57,16 @@ class Command(BaseCommand):
 
         assign_standby = options['assign_standby']
 
-        self.stdout.write(f"Auto-scheduling guides for {target_date}...")
+        try:
+            site = site_for_code(options['site'])
+        except Site.DoesNotExist:
+            raise CommandError(f"Unknown site: {options['site']}")
+
+        self.stdout.write(f"Auto-scheduling guides for {target_date} at {site}...")
 
         # Get or create daily schedule
         try:
-            daily_schedule = DailySchedule.objects.get(date=target_date)
+            daily_schedule = DailySchedule.objects.get(site=site, date=target_date)
         except DailySchedule.DoesNotExist:
             raise CommandError(
                 f"No schedule found for {target_date}. "
@@ -51,27 +74,32 @@ class Command(BaseCommand):
             )
 
         # Run auto-scheduler
-        service = SchedulingService()
-        results = service.auto_schedule_day(daily_schedule, assign_standby=assign_standby)
+        service = SchedulingService(site)
+        results = service.auto_schedule_day(
+            daily_schedule,
+            assign_standby=assign_standby,
+            seed=options['seed'],
+            time_budget_ms=options['time_budget_ms'],
+            source=SchedulerRun.SOURCE_COMMAND
+        )
 
         # Calculate guide utilization
         from apps.scheduling.models import TourSession
         from apps.guides.models import Guide
 
         sessions_by_guide = {}
-        assigned_sessions = TourSession.objects.filter(
-            daily_schedule=daily_schedule,
+        assigned_sessions = TourSession.objects.for_day(daily_schedule).filter(
             assigned_guide__isnull=False
-        ).select_related('assigned_guide')
+        )
 
         for session in assigned_sessions:
-            guide_id = session.assigned_guide.id
-            if guide_id not in sessions_by_guide:
-                sessions_by_guide[guide_id] = []
-            sessions_by_guide[guide_id].append(session)
+            guide = session.assigned_guide
+            if guide not in sessions_by_guide:
+                sessions_by_guide[guide] = []
+            sessions_by_guide[guide].append(session)
 
         guides_used = len(sessions_by_guide)
-        total_guides = Guide.objects.filter(is_active=True).count()
+        total_guides = Guide.objects.filter(site=site, is_active=True).count()
 
         # Display results
         self.stdout.write("\n" + "="*60)
@@ -99,8 +127,7 @@ class Command(BaseCommand):
                     key=lambda x: len(x[1]),
                     reverse=True
                 )
-                for guide_id, sessions_list in sorted_guides:
-                    guide = Guide.objects.get(id=guide_id)
+                for guide, sessions_list in sorted_guides:
                     self.stdout.write(
                         f"  - {guide.user.username}: {len(sessions_list)} tours"
                     )
@@ -121,17 +148,13 @@ class Command(BaseCommand):
         # Show unfillable sessions details
         if results['unfillable_sessions']:
             self.stdout.write("\nUnfillable sessions:")
-            from apps.scheduling.models import TourSession
-            for session_id in results['unfillable_sessions']:
-                try:
-                    session = TourSession.objects.get(id=session_id)
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"  - {session.time_slot} (no eligible guides)"
-                        )
+            unfillable = TourSession.objects.with_people().filter(id__in=results['unfillable_sessions'])
+            for session in unfillable:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"  - {session.time_slot} (no eligible guides)"
                     )
-                except TourSession.DoesNotExist:
-                    pass
+                )
 
         # Show standby assignment
         daily_schedule.refresh_from_db()
@@ -151,6 +174,15 @@ class Command(BaseCommand):
 
         self.stdout.write("\n" + "="*60)
         self.stdout.write(f"Coverage: {assigned_sessions}/{total_sessions} sessions ({coverage_pct}%)")
+        self.stdout.write(f"Seed: {results['seed']}  Fingerprint: {results['fingerprint']}")
+        run = SchedulerRun.objects.get(id=results['run_id'])
+        self.stdout.write(f"Run #{run.id}: {run.total_ms} ms, {run.queries} queries ({run.phase_ms})")
+        if results.get('improvement'):
+            improvement = results['improvement']
+            self.stdout.write(
+                f"Local search: cost {improvement['cost_before']} -> {improvement['cost_after']} "
+                f"({improvement['iterations']} moves in {improvement['elapsed_ms']} ms)"
+            )
         self.stdout.write("="*60)
 
         self.stdout.write("\nNext steps:")
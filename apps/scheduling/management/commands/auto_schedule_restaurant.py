@@ -2,7 +2,9 @@
 Management command to auto-assign restaurant staff for a specific date.
 """
 from django.core.management.base import BaseCommand, CommandError
-from apps.scheduling.models import DailyRestaurantSchedule
+from apps.core.models import Site
+from apps.core.sites import site_for_code
+from apps.scheduling.models import DailyRestaurantSchedule, SchedulerRun
 from apps.scheduling.services import RestaurantSchedulingService
 from datetime import datetime, date
 
@@ -24,6 +26,11 @@ class Command(BaseCommand):
             choices=['mixed', 'all_8h'],
             help='Shift pattern: mixed (default, 4h+8h) or all_8h'
         )
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Site code (defaults to the default site)'
+        )
 
     def handle(self, *args, **options):
         date_str = options['date']
@@ -35,13 +42,19 @@ class Command(BaseCommand):
         except ValueError:
             raise CommandError(f'Invalid date format: {date_str}. Use YYYY-MM-DD')
 
-        self.stdout.write(f'Auto-scheduling restaurant staff for {target_date}...\n')
+        try:
+            site = site_for_code(options['site'])
+        except Site.DoesNotExist:
+            raise CommandError(f"Unknown site: {options['site']}")
+
+        self.stdout.write(f'Auto-scheduling restaurant staff for {target_date} at {site}...\n')
 
         # Create service
-        service = RestaurantSchedulingService()
+        service = RestaurantSchedulingService(site)
 
         # Get or create daily schedule
         daily_schedule, created = DailyRestaurantSchedule.objects.get_or_create(
+            site=site,
             date=target_date
         )
 
@@ -52,7 +65,9 @@ class Command(BaseCommand):
 
         # Run auto-scheduler
         self.stdout.write(f'\nRunning auto-scheduler (pattern: {pattern})...')
-        results = service.auto_schedule_day(daily_schedule, pattern=pattern)
+        results = service.auto_schedule_day(
+            daily_schedule, pattern=pattern, source=SchedulerRun.SOURCE_COMMAND
+        )
 
         # Display results
         self.stdout.write('\n' + '=' * 60)
@@ -62,6 +77,8 @@ class Command(BaseCommand):
         self.stdout.write(f'Serving staff assigned: {results["serving_assigned"]}')
         self.stdout.write(f'Total staff assigned:   {results["total_staff"]}')
         self.stdout.write(f'Unfillable shifts:      {results["unfillable_count"]}')
+        run = SchedulerRun.objects.get(id=results['run_id'])
+        self.stdout.write(f'Run #{run.id}: {run.total_ms} ms, {run.queries} queries')
 
         if results['errors']:
             self.stdout.write('\n' + self.style.WARNING('Errors:'))
@@ -1,4 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
+from apps.core.models import Site
+from apps.core.sites import site_for_code
 from apps.scheduling.services import SchedulingService
 from datetime import date
 import calendar
@@ -19,6 +21,11 @@ class Command(BaseCommand):
             required=True,
             help='Month number (1-12)'
         )
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Site code (defaults to the default site)'
+        )
 
     def handle(self, *args, **options):
         month = options['month']
@@ -40,9 +47,14 @@ class Command(BaseCommand):
 
         month_name = calendar.month_name[month]
 
-        self.stdout.write(f"Creating schedule for {month_name} {year}...")
+        try:
+            site = site_for_code(options['site'])
+        except Site.DoesNotExist:
+            raise CommandError(f"Unknown site: {options['site']}")
+
+        self.stdout.write(f"Creating schedule for {month_name} {year} at {site}...")
 
-        service = SchedulingService()
+        service = SchedulingService(site)
 
         try:
             total_sessions, schedules = service.generate_sessions_for_month(year, month)
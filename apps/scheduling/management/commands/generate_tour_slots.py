@@ -1,14 +1,28 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.models import Site
+from apps.core.sites import site_for_code
 from apps.scheduling.services import SchedulingService
 
 
 class Command(BaseCommand):
-    help = 'Generate all tour time slots (10:00am-9:30pm, every 30 minutes, 1.5-hour tours)'
+    help = 'Generate tour time slots for the slot templates (default: 10am-8pm on the hour, 1.5-hour tours)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Site code (defaults to the default site)'
+        )
 
     def handle(self, *args, **options):
-        service = SchedulingService()
+        try:
+            site = site_for_code(options['site'])
+        except Site.DoesNotExist:
+            raise CommandError(f"Unknown site: {options['site']}")
+
+        service = SchedulingService(site)
 
-        self.stdout.write("Generating tour time slots...")
+        self.stdout.write(f"Generating tour time slots for {site}...")
 
         try:
             slots_created = service.generate_tour_time_slots()
@@ -25,8 +39,8 @@ class Command(BaseCommand):
                 )
 
             from apps.scheduling.models import TourTimeSlot
-            total_slots = TourTimeSlot.objects.count()
-            self.stdout.write(f"Total time slots in system: {total_slots}")
+            total_slots = TourTimeSlot.objects.filter(site=site).count()
+            self.stdout.write(f"Total time slots at {site}: {total_slots}")
 
         except Exception as e:
             self.stdout.write(
@@ -0,0 +1,35 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from apps.scheduling.rosters import rebuild_all_rosters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialised published rosters for guides and restaurant staff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            type=str,
+            help='First date to rebuild (YYYY-MM-DD). Defaults to one week ago.'
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options['start']:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+
+        self.stdout.write("Rebuilding published rosters...")
+
+        try:
+            tour_days, restaurant_days = rebuild_all_rosters(start)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Rebuilt rosters from {tour_days} tour day(s) and {restaurant_days} restaurant day(s)"
+                )
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f"Error rebuilding rosters: {str(e)}")
+            )
+            raise
@@ -1,87 +1,111 @@
-from django.core.management.base import BaseCommand
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from apps.scheduling.models import TourTimeSlot, TourSession, DailySchedule
-from apps.scheduling.services import SchedulingService
+from django.utils import timezone
+
+from apps.core.models import Site
+from apps.core.sites import site_for_code
+from apps.scheduling.models import SlotTemplate, SlotTemplateEntry, DailySchedule
+from apps.scheduling.slot_templates import DEFAULT_SLOT_STARTS, DEFAULT_TOUR_MINUTES, migrate_sessions
 
 
 class Command(BaseCommand):
-    help = 'Regenerate tour time slots with new timing (10am-9:30pm, 1.5-hour tours)'
+    help = (
+        'Move a site\'s future tour sessions onto its current slot templates '
+        '(Admin -> Slot templates). Past and published days are not touched.'
+    )
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            type=str,
+            help='First date to migrate, YYYY-MM-DD (default: tomorrow)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            type=str,
+            help='Last date to migrate, YYYY-MM-DD (default: last schedule)'
+        )
         parser.add_argument(
             '--confirm',
             action='store_true',
-            help='Confirm deletion of old time slots and associated sessions'
+            help='Apply the changes (without it, only show what would change)'
+        )
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Site code (defaults to the default site)'
         )
 
     def handle(self, *args, **options):
-        if not options['confirm']:
-            self.stdout.write(
-                self.style.WARNING(
-                    "\nWARNING: This will DELETE all existing time slots and tour sessions!\n"
-                    "\nThis action cannot be undone.\n"
-                    "\nTo proceed, run:\n"
-                    "  python manage.py regenerate_tour_slots --confirm\n"
-                )
-            )
-            return
-
-        self.stdout.write(self.style.WARNING("\nStarting time slot regeneration...\n"))
-
         try:
-            with transaction.atomic():
-                # Count existing data
-                old_slots = TourTimeSlot.objects.count()
-                old_sessions = TourSession.objects.count()
-                old_schedules = DailySchedule.objects.count()
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError("Invalid date format. Use YYYY-MM-DD")
 
-                self.stdout.write(f"Found {old_slots} existing time slots")
-                self.stdout.write(f"Found {old_sessions} existing tour sessions")
-                self.stdout.write(f"Found {old_schedules} existing daily schedules")
+        if start is not None and start <= timezone.localdate():
+            raise CommandError("Only future dates can be migrated; --from must be after today")
 
-                # Delete tour sessions first (they reference time slots)
-                self.stdout.write("\nDeleting tour sessions...")
-                TourSession.objects.all().delete()
-                self.stdout.write(self.style.SUCCESS("+ Tour sessions deleted"))
+        try:
+            site = site_for_code(options['site'])
+        except Site.DoesNotExist:
+            raise CommandError(f"Unknown site: {options['site']}")
 
-                # Now delete time slots
-                self.stdout.write("Deleting old time slots...")
-                TourTimeSlot.objects.all().delete()
-                self.stdout.write(self.style.SUCCESS("+ Old time slots deleted"))
+        dry_run = not options['confirm']
 
-                # Generate new time slots
-                self.stdout.write("\nGenerating new time slots (10am-9:30pm, 1.5-hour tours)...")
-                service = SchedulingService()
-                slots_created = service.generate_tour_time_slots()
+        with transaction.atomic():
+            if not SlotTemplate.objects.filter(site=site).exists():
+                self._create_default_template(site)
 
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"+ Created {slots_created} new time slots"
-                    )
-                )
+            summary = migrate_sessions(site, start, end, dry_run=dry_run)
+            if dry_run:
+                # Also drops the default template created above
+                transaction.set_rollback(True)
 
-                # Show what was created
-                new_slots = TourTimeSlot.objects.all().order_by('start_time')
+        self.stdout.write(f"\nTour slot migration at {site}, {summary['start_date']} to {summary['end_date']}")
+        self.stdout.write(f"  Days changed:        {summary['days_migrated']}")
+        self.stdout.write(f"  Sessions kept:       {summary['kept']}")
+        self.stdout.write(f"  Sessions moved:      {summary['remapped']} (same start, new length)")
+        self.stdout.write(f"  Sessions created:    {summary['created']}")
+        self.stdout.write(f"  Sessions removed:    {summary['deleted']}")
 
-                self.stdout.write("\nNew Time Slots:")
-                for slot in new_slots[:5]:
-                    self.stdout.write(f"  - {slot}")
-                if new_slots.count() > 5:
-                    self.stdout.write(f"  ... and {new_slots.count() - 5} more")
+        if summary['skipped_published']:
+            self.stdout.write(self.style.WARNING(
+                f"  Skipped published days: {', '.join(summary['skipped_published'])}"
+            ))
+        if summary['kept_with_bookings']:
+            self.stdout.write(self.style.WARNING(
+                f"  Kept {len(summary['kept_with_bookings'])} session(s) outside the template "
+                f"because they have booking details"
+            ))
+        for removed in summary['unassigned_guides']:
+            self.stdout.write(self.style.WARNING(
+                f"  Guide {removed['guide_id']} loses {removed['date']} {removed['time_slot']}"
+            ))
 
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"\n>>> Successfully regenerated time slots!"
-                        f"\n\nSummary:"
-                        f"\n  Old slots: {old_slots}"
-                        f"\n  New slots: {slots_created}"
-                        f"\n\nNote: You'll need to recreate schedules for any dates."
-                        f"\n  Use: python manage.py create_monthly_schedule --month <month>"
-                    )
-                )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                "\nDry run, nothing changed. To apply, run:\n"
+                f"  python manage.py regenerate_tour_slots --confirm --site {site.code}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("\n+ Tour slots migrated"))
 
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f"\nError: {str(e)}")
-            )
-            raise
+    def _create_default_template(self, site):
+        """First run at a site: capture the built-in pattern as its first template."""
+        first_day = DailySchedule.objects.filter(site=site).order_by('date').values_list('date', flat=True).first()
+        template = SlotTemplate.objects.create(
+            site=site,
+            name='Default',
+            effective_from=first_day or timezone.localdate(),
+            notes='Created from the built-in pattern (10am-8pm on the hour, 1.5-hour tours)'
+        )
+        SlotTemplateEntry.objects.bulk_create([
+            SlotTemplateEntry(template=template, start_time=start, duration_minutes=DEFAULT_TOUR_MINUTES)
+            for start in DEFAULT_SLOT_STARTS
+        ])
+        self.stdout.write(f"No slot templates yet; created {template}")
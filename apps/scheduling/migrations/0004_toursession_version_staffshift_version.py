@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0003_dailyrestaurantschedule_restaurantstaff_staffshift_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staffshift',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented on every edit; used to detect concurrent changes'),
+        ),
+        migrations.AddField(
+            model_name='toursession',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented on every edit; used to detect concurrent changes'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0002_guideavailability_unavailable_index'),
+        ('scheduling', '0004_toursession_version_staffshift_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='staffavailability',
+            index=models.Index(condition=models.Q(('is_available', False)), fields=['date', 'staff'], name='staffavail_unavailable_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staffshift',
+            index=models.Index(fields=['daily_schedule', 'staff'], name='staffshift_day_staff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='toursession',
+            index=models.Index(fields=['assigned_guide', 'daily_schedule'], name='toursession_guide_day_idx'),
+        ),
+    ]
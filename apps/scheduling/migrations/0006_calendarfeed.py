@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:53
+
+import apps.scheduling.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0002_guideavailability_unavailable_index'),
+        ('scheduling', '0005_scheduler_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=apps.scheduling.models._new_feed_token, editable=False, max_length=64, unique=True)),
+                ('body', models.TextField(blank=True)),
+                ('etag', models.CharField(blank=True, max_length=64)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('guide', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed', to='guides.guide')),
+                ('staff', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed', to='scheduling.restaurantstaff')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='calendarfeed',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('guide__isnull', False), ('staff__isnull', True)), models.Q(('guide__isnull', True), ('staff__isnull', False)), _connector='OR'), name='calendarfeed_one_owner'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0002_guideavailability_unavailable_index'),
+        ('scheduling', '0006_calendarfeed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedRoster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('guide', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='published_roster', to='guides.guide')),
+                ('staff', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='published_roster', to='scheduling.restaurantstaff')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='publishedroster',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('guide__isnull', False), ('staff__isnull', True)), models.Q(('guide__isnull', True), ('staff__isnull', False)), _connector='OR'), name='publishedroster_one_owner'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0007_publishedroster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tour', 'Tour guides'), ('restaurant', 'Restaurant staff')], max_length=20)),
+                ('source', models.CharField(choices=[('api', 'Schedule Manager / API'), ('command', 'Management command'), ('batch', 'Batch'), ('other', 'Other')], default='other', max_length=20)),
+                ('date', models.DateField(help_text='Schedule date that was solved')),
+                ('algorithm', models.CharField(max_length=50)),
+                ('seed', models.BigIntegerField(blank=True, null=True)),
+                ('inputs_hash', models.CharField(help_text='Hash of the data and options the run was given', max_length=16)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('total_ms', models.FloatField()),
+                ('phase_ms', models.JSONField(default=dict)),
+                ('queries', models.PositiveIntegerField(default=0)),
+                ('phase_queries', models.JSONField(default=dict)),
+                ('candidates_evaluated', models.PositiveIntegerField(default=0)),
+                ('assigned_count', models.PositiveIntegerField(default=0)),
+                ('unfillable_count', models.PositiveIntegerField(default=0)),
+                ('objective', models.JSONField(default=dict)),
+                ('fingerprint', models.CharField(blank=True, max_length=16)),
+            ],
+            options={
+                'ordering': ['-started_at', '-id'],
+                'indexes': [models.Index(fields=['kind', 'date'], name='schedulerrun_kind_date_idx'), models.Index(fields=['started_at'], name='schedulerrun_started_idx')],
+            },
+        ),
+    ]
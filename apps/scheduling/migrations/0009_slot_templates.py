@@ -0,0 +1,46 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0008_schedulerrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('version', models.PositiveIntegerField(editable=False, unique=True)),
+                ('effective_from', models.DateField()),
+                ('effective_to', models.DateField(blank=True, help_text='Leave blank for open-ended', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-effective_from', '-version'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotTemplateEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Blank: every weekday that has no entries of its own', null=True)),
+                ('start_time', models.TimeField()),
+                ('duration_minutes', models.PositiveIntegerField(default=90)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='scheduling.slottemplate')),
+            ],
+            options={
+                'verbose_name_plural': 'Slot template entries',
+                'ordering': ['weekday', 'start_time'],
+                'unique_together': {('template', 'weekday', 'start_time')},
+            },
+        ),
+    ]
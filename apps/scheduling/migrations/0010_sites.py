@@ -0,0 +1,104 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:29
+
+import apps.core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('scheduling', '0009_slot_templates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='schedulerrun',
+            name='schedulerrun_kind_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='staffavailability',
+            name='staffavail_unavailable_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='tourtimeslot',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='dailyrestaurantschedule',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.PROTECT, related_name='daily_restaurant_schedules', to='core.site'),
+        ),
+        migrations.AddField(
+            model_name='dailyschedule',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.PROTECT, related_name='daily_schedules', to='core.site'),
+        ),
+        migrations.AddField(
+            model_name='restaurantstaff',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.PROTECT, related_name='restaurant_staff', to='core.site'),
+        ),
+        migrations.AddField(
+            model_name='schedulerrun',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.CASCADE, related_name='scheduler_runs', to='core.site'),
+        ),
+        migrations.AddField(
+            model_name='slottemplate',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.PROTECT, related_name='slot_templates', to='core.site'),
+        ),
+        migrations.AddField(
+            model_name='staffavailability',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.site'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tourtimeslot',
+            name='site',
+            field=models.ForeignKey(default=apps.core.models.default_site_id, on_delete=django.db.models.deletion.PROTECT, related_name='tour_time_slots', to='core.site'),
+        ),
+        migrations.AlterField(
+            model_name='dailyrestaurantschedule',
+            name='date',
+            field=models.DateField(help_text='Date for this restaurant schedule'),
+        ),
+        migrations.AlterField(
+            model_name='dailyschedule',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyrestaurantschedule',
+            unique_together={('site', 'date')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyschedule',
+            unique_together={('site', 'date')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tourtimeslot',
+            unique_together={('site', 'start_time', 'end_time')},
+        ),
+        migrations.AddIndex(
+            model_name='restaurantstaff',
+            index=models.Index(fields=['site', 'is_active', 'staff_type'], name='staff_site_active_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedulerrun',
+            index=models.Index(fields=['site', 'kind', 'date'], name='schedulerrun_site_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slottemplate',
+            index=models.Index(fields=['site', 'effective_from'], name='slottemplate_site_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staffavailability',
+            index=models.Index(condition=models.Q(('is_available', False)), fields=['site', 'date', 'staff'], name='staffavail_unavailable_idx'),
+        ),
+    ]
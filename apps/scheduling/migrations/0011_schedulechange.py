@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('scheduling', '0010_sites'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Schedule date the change belongs to')),
+                ('kind', models.CharField(choices=[('guide', 'Tour guide'), ('standby', 'Standby guide'), ('tour_published', 'Tour day published'), ('shift_staff', 'Shift staff'), ('shift_added', 'Shift added'), ('shift_removed', 'Shift removed'), ('restaurant_published', 'Restaurant day published')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField(help_text='Session, schedule or shift id, by kind')),
+                ('old_value', models.BigIntegerField(blank=True, null=True)),
+                ('new_value', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.site')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['site', 'id'], name='schedulechange_site_cursor_idx')],
+            },
+        ),
+    ]
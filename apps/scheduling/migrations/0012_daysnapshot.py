@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('scheduling', '0011_schedulechange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DaySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tour', 'Tour day'), ('restaurant', 'Restaurant day')], max_length=10)),
+                ('date', models.DateField()),
+                ('stack', models.CharField(choices=[('undo', 'Undo'), ('redo', 'Redo')], max_length=4)),
+                ('label', models.CharField(help_text="The edit this level undoes, e.g. 'Clear all'", max_length=50)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.site')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['site', 'kind', 'date', 'stack', 'id'], name='daysnapshot_stack_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0012_daysnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schedulerrun',
+            name='source',
+            field=models.CharField(choices=[('api', 'Schedule Manager / API'), ('command', 'Management command'), ('sandbox', 'What-if scenario'), ('other', 'Other')], default='other', max_length=20),
+        ),
+    ]
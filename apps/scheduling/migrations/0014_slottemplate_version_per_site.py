@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('scheduling', '0013_schedulerrun_source_sandbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='slottemplate',
+            name='version',
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='slottemplate',
+            unique_together={('site', 'version')},
+        ),
+    ]
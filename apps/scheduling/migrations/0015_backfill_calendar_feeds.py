@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:40
+
+import secrets
+
+from django.db import migrations
+
+
+def create_missing_feeds(apps, schema_editor):
+    """Feeds are now created with the person; give existing people theirs."""
+    CalendarFeed = apps.get_model('scheduling', 'CalendarFeed')
+    Guide = apps.get_model('guides', 'Guide')
+    RestaurantStaff = apps.get_model('scheduling', 'RestaurantStaff')
+    CalendarFeed.objects.bulk_create(
+        [
+            CalendarFeed(guide_id=guide_id, token=secrets.token_urlsafe(32))
+            for guide_id in Guide.objects.filter(calendar_feed__isnull=True).values_list('id', flat=True)
+        ] + [
+            CalendarFeed(staff_id=staff_id, token=secrets.token_urlsafe(32))
+            for staff_id in RestaurantStaff.objects.filter(calendar_feed__isnull=True).values_list('id', flat=True)
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0002_guideavailability_unavailable_index'),
+        ('scheduling', '0014_slottemplate_version_per_site'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0015_backfill_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyschedule',
+            name='published_at',
+            field=models.DateTimeField(blank=True, help_text='When this schedule was published', null=True),
+        ),
+    ]
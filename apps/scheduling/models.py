@@ -1,18 +1,57 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from apps.core.models import Site, default_site_id
 from apps.guides.models import Guide
 from datetime import datetime, timedelta
 
 
+class VersionConflict(Exception):
+    """Raised when a row was changed by another editor since it was read."""
+
+    def __init__(self, instance):
+        self.instance = instance
+        super().__init__(
+            f"{instance._meta.verbose_name.capitalize()} {instance.pk} was modified by someone else. "
+            "Reload and try again."
+        )
+
+
+def _update_versioned(instance, expected_version, fields):
+    """
+    Write only `fields` of `instance` with UPDATE ... WHERE version = expected_version.
+
+    Bumps the version on success. Raises VersionConflict (carrying the
+    current database row) if another write got there first.
+    """
+    model = type(instance)
+    changes = {
+        model._meta.get_field(name).attname: getattr(instance, model._meta.get_field(name).attname)
+        for name in fields
+    }
+    now = timezone.now()
+    changes['updated_at'] = now
+    changes['version'] = F('version') + 1
+
+    updated = model.objects.filter(pk=instance.pk, version=expected_version).update(**changes)
+    if not updated:
+        raise VersionConflict(model.objects.get(pk=instance.pk))
+
+    instance.version = expected_version + 1
+    instance.updated_at = now
+
+
 class TourTimeSlot(models.Model):
     """Predefined tour time slots (e.g., 8:30am-10:30am)."""
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, default=default_site_id, related_name='tour_time_slots')
     start_time = models.TimeField()
     end_time = models.TimeField()
     duration_minutes = models.IntegerField()
 
     class Meta:
         ordering = ['start_time']
-        unique_together = ['start_time', 'end_time']
+        unique_together = ['site', 'start_time', 'end_time']
 
     def __str__(self):
         return f"{self.start_time.strftime('%I:%M %p')} - {self.end_time.strftime('%I:%M %p')}"
@@ -44,9 +83,89 @@ class TourTimeSlot(models.Model):
         super().save(*args, **kwargs)
 
 
+class SlotTemplate(models.Model):
+    """
+    Versioned set of tour start times, effective for a date range.
+
+    The active template with the latest effective_from covering a date
+    decides that date's slots (see apps.scheduling.slot_templates). To
+    change the schedule, add a new version effective from the change date
+    instead of editing one already in use, then migrate future sessions.
+    Each site has its own templates.
+    """
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, default=default_site_id, related_name='slot_templates')
+    name = models.CharField(max_length=100)
+    version = models.PositiveIntegerField(editable=False)
+    effective_from = models.DateField()
+    effective_to = models.DateField(null=True, blank=True, help_text="Leave blank for open-ended")
+    is_active = models.BooleanField(default=True)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-effective_from', '-version']
+        unique_together = ['site', 'version']
+        indexes = [
+            models.Index(fields=['site', 'effective_from'], name='slottemplate_site_from_idx'),
+        ]
+
+    def __str__(self):
+        until = f" to {self.effective_to}" if self.effective_to else ""
+        return f"{self.name} v{self.version} (from {self.effective_from}{until})"
+
+    def clean(self):
+        if self.effective_from and self.effective_to and self.effective_to < self.effective_from:
+            raise ValidationError("Effective to must be on or after effective from.")
+
+    def save(self, *args, **kwargs):
+        if self.version:
+            return super().save(*args, **kwargs)
+        # Versions count up per site; lock the site row so two templates
+        # saved at once can't both take the same next number.
+        with transaction.atomic():
+            Site.objects.select_for_update().filter(pk=self.site_id).first()
+            latest = SlotTemplate.objects.filter(site_id=self.site_id).aggregate(models.Max('version'))['version__max']
+            self.version = (latest or 0) + 1
+            super().save(*args, **kwargs)
+
+
+class SlotTemplateEntry(models.Model):
+    """One tour start time in a template, for every day or one weekday."""
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    template = models.ForeignKey(SlotTemplate, on_delete=models.CASCADE, related_name='entries')
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAY_CHOICES,
+        null=True,
+        blank=True,
+        help_text="Blank: every weekday that has no entries of its own"
+    )
+    start_time = models.TimeField()
+    duration_minutes = models.PositiveIntegerField(default=90)
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        unique_together = ['template', 'weekday', 'start_time']
+        verbose_name_plural = 'Slot template entries'
+
+    def __str__(self):
+        day = self.get_weekday_display() if self.weekday is not None else 'Every day'
+        return f"{day} {self.start_time.strftime('%H:%M')} ({self.duration_minutes} min)"
+
+
 class DailySchedule(models.Model):
-    """Metadata for a day's schedule."""
-    date = models.DateField(unique=True)
+    """Metadata for a day's schedule at one site."""
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, default=default_site_id, related_name='daily_schedules')
+    date = models.DateField()
     standby_guide = models.ForeignKey(
         Guide,
         on_delete=models.SET_NULL,
@@ -55,12 +174,14 @@ class DailySchedule(models.Model):
         related_name='standby_days'
     )
     is_published = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True, help_text="When this schedule was published")
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['date']
+        unique_together = ['site', 'date']
         verbose_name_plural = 'Daily schedules'
 
     def __str__(self):
@@ -82,6 +203,25 @@ class DailySchedule(models.Model):
         return service.validate_daily_schedule(self)
 
 
+class TourSessionQuerySet(models.QuerySet):
+    """
+    Session queries that join everything __str__, date and the scheduler
+    read, so loops over the results don't load each relation per row.
+    """
+
+    def with_people(self):
+        """Join the day, time slot and assigned guide (with user)."""
+        return self.select_related('daily_schedule', 'time_slot', 'assigned_guide__user')
+
+    def for_day(self, day):
+        """Sessions of one day (a date or DailySchedule) in time order, with_people()."""
+        if isinstance(day, models.Model):
+            queryset = self.filter(daily_schedule=day)
+        else:
+            queryset = self.filter(daily_schedule__date=day)
+        return queryset.with_people().order_by('time_slot__start_time')
+
+
 class TourSession(models.Model):
     """A specific tour instance on a specific date."""
     STATUS_CHOICES = [
@@ -138,12 +278,24 @@ class TourSession(models.Model):
     )
 
     notes = models.TextField(blank=True)
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented on every edit; used to detect concurrent changes"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TourSessionQuerySet.as_manager()
+
     class Meta:
         ordering = ['daily_schedule__date', 'time_slot__start_time']
         unique_together = ['daily_schedule', 'time_slot']
+        indexes = [
+            # A guide's sessions on a day (break checks) or across a date range.
+            # Also covers unassigned counts per day (assigned_guide IS NULL).
+            models.Index(fields=['assigned_guide', 'daily_schedule'], name='toursession_guide_day_idx'),
+        ]
 
     def __str__(self):
         guide_name = self.assigned_guide.user.get_full_name() if self.assigned_guide else "Unassigned"
@@ -154,6 +306,16 @@ class TourSession(models.Model):
         """Convenience property to get the session date."""
         return self.daily_schedule.date
 
+    def save(self, *args, **kwargs):
+        # Any plain save invalidates versions handed out to other editors
+        if self.pk:
+            self.version += 1
+        super().save(*args, **kwargs)
+
+    def save_versioned(self, expected_version, fields):
+        """Save only the given fields, failing with VersionConflict if the row changed."""
+        _update_versioned(self, expected_version, fields)
+
     def get_validation_errors(self):
         """Get validation errors for this session assignment."""
         if not self.assigned_guide:
@@ -232,6 +394,12 @@ class ShiftSwapRequest(models.Model):
 # RESTAURANT STAFF SCHEDULING MODELS
 # ============================================================================
 
+class RestaurantStaffQuerySet(models.QuerySet):
+    def with_people(self):
+        """Join the user, read by __str__ and get_full_name()."""
+        return self.select_related('user')
+
+
 class RestaurantStaff(models.Model):
     """Kitchen or Serving staff member."""
 
@@ -240,6 +408,7 @@ class RestaurantStaff(models.Model):
         ('serving', 'Serving Staff'),
     ]
 
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, default=default_site_id, related_name='restaurant_staff')
     user = models.OneToOneField(
         'auth.User',
         on_delete=models.CASCADE,
@@ -264,8 +433,14 @@ class RestaurantStaff(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RestaurantStaffQuerySet.as_manager()
+
     class Meta:
         ordering = ['staff_type', 'user__first_name', 'user__last_name']
+        indexes = [
+            # A site's active kitchen / serving staff
+            models.Index(fields=['site', 'is_active', 'staff_type'], name='staff_site_active_type_idx'),
+        ]
         verbose_name = 'Restaurant Staff'
         verbose_name_plural = 'Restaurant Staff'
 
@@ -282,18 +457,38 @@ class RestaurantStaff(models.Model):
         if self.user_id:
             try:
                 Guide.objects.get(user=self.user)
-                raise ValidationError(
-                    f"User '{self.user.get_full_name() or self.user.username}' already has a Guide profile. "
-                    "A user cannot be both a Tour Guide and Restaurant Staff. "
-                    "Please remove the Guide profile first or choose a different user."
-                )
+                raise ValidationError(self._role_conflict_message())
             except Guide.DoesNotExist:
                 pass  # Good, no conflict
 
+    @classmethod
+    def clean_batch(cls, staff_members):
+        """
+        Batch version of clean() used by the bulk-write helpers.
+        Checks role exclusivity for all staff with a single query.
+        """
+        user_ids = {s.user_id for s in staff_members if s.user_id}
+        conflicting = set(
+            Guide.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        errors = [s._role_conflict_message() for s in staff_members if s.user_id in conflicting]
+        if errors:
+            raise ValidationError(errors)
+
+    def _role_conflict_message(self):
+        return (
+            f"User '{self.user.get_full_name() or self.user.username}' already has a Guide profile. "
+            "A user cannot be both a Tour Guide and Restaurant Staff. "
+            "Please remove the Guide profile first or choose a different user."
+        )
+
     def save(self, *args, **kwargs):
-        """Override save to run validation."""
+        """Override save to run validation; availability follows a site change."""
         self.full_clean()
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if not adding:
+            self.availability.exclude(site_id=self.site_id).update(site_id=self.site_id)
 
     def get_full_name(self):
         """Get staff member's full name."""
@@ -308,6 +503,8 @@ class StaffAvailability(models.Model):
         on_delete=models.CASCADE,
         related_name='availability'
     )
+    # Copy of staff.site, so per-site date lookups stay on the site's rows
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, editable=False, related_name='+')
     date = models.DateField()
     is_available = models.BooleanField(
         default=True,
@@ -321,6 +518,14 @@ class StaffAvailability(models.Model):
     class Meta:
         unique_together = ['staff', 'date']
         ordering = ['date', 'staff']
+        indexes = [
+            # Who is unavailable at a site on a date (auto-scheduler, eligibility)
+            models.Index(
+                fields=['site', 'date', 'staff'],
+                condition=models.Q(is_available=False),
+                name='staffavail_unavailable_idx'
+            ),
+        ]
         verbose_name = 'Staff Availability'
         verbose_name_plural = 'Staff Availability'
 
@@ -328,12 +533,32 @@ class StaffAvailability(models.Model):
         status = "Available" if self.is_available else "Unavailable"
         return f"{self.staff.user.get_full_name()} - {self.date} ({status})"
 
+    @classmethod
+    def prepare_batch(cls, rows):
+        """Copy staff.site onto rows that lack it (used by the bulk-write helpers)."""
+        missing = {row.staff_id for row in rows if row.site_id is None and row.staff_id}
+        if missing:
+            site_ids = dict(RestaurantStaff.objects.filter(id__in=missing).values_list('id', 'site_id'))
+            for row in rows:
+                if row.site_id is None:
+                    row.site_id = site_ids.get(row.staff_id)
+
+    def save(self, *args, **kwargs):
+        if self.staff_id:
+            self.site_id = self.staff.site_id
+        super().save(*args, **kwargs)
+
 
 class DailyRestaurantSchedule(models.Model):
-    """Container for all restaurant staff shifts on a specific date."""
+    """Container for all restaurant staff shifts on a specific date at one site."""
 
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        default=default_site_id,
+        related_name='daily_restaurant_schedules'
+    )
     date = models.DateField(
-        unique=True,
         help_text="Date for this restaurant schedule"
     )
     is_published = models.BooleanField(
@@ -356,6 +581,7 @@ class DailyRestaurantSchedule(models.Model):
 
     class Meta:
         ordering = ['date']
+        unique_together = ['site', 'date']
         verbose_name = 'Daily Restaurant Schedule'
         verbose_name_plural = 'Daily Restaurant Schedules'
 
@@ -389,6 +615,25 @@ class DailyRestaurantSchedule(models.Model):
         return service.validate_coverage(self)
 
 
+class StaffShiftQuerySet(models.QuerySet):
+    """
+    Shift queries that join everything __str__, date, staff_type and the
+    scheduler read, so loops over the results don't load each relation per row.
+    """
+
+    def with_people(self):
+        """Join the day and assigned staff member (with user)."""
+        return self.select_related('daily_schedule', 'staff__user')
+
+    def for_day(self, day):
+        """Shifts of one day (a date or DailyRestaurantSchedule) in time order, with_people()."""
+        if isinstance(day, models.Model):
+            queryset = self.filter(daily_schedule=day)
+        else:
+            queryset = self.filter(daily_schedule__date=day)
+        return queryset.with_people().order_by('start_time', 'staff__staff_type')
+
+
 class StaffShift(models.Model):
     """Individual shift assignment (4 or 8 hours)."""
 
@@ -426,11 +671,22 @@ class StaffShift(models.Model):
 
     # Metadata
     notes = models.TextField(blank=True)
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented on every edit; used to detect concurrent changes"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StaffShiftQuerySet.as_manager()
+
     class Meta:
         ordering = ['daily_schedule__date', 'start_time', 'staff__staff_type']
+        indexes = [
+            # Is this staff member already on a shift that day
+            models.Index(fields=['daily_schedule', 'staff'], name='staffshift_day_staff_idx'),
+        ]
         verbose_name = 'Staff Shift'
         verbose_name_plural = 'Staff Shifts'
 
@@ -483,4 +739,274 @@ class StaffShift(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        # Any plain save invalidates versions handed out to other editors
+        if self.pk:
+            self.version += 1
         super().save(*args, **kwargs)
+
+    def save_versioned(self, expected_version, fields):
+        """
+        Save only the given fields, failing with VersionConflict if the row changed.
+
+        Skips full_clean(): only the staff assignment is edited through this
+        path, and start/end/duration are untouched.
+        """
+        _update_versioned(self, expected_version, fields)
+
+
+# ============================================================================
+# CALENDAR FEEDS
+# ============================================================================
+
+def _new_feed_token():
+    import secrets
+    return secrets.token_urlsafe(32)
+
+
+class CalendarFeed(models.Model):
+    """
+    Pre-rendered iCalendar (.ics) feed for one guide or restaurant staff member.
+
+    The body is rebuilt when a schedule the person appears on is published,
+    so calendar apps polling the feed URL get a stored response instead of
+    a schedule query.
+    """
+    token = models.CharField(max_length=64, unique=True, default=_new_feed_token, editable=False)
+    guide = models.OneToOneField(
+        Guide,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='calendar_feed'
+    )
+    staff = models.OneToOneField(
+        RestaurantStaff,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='calendar_feed'
+    )
+    body = models.TextField(blank=True)
+    etag = models.CharField(max_length=64, blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(guide__isnull=False, staff__isnull=True) |
+                    models.Q(guide__isnull=True, staff__isnull=False)
+                ),
+                name='calendarfeed_one_owner'
+            ),
+        ]
+
+    def __str__(self):
+        owner = self.guide or self.staff
+        return f"Calendar feed for {owner}"
+
+
+class PublishedRoster(models.Model):
+    """
+    Materialised published schedule for one guide or restaurant staff member.
+
+    `days` maps ISO dates to that person's entries for the day (tours and
+    standby for guides, shifts for staff). It is rewritten for the people
+    on a date whenever that date is published or cleared, so reading a
+    person's upcoming roster is a single row lookup.
+    """
+    guide = models.OneToOneField(
+        Guide,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='published_roster'
+    )
+    staff = models.OneToOneField(
+        RestaurantStaff,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='published_roster'
+    )
+    days = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(guide__isnull=False, staff__isnull=True) |
+                    models.Q(guide__isnull=True, staff__isnull=False)
+                ),
+                name='publishedroster_one_owner'
+            ),
+        ]
+
+    def __str__(self):
+        owner = self.guide or self.staff
+        return f"Published roster for {owner}"
+
+    def upcoming(self, start, end):
+        """Entries from start to end inclusive, in date order."""
+        start, end = start.isoformat(), end.isoformat()
+        return [self.days[day] for day in sorted(self.days) if start <= day <= end]
+
+
+# ============================================================================
+# SCHEDULER RUN TELEMETRY
+# ============================================================================
+
+class SchedulerRun(models.Model):
+    """
+    One auto-scheduler invocation (tour or restaurant), recorded by
+    apps.scheduling.telemetry.
+
+    `phase_ms` / `phase_queries` split wall time and queries over the load,
+    eligibility, search and write phases; `objective` holds the values the
+    solver reached (coverage, guides or staff used, local search cost).
+    Runs with the same `inputs_hash` were given the same data and options.
+    """
+    KIND_TOUR = 'tour'
+    KIND_RESTAURANT = 'restaurant'
+    KIND_CHOICES = [
+        (KIND_TOUR, 'Tour guides'),
+        (KIND_RESTAURANT, 'Restaurant staff'),
+    ]
+
+    SOURCE_API = 'api'
+    SOURCE_COMMAND = 'command'
+    SOURCE_SANDBOX = 'sandbox'
+    SOURCE_OTHER = 'other'
+    SOURCE_CHOICES = [
+        (SOURCE_API, 'Schedule Manager / API'),
+        (SOURCE_COMMAND, 'Management command'),
+        (SOURCE_SANDBOX, 'What-if scenario'),
+        (SOURCE_OTHER, 'Other'),
+    ]
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, default=default_site_id, related_name='scheduler_runs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=SOURCE_OTHER)
+    date = models.DateField(help_text="Schedule date that was solved")
+    algorithm = models.CharField(max_length=50)
+    seed = models.BigIntegerField(null=True, blank=True)
+    inputs_hash = models.CharField(max_length=16, help_text="Hash of the data and options the run was given")
+    started_at = models.DateTimeField(auto_now_add=True)
+    total_ms = models.FloatField()
+    phase_ms = models.JSONField(default=dict)
+    queries = models.PositiveIntegerField(default=0)
+    phase_queries = models.JSONField(default=dict)
+    candidates_evaluated = models.PositiveIntegerField(default=0)
+    assigned_count = models.PositiveIntegerField(default=0)
+    unfillable_count = models.PositiveIntegerField(default=0)
+    objective = models.JSONField(default=dict)
+    fingerprint = models.CharField(max_length=16, blank=True)
+
+    class Meta:
+        ordering = ['-started_at', '-id']
+        indexes = [
+            models.Index(fields=['site', 'kind', 'date'], name='schedulerrun_site_kind_idx'),
+            models.Index(fields=['started_at'], name='schedulerrun_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} run for {self.date} ({self.total_ms:.0f} ms)"
+
+
+class ScheduleChange(models.Model):
+    """
+    Append-only log of assignment, standby, shift and publish changes,
+    written in the same transaction as the change (see
+    apps.scheduling.changelog).
+
+    Rows are compact: the changed object's id and the old/new value as
+    ids (guide, staff) or 0/1 (published). The auto-increment id is the
+    cursor consumers read deltas from.
+    """
+    KIND_GUIDE = 'guide'                      # TourSession.assigned_guide
+    KIND_STANDBY = 'standby'                  # DailySchedule.standby_guide
+    KIND_TOUR_PUBLISHED = 'tour_published'    # DailySchedule.is_published
+    KIND_SHIFT_STAFF = 'shift_staff'          # StaffShift.staff
+    KIND_SHIFT_ADDED = 'shift_added'          # new StaffShift (new: staff)
+    KIND_SHIFT_REMOVED = 'shift_removed'      # deleted StaffShift (old: staff)
+    KIND_RESTAURANT_PUBLISHED = 'restaurant_published'  # DailyRestaurantSchedule.is_published
+    KIND_CHOICES = [
+        (KIND_GUIDE, 'Tour guide'),
+        (KIND_STANDBY, 'Standby guide'),
+        (KIND_TOUR_PUBLISHED, 'Tour day published'),
+        (KIND_SHIFT_STAFF, 'Shift staff'),
+        (KIND_SHIFT_ADDED, 'Shift added'),
+        (KIND_SHIFT_REMOVED, 'Shift removed'),
+        (KIND_RESTAURANT_PUBLISHED, 'Restaurant day published'),
+    ]
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField(help_text="Schedule date the change belongs to")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField(help_text="Session, schedule or shift id, by kind")
+    old_value = models.BigIntegerField(null=True, blank=True)
+    new_value = models.BigIntegerField(null=True, blank=True)
+    user = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['site', 'id'], name='schedulechange_site_cursor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} on {self.date}: {self.old_value} -> {self.new_value}"
+
+
+class DaySnapshot(models.Model):
+    """
+    One level of a day's undo or redo stack: the tour or restaurant day as
+    it was before a bulk edit, packed by apps.scheduling.undo (a few bytes
+    per session or shift).
+    """
+    KIND_TOUR = 'tour'
+    KIND_RESTAURANT = 'restaurant'
+    KIND_CHOICES = [
+        (KIND_TOUR, 'Tour day'),
+        (KIND_RESTAURANT, 'Restaurant day'),
+    ]
+
+    STACK_UNDO = 'undo'
+    STACK_REDO = 'redo'
+    STACK_CHOICES = [
+        (STACK_UNDO, 'Undo'),
+        (STACK_REDO, 'Redo'),
+    ]
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    date = models.DateField()
+    stack = models.CharField(max_length=4, choices=STACK_CHOICES)
+    label = models.CharField(max_length=50, help_text="The edit this level undoes, e.g. 'Clear all'")
+    data = models.BinaryField()
+    user = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['site', 'kind', 'date', 'stack', 'id'], name='daysnapshot_stack_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_stack_display()} '{self.label}' for {self.get_kind_display().lower()} {self.date}"
@@ -0,0 +1,151 @@
+"""
+Materialised per-person rosters of published schedules.
+
+Publishing (or clearing) a date rewrites that date in the PublishedRoster
+row of every guide or staff member it touches, so the staff-facing "my
+roster" API reads one row instead of joining sessions, shifts and
+schedules on every visit.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.scheduling.models import (
+    PublishedRoster, DailySchedule, DailyRestaurantSchedule, TourSession, StaffShift
+)
+
+# Days of history kept in each roster; older dates are pruned on write
+ROSTER_HISTORY_DAYS = 7
+
+
+# ============================================================================
+# MATERIALISATION
+# ============================================================================
+
+def materialise_tour_date(daily_schedule):
+    """Rewrite one tour date in the rosters of every guide it touches."""
+    entries = {}
+    if daily_schedule.is_published:
+        sessions = TourSession.objects.filter(
+            daily_schedule=daily_schedule,
+            assigned_guide__isnull=False
+        ).select_related('time_slot').order_by('time_slot__start_time')
+
+        for session in sessions:
+            entry = entries.setdefault(session.assigned_guide_id, _guide_day(daily_schedule))
+            entry['tours'].append({
+                'session_id': session.id,
+                'start_time': session.time_slot.start_time.strftime('%H:%M'),
+                'end_time': session.time_slot.end_time.strftime('%H:%M'),
+                'status': session.status,
+                'visitor_count': session.visitor_count,
+                'visitor_type': session.visitor_type,
+            })
+
+        if daily_schedule.standby_guide_id:
+            entries.setdefault(daily_schedule.standby_guide_id, _guide_day(daily_schedule))['standby'] = True
+
+    _write_date('guide', daily_schedule.site_id, daily_schedule.date, entries)
+
+
+def materialise_restaurant_date(daily_schedule):
+    """Rewrite one restaurant date in the rosters of every staff member it touches."""
+    entries = {}
+    if daily_schedule.is_published:
+        shifts = StaffShift.objects.filter(
+            daily_schedule=daily_schedule,
+            staff__isnull=False
+        ).select_related('staff').order_by('start_time')
+
+        for shift in shifts:
+            entry = entries.setdefault(shift.staff_id, {
+                'date': daily_schedule.date.isoformat(),
+                'shifts': [],
+            })
+            entry['shifts'].append({
+                'shift_id': shift.id,
+                'start_time': shift.start_time.strftime('%H:%M'),
+                'end_time': shift.end_time.strftime('%H:%M'),
+                'duration_hours': shift.duration_hours,
+                'staff_type': shift.staff.staff_type,
+            })
+
+    _write_date('staff', daily_schedule.site_id, daily_schedule.date, entries)
+
+
+def _guide_day(daily_schedule):
+    return {
+        'date': daily_schedule.date.isoformat(),
+        'tours': [],
+        'standby': False,
+        'notes': daily_schedule.notes,
+    }
+
+
+@transaction.atomic
+def _write_date(owner, site_id, day, entries):
+    """
+    Set `day` to entries[person_id] in each affected roster.
+
+    Affected rosters are the people in `entries` plus any roster at the
+    same site already holding the date, so people removed from the day
+    lose it (other sites' schedules for the date are left alone).
+    """
+    key = day.isoformat()
+    owner_id = f'{owner}_id'
+    oldest_kept = (timezone.localdate() - timedelta(days=ROSTER_HISTORY_DAYS)).isoformat()
+
+    rosters = PublishedRoster.objects.select_for_update().filter(
+        Q(**{f'{owner_id}__in': list(entries)}) |
+        Q(**{f'{owner}__site_id': site_id, 'days__has_key': key})
+    )
+
+    to_update = []
+    for roster in rosters:
+        person_id = getattr(roster, owner_id)
+        if person_id in entries:
+            roster.days[key] = entries.pop(person_id)
+        else:
+            roster.days.pop(key, None)
+        roster.days = {d: entry for d, entry in roster.days.items() if d >= oldest_kept}
+        roster.updated_at = timezone.now()
+        to_update.append(roster)
+
+    PublishedRoster.objects.bulk_update(to_update, ['days', 'updated_at'])
+    PublishedRoster.objects.bulk_create([
+        PublishedRoster(**{owner_id: person_id, 'days': {key: entry}})
+        for person_id, entry in entries.items()
+    ])
+
+
+def rebuild_all_rosters(start=None):
+    """
+    Rematerialise every published date from `start` (default: the start
+    of the kept history) onwards. Used to backfill or repair rosters.
+    """
+    if start is None:
+        start = timezone.localdate() - timedelta(days=ROSTER_HISTORY_DAYS)
+
+    tour_days = DailySchedule.objects.filter(date__gte=start)
+    restaurant_days = DailyRestaurantSchedule.objects.filter(date__gte=start)
+    for daily_schedule in tour_days:
+        materialise_tour_date(daily_schedule)
+    for daily_schedule in restaurant_days:
+        materialise_restaurant_date(daily_schedule)
+    return tour_days.count(), restaurant_days.count()
+
+
+# ============================================================================
+# READS
+# ============================================================================
+
+def roster_payload(roster, start, end):
+    """JSON-ready roster for a person between start and end inclusive."""
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'updated_at': roster.updated_at.isoformat() if roster else None,
+        'days': roster.upcoming(start, end) if roster else [],
+    }
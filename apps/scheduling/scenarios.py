@@ -0,0 +1,452 @@
+"""
+What-if scenario sandbox for a day's tour schedule.
+
+A scenario is an in-memory fork of one day: its sessions and assignments,
+the standby, the active guides and the day's availability. Managers apply
+hypothetical changes to the fork (assignments, availability, an extra
+guide), re-run validation or the auto-scheduler on it and look at the diff
+against the live day. Nothing is written until the scenario is committed,
+which applies the whole diff in one transaction.
+
+Scenarios live in the cache (see settings.CACHES) under their site and a
+random token for SCENARIO_TIMEOUT seconds. Only reads touch the database while exploring,
+apart from the SchedulerRun each auto-schedule on a fork records.
+"""
+import hashlib
+import secrets
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.guides.models import Guide, GuideAvailability
+from apps.scheduling.changelog import ChangeLog
+from apps.scheduling.lazy_loads import forbid_lazy_loads
+from apps.scheduling.local_search import MAX_TIME_BUDGET_MS, improve_assignment
+from apps.scheduling.models import TourSession, DailySchedule, ScheduleChange, VersionConflict, SchedulerRun
+from apps.scheduling.serializers import full_name
+from apps.scheduling.services import SchedulingService
+from apps.scheduling.telemetry import RunRecorder
+
+# Seconds an untouched scenario is kept; every change restarts the clock
+SCENARIO_TIMEOUT = getattr(settings, 'SCENARIO_TIMEOUT', 3600)
+
+# Time budget for auto-schedule on a fork (milliseconds)
+SCENARIO_AUTO_SCHEDULE_MS = 200
+
+# Session stand-in for improve_assignment(), which only reads these two
+_SolverSession = namedtuple('_SolverSession', ['id', 'time_slot'])
+
+
+class ScenarioExpired(Exception):
+    """Raised when a scenario token is unknown or has timed out."""
+
+
+def _cache_key(site_id, token):
+    return f'scheduling:scenario:{site_id}:{token}'
+
+
+def load_scenario(site, token):
+    scenario = cache.get(_cache_key(site.id, token))
+    if scenario is None:
+        raise ScenarioExpired(f"Scenario {token} not found or expired. Fork the day again.")
+    return scenario
+
+
+def discard_scenario(site, token):
+    cache.delete(_cache_key(site.id, token))
+
+
+class Scenario:
+    """In-memory fork of one day's tour schedule."""
+
+    def __init__(self, daily_schedule, sessions, guides, unavailable_guide_ids):
+        self.token = secrets.token_urlsafe(16)
+        self.site_id = daily_schedule.site_id
+        self.date = daily_schedule.date
+        self.daily_schedule_id = daily_schedule.id
+        self.base_standby_id = daily_schedule.standby_guide_id
+        self.standby_id = daily_schedule.standby_guide_id
+
+        self.slots = {session.time_slot_id: session.time_slot for session in sessions}
+        self.sessions = [session.id for session in sessions]
+        self.session_slot = {session.id: session.time_slot_id for session in sessions}
+        self.versions = {session.id: session.version for session in sessions}
+        self.base_assignment = {session.id: session.assigned_guide_id for session in sessions}
+        self.assignment = dict(self.base_assignment)
+
+        self.guides = {guide.id: guide for guide in guides}
+        # Loaded only because they are on the day: kept there, never newly given work
+        self.inactive_guide_ids = {
+            guide.id for guide in guides if not guide.is_active or guide.site_id != self.site_id
+        }
+        self.names = {
+            guide.id: full_name(guide.user.first_name, guide.user.last_name) or guide.user.username
+            for guide in guides
+        }
+        self.base_unavailable = set(unavailable_guide_ids)
+        self.availability = {}      # guide_id -> is_available, overriding the base
+        self.added_guide_ids = []   # Hypothetical guides, with negative ids
+
+    # ------------------------------------------------------------------
+    # Fork / store
+    # ------------------------------------------------------------------
+
+    @classmethod
+    @forbid_lazy_loads()
+    def fork(cls, daily_schedule):
+        """Snapshot a DailySchedule into a new scenario and store it."""
+        sessions = list(TourSession.objects.filter(
+            daily_schedule=daily_schedule
+        ).select_related('time_slot').order_by('time_slot__start_time'))
+        # Active guides, plus anyone still on the day since deactivated or moved
+        on_day = {session.assigned_guide_id for session in sessions} | {daily_schedule.standby_guide_id}
+        guides = Guide.objects.filter(
+            Q(site_id=daily_schedule.site_id, is_active=True) | Q(id__in=on_day - {None})
+        ).select_related('user').order_by('id')
+        unavailable = GuideAvailability.objects.filter(
+            site_id=daily_schedule.site_id,
+            date=daily_schedule.date,
+            is_available=False
+        ).values_list('guide_id', flat=True)
+
+        scenario = cls(daily_schedule, sessions, list(guides), unavailable)
+        scenario.save()
+        return scenario
+
+    def save(self):
+        cache.set(_cache_key(self.site_id, self.token), self, SCENARIO_TIMEOUT)
+
+    # ------------------------------------------------------------------
+    # Hypothetical changes
+    # ------------------------------------------------------------------
+
+    def apply(self, change):
+        """
+        Apply one change dict to the fork. Supported ops:
+            {'op': 'assign', 'session_id': 1, 'guide_id': 2}   (guide_id None unassigns)
+            {'op': 'standby', 'guide_id': 2}
+            {'op': 'availability', 'guide_id': 2, 'is_available': False}
+            {'op': 'add_guide', 'guide_type': 'FT', 'name': 'New hire'}
+            {'op': 'auto_schedule', 'time_budget_ms': 200, 'seed': 1}
+            {'op': 'reset'}
+        Raises ValueError for an unknown op or id.
+        """
+        op = change.get('op')
+        if op == 'assign':
+            session_id = int(change['session_id'])
+            if session_id not in self.assignment:
+                raise ValueError(f"Session {session_id} is not on {self.date}")
+            self.assignment[session_id] = self._guide_id(change.get('guide_id'))
+        elif op == 'standby':
+            self.standby_id = self._guide_id(change.get('guide_id'))
+        elif op == 'availability':
+            guide_id = self._guide_id(change.get('guide_id'))
+            if guide_id is None:
+                raise ValueError("availability needs a guide_id")
+            self.availability[guide_id] = bool(change.get('is_available', True))
+        elif op == 'add_guide':
+            return self.add_guide(change.get('guide_type', 'FT'), change.get('name'))
+        elif op == 'auto_schedule':
+            return self.auto_schedule(
+                time_budget_ms=min(
+                    max(int(change.get('time_budget_ms') or SCENARIO_AUTO_SCHEDULE_MS), 0), MAX_TIME_BUDGET_MS
+                ),
+                seed=change.get('seed'),
+            )
+        elif op == 'reset':
+            self.reset()
+        else:
+            raise ValueError(f"Unknown scenario change: {op}")
+
+    def reset(self):
+        """Drop every change made to the fork."""
+        self.assignment = dict(self.base_assignment)
+        self.standby_id = self.base_standby_id
+        self.availability = {}
+        for guide_id in self.added_guide_ids:
+            del self.guides[guide_id]
+            del self.names[guide_id]
+        self.added_guide_ids = []
+
+    def add_guide(self, guide_type, name=None):
+        """Add a hypothetical guide (not saved); returns its negative id."""
+        if guide_type not in dict(Guide.GUIDE_TYPE_CHOICES):
+            raise ValueError(f"Unknown guide type: {guide_type}")
+        guide_id = -(len(self.added_guide_ids) + 1)
+        self.guides[guide_id] = Guide(id=guide_id, guide_type=guide_type)
+        self.names[guide_id] = name or f"Hypothetical guide {-guide_id}"
+        self.added_guide_ids.append(guide_id)
+        return guide_id
+
+    def _guide_id(self, guide_id):
+        if guide_id in (None, ''):
+            return None
+        guide_id = int(guide_id)
+        if guide_id not in self.guides or guide_id in self.inactive_guide_ids:
+            raise ValueError(f"Guide {guide_id} is not an active guide in this scenario")
+        return guide_id
+
+    def unavailable_guide_ids(self):
+        unavailable = set(self.base_unavailable)
+        for guide_id, is_available in self.availability.items():
+            if is_available:
+                unavailable.discard(guide_id)
+            else:
+                unavailable.add(guide_id)
+        return unavailable
+
+    # ------------------------------------------------------------------
+    # Re-run validation / auto-schedule on the fork
+    # ------------------------------------------------------------------
+
+    def auto_schedule(self, time_budget_ms=SCENARIO_AUTO_SCHEDULE_MS, seed=None):
+        """
+        Fill the fork's unassigned sessions in memory and pick a standby if
+        there is none. Existing assignments are kept. Uses the local search
+        of the live auto-scheduler (see apps.scheduling.local_search), so
+        the same daily rules apply; returns its stats and the id of the
+        SchedulerRun recorded (source 'sandbox').
+        """
+        run = RunRecorder(SchedulerRun.KIND_TOUR, self.site_id, self.date, SchedulerRun.SOURCE_SANDBOX)
+        with run.recording():
+            stats = self._auto_schedule(run, time_budget_ms, seed)
+        unfillable_count = sum(1 for guide_id in self.assignment.values() if guide_id is None)
+        stats['run_id'] = run.save(
+            len(self.assignment) - unfillable_count, unfillable_count, self.fingerprint()
+        ).id
+        return stats
+
+    def _auto_schedule(self, run, time_budget_ms, seed):
+        """Body of auto_schedule(), reporting phases and counters to `run`."""
+        run.enter('load')
+        run.algorithm = 'local_search'
+        run.seed = self.date.toordinal() if seed is None else int(seed)
+        unavailable = self.unavailable_guide_ids()
+        candidates = [
+            guide for guide_id, guide in self.guides.items()
+            if guide_id not in unavailable and guide_id not in self.inactive_guide_ids
+        ]
+
+        open_sessions = [
+            _SolverSession(session_id, self.slots[self.session_slot[session_id]])
+            for session_id in self.sessions if self.assignment[session_id] is None
+        ]
+        fixed_slots = {}
+        for session_id in self.sessions:
+            guide_id = self.assignment[session_id]
+            if guide_id is not None:
+                fixed_slots.setdefault(guide_id, []).append(self.slots[self.session_slot[session_id]])
+
+        run.set_inputs(
+            self.date,
+            [(session_id, self.session_slot[session_id], self.assignment[session_id]) for session_id in self.sessions],
+            [(guide.id, guide.guide_type) for guide in candidates],
+            sorted(unavailable),
+            self.standby_id,
+            run.seed, time_budget_ms,
+        )
+
+        run.enter('search')
+        improvement = improve_assignment(
+            open_sessions,
+            candidates,
+            {session.id: None for session in open_sessions},
+            fixed_slots=fixed_slots,
+            standby_id=self.standby_id,
+            time_budget_ms=time_budget_ms,
+            seed=run.seed,
+        )
+        run.candidates_evaluated += improvement['iterations']
+        self.assignment.update(improvement['assignment'])
+
+        if self.standby_id is None and candidates:
+            # Fewest tours on the fork, then widest slot coverage, then id
+            tours = {guide.id: 0 for guide in candidates}
+            for guide_id in self.assignment.values():
+                if guide_id in tours:
+                    tours[guide_id] += 1
+            slots = list(self.slots.values())
+            self.standby_id = min(candidates, key=lambda guide: (
+                tours[guide.id],
+                -sum(1 for slot in slots if guide.can_work_timeslot(slot)),
+                guide.id,
+            )).id
+
+        run.enter(None)
+        assigned = [guide_id for guide_id in self.assignment.values() if guide_id is not None]
+        run.objective = {
+            'assigned': len(assigned),
+            'unfillable': len(self.assignment) - len(assigned),
+            'guides_used': len(set(assigned)),
+            'standby_tours': assigned.count(self.standby_id) if self.standby_id is not None else 0,
+            'cost_before': improvement['cost_before'],
+            'cost_after': improvement['cost_after'],
+        }
+        return {key: improvement[key] for key in ('cost_before', 'cost_after', 'iterations', 'elapsed_ms')}
+
+    def fingerprint(self):
+        """SchedulingService.solution_fingerprint() of the fork, to compare with live runs."""
+        payload = repr((
+            self.date.isoformat(),
+            [
+                (self.slots[self.session_slot[session_id]].start_time.strftime('%H:%M'), self.assignment[session_id])
+                for session_id in self.sessions
+            ],
+            self.standby_id,
+        ))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def validate(self):
+        """Same checks and wording as SchedulingService.validate_daily_schedule(), on the fork."""
+        unavailable = self.unavailable_guide_ids()
+        errors = {
+            'general': [],
+            'sessions': SchedulingService().find_session_errors(
+                self.date,
+                [(session_id, self.session_slot[session_id], self.assignment[session_id])
+                 for session_id in self.sessions],
+                self.slots,
+                self.guides,
+                unavailable,
+            )
+        }
+
+        if self.standby_id is None:
+            errors['general'].append("No standby guide assigned")
+        elif self.standby_id in unavailable:
+            errors['general'].append("Standby guide marked as unavailable")
+
+        unassigned_count = sum(1 for guide_id in self.assignment.values() if guide_id is None)
+        if unassigned_count:
+            errors['general'].append(f"{unassigned_count} session(s) not assigned to any guide")
+
+        return errors
+
+    def diff(self):
+        """Changes the fork would make to the live day."""
+        def guide(guide_id):
+            return {'id': guide_id, 'name': self.names.get(guide_id)} if guide_id is not None else None
+
+        sessions = [{
+            'session_id': session_id,
+            'time_slot': str(self.slots[self.session_slot[session_id]]),
+            'from': guide(self.base_assignment[session_id]),
+            'to': guide(self.assignment[session_id]),
+        } for session_id in self.sessions if self.assignment[session_id] != self.base_assignment[session_id]]
+
+        return {
+            'sessions': sessions,
+            'standby': {
+                'from': guide(self.base_standby_id),
+                'to': guide(self.standby_id),
+            } if self.standby_id != self.base_standby_id else None,
+            'availability': [
+                {'guide': guide(guide_id), 'is_available': is_available}
+                for guide_id, is_available in self.availability.items()
+                if is_available == (guide_id in self.base_unavailable)
+            ],
+            'added_guides': [
+                {'id': guide_id, 'name': self.names[guide_id], 'guide_type': self.guides[guide_id].guide_type}
+                for guide_id in self.added_guide_ids
+            ],
+        }
+
+    def payload(self):
+        """The fork's current state, validation and diff."""
+        validation = self.validate()
+        return {
+            'token': self.token,
+            'date': self.date.isoformat(),
+            'sessions': [{
+                'session_id': session_id,
+                'time_slot': str(self.slots[self.session_slot[session_id]]),
+                'guide_id': self.assignment[session_id],
+                'guide_name': self.names.get(self.assignment[session_id]),
+                'errors': validation['sessions'].get(session_id, []),
+            } for session_id in self.sessions],
+            'standby_guide_id': self.standby_id,
+            'unavailable_guide_ids': sorted(self.unavailable_guide_ids()),
+            'validation': {'general': validation['general'], 'is_valid': not (
+                validation['general'] or validation['sessions']
+            )},
+            'diff': self.diff(),
+        }
+
+    # ------------------------------------------------------------------
+    # Commit
+    # ------------------------------------------------------------------
+
+    @transaction.atomic
+    def commit(self):
+        """
+        Write the diff to the live day in one transaction: one bulk update
+        of the changed sessions, the standby and the availability rows.
+
+        Raises VersionConflict if a changed session or the standby was edited
+        since the fork, and ValueError if the diff uses a hypothetical guide.
+        Returns counts of what was written.
+        """
+        changed = [
+            session_id for session_id in self.sessions
+            if self.assignment[session_id] != self.base_assignment[session_id]
+        ]
+        hypothetical = set(self.added_guide_ids)
+        if hypothetical & ({self.assignment[session_id] for session_id in changed} | {self.standby_id}):
+            raise ValueError("Hypothetical guides can't be committed. Create the guide first, then fork again.")
+
+        # Stale-fork check under lock: changed sessions and the standby
+        current = TourSession.objects.select_for_update().filter(id__in=changed).in_bulk()
+        for session_id in changed:
+            session = current.get(session_id)
+            if session is None or session.version != self.versions[session_id]:
+                raise VersionConflict(session or TourSession(id=session_id))
+
+        standby_changed = self.standby_id != self.base_standby_id
+        daily_schedule = DailySchedule.objects.select_for_update().get(id=self.daily_schedule_id)
+        if standby_changed and daily_schedule.standby_guide_id != self.base_standby_id:
+            raise VersionConflict(daily_schedule)
+
+        now = timezone.now()
+        changes = ChangeLog(self.site_id)
+        updates = []
+        for session_id in changed:
+            session = current[session_id]
+            changes.add(self.date, ScheduleChange.KIND_GUIDE, session_id,
+                        session.assigned_guide_id, self.assignment[session_id])
+            session.assigned_guide_id = self.assignment[session_id]
+            session.version += 1
+            session.updated_at = now
+            updates.append(session)
+        TourSession.objects.bulk_update(updates, ['assigned_guide', 'version', 'updated_at'])
+
+        if standby_changed:
+            DailySchedule.objects.filter(id=self.daily_schedule_id).update(
+                standby_guide_id=self.standby_id,
+                updated_at=now
+            )
+            changes.add(self.date, ScheduleChange.KIND_STANDBY, self.daily_schedule_id,
+                        daily_schedule.standby_guide_id, self.standby_id)
+        changes.save()
+
+        availability = [
+            GuideAvailability(guide_id=guide_id, site_id=self.site_id, date=self.date, is_available=is_available)
+            for guide_id, is_available in self.availability.items()
+            if is_available == (guide_id in self.base_unavailable) and guide_id not in hypothetical
+        ]
+        GuideAvailability.objects.bulk_create(
+            availability,
+            update_conflicts=True,
+            unique_fields=['guide', 'date'],
+            update_fields=['is_available', 'updated_at'],
+        )
+
+        cache.delete(_cache_key(self.site_id, self.token))
+        return {
+            'sessions_updated': len(updates),
+            'standby_updated': standby_changed,
+            'availability_updated': len(availability),
+        }
@@ -0,0 +1,139 @@
+"""
+Lean JSON serialisation for the schedule APIs.
+
+Payloads are built from pre-joined rows (values_list() tuples) rather than
+model instances, so names come from the same query as the row instead of a
+lazy user lookup per row. Responses are encoded compactly, with orjson when
+it is installed and the standard library encoder otherwise.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from apps.guides.models import Guide
+from apps.scheduling.models import StaffShift
+from apps.scheduling.services import RestaurantSchedulingService
+
+try:
+    import orjson
+except ImportError:  # Optional: pip install orjson
+    orjson = None
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def dumps(data):
+    """Encode data as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(data, status=200):
+    """Drop-in for JsonResponse(data) using the compact encoder."""
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def full_name(first_name, last_name):
+    """Same result as User.get_full_name(), from already-fetched columns."""
+    return f'{first_name} {last_name}'.strip()
+
+
+# ============================================================================
+# TOUR PAYLOADS
+# ============================================================================
+
+def session_payload(session):
+    """
+    Current editable state of a tour session.
+    Expects time_slot and assigned_guide__user to be select_related.
+    """
+    guide = session.assigned_guide
+    return {
+        'session_id': session.id,
+        'time_slot': str(session.time_slot),
+        'assigned_guide_id': guide.id if guide else None,
+        'assigned_guide_name': guide.user.get_full_name() if guide else None,
+        'visitor_count': session.visitor_count,
+        'visitor_type': session.visitor_type,
+        'booking_channel': session.booking_channel,
+        'notes': session.notes,
+        'version': session.version,
+    }
+
+
+def eligible_guides_payload(guides):
+    """Guide choices for the assignment dropdown, from a Guide queryset."""
+    type_names = dict(Guide.GUIDE_TYPE_CHOICES)
+    rows = guides.values_list(
+        'id', 'guide_type', 'user__first_name', 'user__last_name', 'user__username'
+    )
+    return [{
+        'id': guide_id,
+        'name': full_name(first_name, last_name) or username,
+        'type': type_names.get(guide_type, guide_type),
+        'type_code': guide_type,
+    } for guide_id, guide_type, first_name, last_name, username in rows]
+
+
+# ============================================================================
+# RESTAURANT PAYLOADS
+# ============================================================================
+
+def shift_payload(shift):
+    """
+    Current editable state of a staff shift.
+    Expects staff__user to be select_related.
+    """
+    staff = shift.staff
+    return {
+        'shift_id': shift.id,
+        'staff_id': staff.id if staff else None,
+        'staff_name': staff.user.get_full_name() if staff else None,
+        'start_time': shift.start_time.strftime('%H:%M'),
+        'end_time': shift.end_time.strftime('%H:%M'),
+        'duration_hours': shift.duration_hours,
+        'version': shift.version,
+    }
+
+
+def restaurant_day_payload(daily_schedule):
+    """
+    Shifts, summary and coverage validation for one restaurant day.
+
+    All three are derived from a single query over the day's shifts,
+    instead of one query per summary figure plus a validation pass.
+    """
+    service = RestaurantSchedulingService()
+    rows = StaffShift.objects.filter(daily_schedule=daily_schedule).values_list(
+        'id', 'staff_id', 'staff__staff_type', 'staff__user__first_name', 'staff__user__last_name',
+        'start_time', 'end_time', 'duration_hours', 'version'
+    )
+
+    shifts = []
+    for shift_id, staff_id, staff_type, first_name, last_name, start, end, hours, version in rows:
+        shifts.append({
+            'id': shift_id,
+            'staff_id': staff_id,
+            'staff_name': full_name(first_name, last_name) if staff_id else None,
+            'staff_type': staff_type,
+            'start_time': start.strftime('%H:%M'),
+            'end_time': end.strftime('%H:%M'),
+            'duration_hours': hours,
+            'is_full_day': hours == 8,
+            'version': version,
+        })
+
+    validation = service.compute_coverage(
+        (row[5], row[6], row[2]) for row in rows if row[1] is not None
+    )
+    summary = service.summarise_shifts(((row[1], row[2], row[7]) for row in rows), validation)
+
+    return {
+        'shifts': shifts,
+        'summary': summary,
+        'validation': validation,
+    }
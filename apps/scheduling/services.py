@@ -1,60 +1,86 @@
 """
 Business logic and validation for tour scheduling.
 """
+import hashlib
+import random
 from datetime import datetime, time, timedelta, date
 from typing import List, Dict
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Count
+from django.utils import timezone
+from apps.core.models import Site
 from apps.guides.models import Guide, GuideAvailability
-from apps.scheduling.models import TourTimeSlot, TourSession, DailySchedule
-
-
-class SchedulingService:
+from apps.scheduling.bulk import bulk_create_validated, bulk_update_validated
+from apps.scheduling.calendar_feeds import refresh_feeds_for_tour_dates, refresh_feeds_for_restaurant_dates
+from apps.scheduling.changelog import ChangeLog
+from apps.scheduling.lazy_loads import forbid_lazy_loads
+from apps.scheduling.local_search import improve_assignment
+from apps.scheduling.models import (
+    TourTimeSlot, TourSession, DailySchedule, SchedulerRun, SlotTemplateEntry, ScheduleChange
+)
+from apps.scheduling.rosters import materialise_tour_date, materialise_restaurant_date
+from apps.scheduling.slot_templates import (
+    DEFAULT_SLOT_STARTS, DEFAULT_TOUR_MINUTES, active_templates, ensure_slots, slots_for_date
+)
+from apps.scheduling.telemetry import RunRecorder
+
+
+class SiteScopedService:
+    """
+    Base for the scheduling services. Methods given a schedule or session
+    work on that schedule's site; methods given dates work on `site`
+    (the default site when not given).
+    """
+
+    def __init__(self, site=None):
+        self._site = site
+
+    @property
+    def site(self):
+        if self._site is None:
+            self._site = Site.objects.get_default()
+        return self._site
+
+
+class SchedulingService(SiteScopedService):
     """Service class for scheduling operations and validations."""
 
     def generate_tour_time_slots(self):
-        """Generate all tour time slots (10:00am-9:30pm, on the hour, 1.5-hour tours)."""
-        slots_created = 0
-        start_hour = 10  # Start at 10:00 AM
-        tour_duration_minutes = 90  # 1.5 hours
-
-        # Generate slots from 10:00am to 8:00pm (last tour starts at 8pm, ends at 9:30pm)
-        # Tours start on the hour: 10am, 11am, 12pm, 1pm, 2pm, 3pm, 4pm, 5pm, 6pm, 7pm, 8pm
-        for hour in range(start_hour, 21):  # 10 to 20 (8pm)
-            current_time = time(hour, 0)  # On the hour
-
-            # Calculate end time (1.5 hours later)
-            start_dt = datetime.combine(date.today(), current_time)
-            end_dt = start_dt + timedelta(minutes=tour_duration_minutes)
-
-            slot, created = TourTimeSlot.objects.get_or_create(
-                start_time=current_time,
-                end_time=end_dt.time(),
-                defaults={'duration_minutes': tour_duration_minutes}
-            )
-
-            if created:
-                slots_created += 1
-
-        return slots_created
+        """
+        Create the site's tour time slots used by its active slot templates,
+        or the default pattern (10am-8pm on the hour, 1.5-hour tours) when
+        it has no templates. Returns the number of slots created.
+        """
+        slots = TourTimeSlot.objects.filter(site=self.site)
+        before = slots.count()
+        times = {
+            (entry.start_time, entry.duration_minutes)
+            for entry in SlotTemplateEntry.objects.filter(template__site=self.site, template__is_active=True)
+        }
+        if not times:
+            times = {(start, DEFAULT_TOUR_MINUTES) for start in DEFAULT_SLOT_STARTS}
+        ensure_slots(times, self.site)
+        return slots.count() - before
 
-    def generate_sessions_for_date(self, target_date):
-        """Generate tour sessions for a specific date."""
+    def generate_sessions_for_date(self, target_date, templates=None):
+        """
+        Generate tour sessions for a specific date, one per slot of the
+        date's slot template (see apps.scheduling.slot_templates).
+        """
         # Get or create daily schedule
-        daily_schedule, created = DailySchedule.objects.get_or_create(date=target_date)
-
-        # Get all time slots
-        time_slots = TourTimeSlot.objects.all()
+        daily_schedule, created = DailySchedule.objects.get_or_create(site=self.site, date=target_date)
 
-        sessions_created = 0
-        for time_slot in time_slots:
-            session, created = TourSession.objects.get_or_create(
-                daily_schedule=daily_schedule,
-                time_slot=time_slot
-            )
-            if created:
-                sessions_created += 1
+        # Create sessions for any time slots that don't have one yet
+        existing_slot_ids = set(
+            TourSession.objects.filter(daily_schedule=daily_schedule).values_list('time_slot_id', flat=True)
+        )
+        new_sessions = [
+            TourSession(daily_schedule=daily_schedule, time_slot=time_slot)
+            for time_slot in slots_for_date(target_date, self.site, templates)
+            if time_slot.id not in existing_slot_ids
+        ]
 
-        return sessions_created, daily_schedule
+        return len(bulk_create_validated(new_sessions, ignore_conflicts=True)), daily_schedule
 
     def generate_sessions_for_month(self, year, month):
         """Generate sessions for all days in a month."""
@@ -76,10 +102,11 @@ class SchedulingService:
 
         total_sessions = 0
         schedules_created = []
+        templates = active_templates(target_date, last_day, self.site)
 
         current_date = target_date
         while current_date <= last_day:
-            sessions_count, daily_schedule = self.generate_sessions_for_date(current_date)
+            sessions_count, daily_schedule = self.generate_sessions_for_date(current_date, templates)
             total_sessions += sessions_count
             schedules_created.append(daily_schedule)
             current_date += timedelta(days=1)
@@ -136,14 +163,13 @@ class SchedulingService:
             return errors
 
         guide = session.assigned_guide
-        session_date = session.daily_schedule.date
         current_slot = session.time_slot
 
         # Get all other sessions for this guide on the same day
         other_sessions = TourSession.objects.filter(
-            daily_schedule__date=session_date,
+            daily_schedule_id=session.daily_schedule_id,
             assigned_guide=guide
-        ).exclude(id=session.id)
+        ).exclude(id=session.id).select_related('time_slot')
 
         for other_session in other_sessions:
             other_slot = other_session.time_slot
@@ -177,6 +203,7 @@ class SchedulingService:
         start_dt = datetime.combine(date.today(), start_time)
         return int((start_dt - end_dt).total_seconds() / 60)
 
+    @forbid_lazy_loads()
     def validate_daily_schedule(self, daily_schedule):
         """
         Validate entire daily schedule.
@@ -188,14 +215,14 @@ class SchedulingService:
         }
 
         # Check if standby guide is assigned
-        if not daily_schedule.standby_guide:
+        if not daily_schedule.standby_guide_id:
             errors['general'].append("No standby guide assigned")
 
         # Check if standby guide is available
-        if daily_schedule.standby_guide:
+        if daily_schedule.standby_guide_id:
             try:
                 availability = GuideAvailability.objects.get(
-                    guide=daily_schedule.standby_guide,
+                    guide_id=daily_schedule.standby_guide_id,
                     date=daily_schedule.date
                 )
                 if not availability.is_available:
@@ -204,7 +231,7 @@ class SchedulingService:
                 pass
 
         # Validate each session
-        for session in daily_schedule.sessions.all():
+        for session in daily_schedule.sessions.with_people():
             session_errors = self.validate_session_assignment(session)
             if session_errors:
                 errors['sessions'][session.id] = session_errors
@@ -224,44 +251,50 @@ class SchedulingService:
         """
         Get list of guides who can work a specific session.
         Returns queryset of eligible guides.
+
+        Each active guide at the session's site is checked in memory with
+        find_session_errors() against the day's current assignments, so
+        the check takes three queries however many guides there are.
         """
         time_slot = session.time_slot
         session_date = session.daily_schedule.date
+        site_id = session.daily_schedule.site_id
 
-        # Start with all active guides
-        eligible_guides = Guide.objects.filter(is_active=True)
-
-        # Filter by guide type compatibility
-        eligible_guide_ids = []
-        for guide in eligible_guides:
-            if guide.can_work_timeslot(time_slot):
-                eligible_guide_ids.append(guide.id)
-
-        eligible_guides = Guide.objects.filter(id__in=eligible_guide_ids)
+        # Start with all active guides at the session's site
+        guides = Guide.objects.filter(site_id=site_id, is_active=True)
 
-        # Filter by availability
-        unavailable_guide_ids = GuideAvailability.objects.filter(
+        unavailable_guide_ids = set(GuideAvailability.objects.filter(
+            site_id=site_id,
             date=session_date,
             is_available=False
-        ).values_list('guide_id', flat=True)
-
-        eligible_guides = eligible_guides.exclude(id__in=unavailable_guide_ids)
+        ).values_list('guide_id', flat=True))
+
+        # The day's assignments, per guide
+        slots = {time_slot.id: time_slot}
+        sessions_by_guide = {}
+        for other in TourSession.objects.filter(
+            daily_schedule_id=session.daily_schedule_id,
+            assigned_guide__isnull=False
+        ).select_related('time_slot'):
+            slots[other.time_slot_id] = other.time_slot
+            sessions_by_guide.setdefault(other.assigned_guide_id, []).append(
+                (other.id, other.time_slot_id, other.assigned_guide_id)
+            )
 
-        # Filter guides who already have conflicting sessions or break violations
+        # Filter by guide type, availability, conflicting sessions and breaks,
+        # as if the guide were added to the slot (None: the candidate)
         valid_guide_ids = []
-        for guide in eligible_guides:
-            # Temporarily assign guide to check validation
-            temp_session = TourSession(
-                daily_schedule=session.daily_schedule,
-                time_slot=time_slot,
-                assigned_guide=guide
-            )
-            validation_errors = self.validate_session_assignment(temp_session)
-            if not validation_errors:
+        for guide in guides:
+            if guide.id in unavailable_guide_ids or not guide.can_work_timeslot(time_slot):
+                continue
+            candidate = sessions_by_guide.get(guide.id, []) + [(None, time_slot.id, guide.id)]
+            errors = self.find_session_errors(session_date, candidate, slots, {guide.id: guide}, unavailable_guide_ids)
+            if None not in errors:
                 valid_guide_ids.append(guide.id)
 
         return Guide.objects.filter(id__in=valid_guide_ids)
 
+    @forbid_lazy_loads()
     def can_publish_schedule(self, daily_schedule):
         """
         Check if a schedule can be published.
@@ -272,7 +305,7 @@ class SchedulingService:
         can_publish = (
             not errors['general'] and
             not errors['sessions'] and
-            daily_schedule.standby_guide is not None
+            daily_schedule.standby_guide_id is not None
         )
 
         all_errors = errors['general'].copy()
@@ -334,7 +367,10 @@ class SchedulingService:
 
         return False
 
-    def auto_schedule_day(self, daily_schedule, assign_standby=True):
+    @forbid_lazy_loads()
+    @transaction.atomic
+    def auto_schedule_day(self, daily_schedule, assign_standby=True, seed=None, time_budget_ms=0,
+                          source=SchedulerRun.SOURCE_OTHER):
         """
         Automatically assign guides to all sessions for a day.
         Optimizes for maximum coverage with minimal guides.
@@ -345,43 +381,148 @@ class SchedulingService:
         3. No more than 2 consecutive tours per guide
         4. Maximum 4 tours per guide per day
 
+        Standby is part of the objective: a standby is reserved before
+        assignment (see _standby_scores) and only given tours when no other
+        guide can take them.
+
+        Deterministic: candidates are considered in id order and every tie
+        is broken by a guide ranking shuffled with `seed` (default: derived
+        from the date), so the same data and seed give the same schedule.
+
+        With time_budget_ms > 0 the greedy result is then improved by local
+        search (apps.scheduling.local_search) for up to that many
+        milliseconds; the best solution found in time is saved.
+
         Returns: dict with results including:
             - assigned_count: number of sessions assigned
             - unfillable_count: number of sessions that cannot be filled
             - unfillable_sessions: list of session IDs that cannot be filled
+            - standby_guide_id: the day's standby guide (None if none available)
+            - seed: the tie-breaking seed used
+            - fingerprint: solution_fingerprint() of the day after the run
+            - improvement: local search stats (only with time_budget_ms)
+            - run_id: the SchedulerRun recorded for this call (see telemetry)
         """
+        run = RunRecorder(SchedulerRun.KIND_TOUR, daily_schedule.site_id, daily_schedule.date, source)
+        with run.recording():
+            results = self._auto_schedule_day(run, daily_schedule, assign_standby, seed, time_budget_ms)
+        results['run_id'] = run.save(
+            results['assigned_count'], results['unfillable_count'], results['fingerprint']
+        ).id
+        return results
+
+    def _auto_schedule_day(self, run, daily_schedule, assign_standby, seed, time_budget_ms):
+        """Body of auto_schedule_day(), reporting phases and counters to `run`."""
+        run.enter('load')
         results = {
             'assigned_count': 0,
             'unfillable_count': 0,
             'unfillable_sessions': [],
+            'standby_guide_id': daily_schedule.standby_guide_id,
+            'seed': daily_schedule.date.toordinal() if seed is None else seed,
+            'fingerprint': None,
             'errors': []
         }
+        run.algorithm = 'greedy+local_search' if time_budget_ms else 'greedy'
+        run.seed = results['seed']
 
-        # Get all unassigned sessions for this day, ordered by time
-        sessions = TourSession.objects.filter(
+        # One auto-schedule run per day at a time; other dates are not blocked
+        DailySchedule.objects.select_for_update().filter(pk=daily_schedule.pk).first()
+
+        # Get all unassigned sessions for this day, ordered by time.
+        # Sessions a manager is editing right now are left alone (SKIP LOCKED).
+        sessions = list(TourSession.objects.filter(
             daily_schedule=daily_schedule,
             assigned_guide__isnull=True
-        ).select_related('time_slot').order_by('time_slot__start_time')
+        ).select_related('daily_schedule', 'time_slot').select_for_update(
+            skip_locked=True, of=('self',)
+        ).order_by('time_slot__start_time'))
+        sessions_by_id = {session.id: session for session in sessions}
 
         if not sessions:
             results['errors'].append("No unassigned sessions found")
+            results['fingerprint'] = self.solution_fingerprint(daily_schedule)
             return results
 
-        # Get all active guides
-        all_guides = list(Guide.objects.filter(is_active=True))
+        # Get all active guides at the day's site, in a stable order
+        all_guides = list(Guide.objects.filter(site_id=daily_schedule.site_id, is_active=True).order_by('id'))
 
         if not all_guides:
             results['errors'].append("No active guides available")
+            results['fingerprint'] = self.solution_fingerprint(daily_schedule)
             return results
 
         # Track guide assignments to manage workload
         guide_assignments = {guide.id: [] for guide in all_guides}
 
+        # Seeded tie-break ranking: lower rank wins any otherwise equal choice
+        ranked_ids = [guide.id for guide in all_guides]
+        random.Random(results['seed']).shuffle(ranked_ids)
+        tie_rank = {guide_id: rank for rank, guide_id in enumerate(ranked_ids)}
+
+        # Availability snapshot for the day, used for eligibility and the standby choice
+        unavailable_guide_ids = set(
+            GuideAvailability.objects.filter(
+                site_id=daily_schedule.site_id,
+                date=daily_schedule.date,
+                is_available=False
+            ).values_list('guide_id', flat=True)
+        )
+        standby_candidates = [g for g in all_guides if g.id not in unavailable_guide_ids]
+        standby_scores = self._standby_scores(daily_schedule, standby_candidates)
+
+        def standby_key(g):
+            # Fewest tours today, then widest slot coverage, then least duty this month
+            return (len(guide_assignments[g.id]), *standby_scores[g.id], tie_rank[g.id])
+
+        # Reserve the standby now (everyone has 0 tours) so the greedy pass
+        # keeps them free; an existing standby is kept and reserved too
+        reserved_standby_id = daily_schedule.standby_guide_id
+        if assign_standby and not reserved_standby_id and standby_candidates:
+            reserved_standby_id = min(standby_candidates, key=standby_key).id
+
+        run.set_inputs(
+            daily_schedule.date,
+            [(session.id, session.time_slot_id) for session in sessions],
+            [(guide.id, guide.guide_type) for guide in all_guides],
+            sorted(unavailable_guide_ids),
+            daily_schedule.standby_guide_id,
+            assign_standby, results['seed'], time_budget_ms,
+        )
+
+        run.enter('eligibility')
+
+        # The day's tours per guide, as find_session_errors() tuples: the
+        # assignments kept (not locked here), then the greedy pass's
+        slots = {session.time_slot_id: session.time_slot for session in sessions}
+        day_tours = {guide.id: [] for guide in all_guides}
+        fixed_sessions = list(TourSession.objects.filter(
+            daily_schedule=daily_schedule,
+            assigned_guide__isnull=False
+        ).exclude(id__in=list(sessions_by_id)).select_related('time_slot'))
+        for fixed in fixed_sessions:
+            slots[fixed.time_slot_id] = fixed.time_slot
+            if fixed.assigned_guide_id in day_tours:
+                day_tours[fixed.assigned_guide_id].append(
+                    (fixed.id, fixed.time_slot_id, fixed.assigned_guide_id)
+                )
+
+        def can_take(guide, session):
+            # validate_session_assignment() against the snapshot: guide type,
+            # availability, 30-minute buffer
+            candidate = day_tours[guide.id] + [(session.id, session.time_slot_id, guide.id)]
+            errors = self.find_session_errors(
+                daily_schedule.date, candidate, slots, {guide.id: guide}, unavailable_guide_ids
+            )
+            return session.id not in errors
+
         # Build list of (session, eligible_guides) sorted by constraint
         session_options = []
         for session in sessions:
-            eligible = self.get_available_guides_for_session(session)
-            eligible_list = list(eligible)
+            eligible_list = sorted(
+                (guide for guide in all_guides if can_take(guide, session)),
+                key=lambda g: tie_rank.get(g.id, len(tie_rank))
+            )
             session_options.append({
                 'session': session,
                 'eligible_guides': eligible_list,
@@ -391,6 +532,8 @@ class SchedulingService:
         # Sort by number of eligible guides (most constrained first)
         session_options.sort(key=lambda x: x['count'])
 
+        run.enter('search')
+
         # Assign guides using strategy to MINIMIZE total guides used
         # Key principle: Maximize each guide's utilization before using another guide
         for option in session_options:
@@ -406,6 +549,7 @@ class SchedulingService:
             # Filter to only guides who can actually take this session (re-validate + new constraints)
             valid_guides = []
             for guide in eligible_guides:
+                run.candidates_evaluated += 1
                 temp_session = TourSession(
                     id=session.id,
                     daily_schedule=session.daily_schedule,
@@ -414,17 +558,11 @@ class SchedulingService:
                 )
 
                 # Check basic validation (guide type, availability, 30-min buffer)
-                validation_errors = self.validate_session_assignment(temp_session)
-                if validation_errors:
+                if not can_take(guide, session):
                     continue
 
                 # Get guide's currently assigned sessions
-                guide_current_sessions = []
-                for sess_id in guide_assignments[guide.id]:
-                    try:
-                        guide_current_sessions.append(TourSession.objects.get(id=sess_id))
-                    except TourSession.DoesNotExist:
-                        pass
+                guide_current_sessions = [sessions_by_id[sess_id] for sess_id in guide_assignments[guide.id]]
 
                 # CONSTRAINT 1: Max 4 tours per guide per day
                 if len(guide_current_sessions) >= 4:
@@ -454,6 +592,10 @@ class SchedulingService:
                 results['unfillable_sessions'].append(session.id)
                 continue
 
+            # The reserved standby only takes a tour nobody else can
+            if len(valid_guides) > 1:
+                valid_guides = [g for g in valid_guides if g.id != reserved_standby_id]
+
             # Separate into guides already working vs not working
             guides_with_work = [g for g in valid_guides if len(guide_assignments[g.id]) > 0]
             guides_without_work = [g for g in valid_guides if len(guide_assignments[g.id]) == 0]
@@ -463,7 +605,7 @@ class SchedulingService:
             if guides_with_work:
                 # Sort by: (has room for more tours, number of assignments)
                 def guide_priority(g):
-                    guide_sessions = [TourSession.objects.get(id=sid) for sid in guide_assignments[g.id]]
+                    guide_sessions = [sessions_by_id[sid] for sid in guide_assignments[g.id]]
                     temp_s = TourSession(
                         daily_schedule=session.daily_schedule,
                         time_slot=session.time_slot,
@@ -471,7 +613,7 @@ class SchedulingService:
                     )
                     consecutive = self._check_consecutive_tours(guide_sessions, temp_s)
                     # Prioritize guides who aren't at consecutive limit, then by assignment count
-                    return (consecutive < 2, len(guide_assignments[g.id]))
+                    return (consecutive < 2, len(guide_assignments[g.id]), -tie_rank[g.id])
 
                 best_guide = max(guides_with_work, key=guide_priority)
             # PRIORITY 2: Only use a new guide if no working guide can take it
@@ -481,43 +623,283 @@ class SchedulingService:
                 best_guide = None
 
             if best_guide:
-                # Assign the guide
+                # Assign the guide (written with the rest of the day below)
                 session.assigned_guide = best_guide
-                session.save()
                 guide_assignments[best_guide.id].append(session.id)
+                day_tours[best_guide.id].append((session.id, session.time_slot_id, best_guide.id))
                 results['assigned_count'] += 1
             else:
                 # Should not reach here, but handle it
                 results['unfillable_count'] += 1
                 results['unfillable_sessions'].append(session.id)
 
-        # Optionally assign standby guide (guide with fewest assignments)
-        if assign_standby and not daily_schedule.standby_guide:
-            # Find guide with least assignments who is available
-            available_guides = [g for g in all_guides if len(guide_assignments[g.id]) < len(sessions)]
-
-            # Check availability
-            available_on_date = []
-            for guide in available_guides:
-                try:
-                    avail = GuideAvailability.objects.get(
-                        guide=guide,
-                        date=daily_schedule.date
-                    )
-                    if avail.is_available:
-                        available_on_date.append(guide)
-                except GuideAvailability.DoesNotExist:
-                    # No record means available
-                    available_on_date.append(guide)
-
-            if available_on_date:
-                # Choose guide with fewest assignments
-                standby = min(available_on_date, key=lambda g: len(guide_assignments[g.id]))
-                daily_schedule.standby_guide = standby
-                daily_schedule.save()
+        # Anytime improvement of the greedy result
+        if time_budget_ms:
+            fixed_slots = {}
+            for fixed in fixed_sessions:
+                fixed_slots.setdefault(fixed.assigned_guide_id, []).append(fixed.time_slot)
+
+            improvement = improve_assignment(
+                sessions,
+                standby_candidates,
+                {session.id: session.assigned_guide_id for session in sessions},
+                fixed_slots=fixed_slots,
+                standby_id=reserved_standby_id,
+                time_budget_ms=time_budget_ms,
+                seed=results['seed'],
+            )
+
+            run.candidates_evaluated += improvement['iterations']
+            run.enter('write')
+
+            guides_by_id = {guide.id: guide for guide in all_guides}
+            for guide_sessions in guide_assignments.values():
+                guide_sessions.clear()
+            for session in sessions:
+                guide_id = improvement['assignment'][session.id]
+                if guide_id != session.assigned_guide_id:
+                    session.assigned_guide = guides_by_id[guide_id] if guide_id else None
+                if guide_id:
+                    guide_assignments[guide_id].append(session.id)
+
+            results['unfillable_sessions'] = [s.id for s in sessions if s.assigned_guide_id is None]
+            results['unfillable_count'] = len(results['unfillable_sessions'])
+            results['assigned_count'] = len(sessions) - results['unfillable_count']
+            results['improvement'] = {
+                key: improvement[key] for key in ('cost_before', 'cost_after', 'iterations', 'elapsed_ms')
+            }
+
+        run.enter('write')
 
+        # Every session taken was unassigned when locked, so only the filled
+        # ones change: one validated bulk UPDATE (bumps version and updated_at)
+        bulk_update_validated([session for session in sessions if session.assigned_guide_id], ['assigned_guide'])
+
+        changes = ChangeLog(daily_schedule.site_id)
+        for session in sessions:
+            changes.add(daily_schedule.date, ScheduleChange.KIND_GUIDE, session.id, None, session.assigned_guide_id)
+
+        # Assign the standby: the reserved guide unless the greedy pass had
+        # to give them tours and a less busy guide is available
+        if assign_standby and not daily_schedule.standby_guide_id and standby_candidates:
+            standby = min(standby_candidates, key=standby_key)
+            daily_schedule.standby_guide = standby
+            daily_schedule.save()
+            results['standby_guide_id'] = standby.id
+            changes.add(daily_schedule.date, ScheduleChange.KIND_STANDBY, daily_schedule.id, None, standby.id)
+        changes.save()
+
+        results['fingerprint'] = self.solution_fingerprint(daily_schedule)
+
+        run.objective = {
+            'assigned': results['assigned_count'],
+            'unfillable': results['unfillable_count'],
+            'guides_used': sum(1 for guide_sessions in guide_assignments.values() if guide_sessions),
+            'standby_tours': len(guide_assignments.get(results['standby_guide_id'], [])),
+        }
+        if 'improvement' in results:
+            run.objective['cost_before'] = results['improvement']['cost_before']
+            run.objective['cost_after'] = results['improvement']['cost_after']
         return results
 
+    def solution_fingerprint(self, daily_schedule):
+        """
+        Short hash of a day's assignments and standby. Equal fingerprints
+        mean identical schedules, so benchmark or parallel batch runs can be
+        compared without diffing rows.
+        """
+        assignments = TourSession.objects.filter(
+            daily_schedule=daily_schedule
+        ).order_by('time_slot__start_time').values_list('time_slot__start_time', 'assigned_guide_id')
+        standby_id = DailySchedule.objects.filter(pk=daily_schedule.pk).values_list('standby_guide_id', flat=True).first()
+
+        payload = repr((
+            daily_schedule.date.isoformat(),
+            [(start.strftime('%H:%M'), guide_id) for start, guide_id in assignments],
+            standby_id,
+        ))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _standby_scores(self, daily_schedule, guides):
+        """
+        Standby preference for each guide on a day, lower is better:
+        (-slots of the day their type can cover, standby days so far this month).
+        """
+        slots = TourTimeSlot.objects.filter(toursession__daily_schedule=daily_schedule)
+        slots = list(slots) or list(TourTimeSlot.objects.filter(site_id=daily_schedule.site_id))
+
+        month_start = daily_schedule.date.replace(day=1)
+        duty = dict(
+            DailySchedule.objects.filter(
+                site_id=daily_schedule.site_id,
+                date__gte=month_start,
+                date__lt=daily_schedule.date,
+                standby_guide__isnull=False
+            ).values_list('standby_guide_id').annotate(days=Count('id'))
+        )
+
+        return {
+            guide.id: (-sum(1 for slot in slots if guide.can_work_timeslot(slot)), duty.get(guide.id, 0))
+            for guide in guides
+        }
+
+    def find_session_errors(self, day, sessions, slots, guides, unavailable_guide_ids):
+        """
+        In-memory version of validate_session_assignment() for one day.
+
+        Args:
+            day: date of the sessions
+            sessions: list of (session_id, time_slot_id, guide_id) tuples
+            slots: dict of time_slot_id -> TourTimeSlot
+            guides: dict of guide_id -> Guide
+            unavailable_guide_ids: set of guide ids unavailable on `day`
+
+        Returns: dict of session_id -> list of error messages (same wording
+        as validate_session_assignment), for sessions with errors only.
+        """
+        errors = {}
+        by_guide = {}
+        for session_id, slot_id, guide_id in sessions:
+            if guide_id is not None:
+                by_guide.setdefault(guide_id, []).append((session_id, slots[slot_id]))
+
+        for guide_id, guide_sessions in by_guide.items():
+            guide = guides[guide_id]
+            for session_id, slot in guide_sessions:
+                session_errors = []
+
+                # 1. Guide type compatibility
+                if not guide.can_work_timeslot(slot):
+                    session_errors.append(
+                        f"{guide.get_guide_type_display()} guide cannot work {slot} time slot"
+                    )
+
+                # 2. Availability
+                if guide_id in unavailable_guide_ids:
+                    session_errors.append(f"Guide marked as unavailable on {day}")
+
+                # 3. 30-minute break between this guide's tours
+                for other_id, other_slot in guide_sessions:
+                    if other_id == session_id:
+                        continue
+                    if slot.end_time <= other_slot.start_time:
+                        gap = self._calculate_time_gap(slot.end_time, other_slot.start_time)
+                    elif other_slot.end_time <= slot.start_time:
+                        gap = self._calculate_time_gap(other_slot.end_time, slot.start_time)
+                    else:
+                        session_errors.append(
+                            f"Session overlaps with another assigned tour at {other_slot}"
+                        )
+                        continue
+                    if gap < 30:
+                        session_errors.append(
+                            f"Less than 30-minute break between {slot} and {other_slot} "
+                            f"(gap: {gap} minutes)"
+                        )
+
+                if session_errors:
+                    errors[session_id] = session_errors
+
+        return errors
+
+    @forbid_lazy_loads()
+    def get_range_data(self, start_date, end_date, include_assignments=True):
+        """
+        Per-day stats and assignments for a date range in a fixed number of
+        queries (schedules, slots, sessions, unavailability, guides).
+
+        Returns a columnar dict: each table is a dict of equal-length lists,
+        and guides/slots/days are referenced by their index in their table
+        rather than repeated per session. With include_assignments=False
+        only the per-day stats are returned.
+        """
+        site = self.site
+        schedules = list(
+            DailySchedule.objects.filter(
+                site=site,
+                date__gte=start_date,
+                date__lte=end_date
+            ).order_by('date').values_list('id', 'date', 'is_published', 'standby_guide_id')
+        )
+        slots = {slot.id: slot for slot in TourTimeSlot.objects.filter(site=site).order_by('start_time')}
+        sessions = TourSession.objects.filter(
+            daily_schedule__site=site,
+            daily_schedule__date__gte=start_date,
+            daily_schedule__date__lte=end_date
+        ).order_by().values_list('daily_schedule_id', 'id', 'time_slot_id', 'assigned_guide_id')
+        unavailable_by_day = {}
+        for day, guide_id in GuideAvailability.objects.filter(
+            site=site,
+            date__gte=start_date,
+            date__lte=end_date,
+            is_available=False
+        ).values_list('date', 'guide_id'):
+            unavailable_by_day.setdefault(day, set()).add(guide_id)
+
+        sessions_by_day = {}
+        guide_ids = {standby_id for _, _, _, standby_id in schedules if standby_id}
+        for schedule_id, session_id, slot_id, guide_id in sessions:
+            sessions_by_day.setdefault(schedule_id, []).append((session_id, slot_id, guide_id))
+            if guide_id:
+                guide_ids.add(guide_id)
+        guides = {
+            guide.id: guide
+            for guide in Guide.objects.filter(id__in=guide_ids).select_related('user')
+        }
+
+        # Dictionary encoding: ids -> table index
+        guide_index = {guide_id: i for i, guide_id in enumerate(guides)}
+        slot_index = {slot_id: i for i, slot_id in enumerate(slots)}
+
+        data = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'slots': {
+                'id': list(slots),
+                'start_time': [slot.start_time.strftime('%H:%M') for slot in slots.values()],
+                'end_time': [slot.end_time.strftime('%H:%M') for slot in slots.values()],
+            },
+            'guides': {
+                'id': list(guides),
+                'name': [g.user.get_full_name() or g.user.username for g in guides.values()],
+                'guide_type': [g.guide_type for g in guides.values()],
+            },
+            'days': {key: [] for key in (
+                'date', 'is_published', 'total', 'assigned', 'unassigned',
+                'error_count', 'standby', 'standby_unavailable'
+            )},
+            'sessions': {key: [] for key in ('day', 'id', 'slot', 'guide', 'has_error')},
+        }
+        days, columns = data['days'], data['sessions']
+
+        for day_index, (schedule_id, day, is_published, standby_id) in enumerate(schedules):
+            day_sessions = sorted(sessions_by_day.get(schedule_id, []), key=lambda s: slot_index[s[1]])
+            unavailable_ids = unavailable_by_day.get(day, set())
+            errors = self.find_session_errors(day, day_sessions, slots, guides, unavailable_ids)
+            assigned = sum(1 for _, _, guide_id in day_sessions if guide_id)
+
+            days['date'].append(day.isoformat())
+            days['is_published'].append(is_published)
+            days['total'].append(len(day_sessions))
+            days['assigned'].append(assigned)
+            days['unassigned'].append(len(day_sessions) - assigned)
+            days['error_count'].append(len(errors))
+            days['standby'].append(guide_index.get(standby_id))
+            days['standby_unavailable'].append(standby_id in unavailable_ids)
+
+            if not include_assignments:
+                continue
+            for session_id, slot_id, guide_id in day_sessions:
+                columns['day'].append(day_index)
+                columns['id'].append(session_id)
+                columns['slot'].append(slot_index[slot_id])
+                columns['guide'].append(guide_index.get(guide_id))
+                columns['has_error'].append(session_id in errors)
+
+        if not include_assignments:
+            del data['slots'], data['guides'], data['sessions']
+        return data
+
     def check_session_feasibility(self, session):
         """
         Check if a session can be filled by any guide.
@@ -527,13 +909,14 @@ class SchedulingService:
         eligible_list = list(eligible_guides)
         return len(eligible_list) > 0, eligible_list
 
+    @forbid_lazy_loads()
     def get_daily_feasibility(self, daily_schedule):
         """
         Get feasibility status for all sessions in a day.
         Returns: dict with session_id -> (can_fill: bool, eligible_count: int)
         """
         feasibility = {}
-        sessions = daily_schedule.sessions.all()
+        sessions = daily_schedule.sessions.with_people()
 
         for session in sessions:
             can_fill, eligible = self.check_session_feasibility(session)
@@ -545,12 +928,84 @@ class SchedulingService:
 
         return feasibility
 
+    def publish_blockers(self, start_date, end_date):
+        """
+        What stops each day from start_date to end_date being published, from
+        one get_range_data() pass instead of can_publish_schedule() per day.
+
+        Returns: dict of ISO date -> list of blockers (empty if publishable)
+        """
+        days = self.get_range_data(start_date, end_date, include_assignments=False)['days']
+        blockers = {}
+        for i, day in enumerate(days['date']):
+            errors = blockers[day] = []
+            if days['standby'][i] is None:
+                errors.append("No standby guide assigned")
+            elif days['standby_unavailable'][i]:
+                errors.append("Standby guide marked as unavailable")
+            if days['error_count'][i]:
+                errors.append(f"{days['error_count'][i]} session(s) break the assignment rules")
+            if days['unassigned'][i]:
+                errors.append(f"{days['unassigned'][i]} session(s) not assigned to any guide")
+        return blockers
+
+    @transaction.atomic
+    def publish_range(self, start_date, end_date, publish=True):
+        """
+        Publish (or with publish=False, unpublish) the site's days from
+        start_date to end_date in one UPDATE. Days are locked first, so the
+        checks and the update see the same data; only draft days without
+        publish_blockers() are published.
+
+        Returns: dict with
+            - changed: ISO dates published (or unpublished)
+            - blocked: ISO date -> blockers, for days left as drafts
+            - unchanged: ISO dates already in the requested state
+        """
+        schedules = list(DailySchedule.objects.select_for_update().filter(
+            site=self.site,
+            date__gte=start_date,
+            date__lte=end_date
+        ).order_by('date'))
+        blockers = self.publish_blockers(start_date, end_date) if publish else {}
+
+        results = {'changed': [], 'blocked': {}, 'unchanged': []}
+        changed = []
+        for schedule in schedules:
+            key = schedule.date.isoformat()
+            if schedule.is_published == publish:
+                results['unchanged'].append(key)
+            elif blockers.get(key):
+                results['blocked'][key] = blockers[key]
+            else:
+                changed.append(schedule)
+                results['changed'].append(key)
+
+        now = timezone.now()
+        DailySchedule.objects.filter(id__in=[schedule.id for schedule in changed]).update(
+            is_published=publish,
+            published_at=now if publish else None,
+            updated_at=now
+        )
+        changes = ChangeLog(self.site.id)
+        for schedule in changed:
+            changes.add(schedule.date, ScheduleChange.KIND_TOUR_PUBLISHED, schedule.id, int(not publish), int(publish))
+        changes.save()
+
+        # Guides see published days through their feeds and rosters
+        refresh_feeds_for_tour_dates(changed)
+        for schedule in changed:
+            schedule.is_published = publish
+            materialise_tour_date(schedule)
+
+        return results
+
 
 # ============================================================================
 # RESTAURANT STAFF SCHEDULING SERVICE
 # ============================================================================
 
-class RestaurantSchedulingService:
+class RestaurantSchedulingService(SiteScopedService):
     """Service class for restaurant staff scheduling operations."""
 
     # Optimal shift patterns (Pattern A: Mixed 4h + 8h shifts)
@@ -575,36 +1030,40 @@ class RestaurantSchedulingService:
 
         # Get or create daily schedule
         daily_schedule, created = DailyRestaurantSchedule.objects.get_or_create(
+            site=self.site,
             date=target_date
         )
 
-        shifts_created = 0
-
-        # Create shifts for kitchen staff (using mixed pattern)
-        for pattern in self.SHIFT_PATTERN_MIXED:
-            shift, created = StaffShift.objects.get_or_create(
+        # Create unassigned shifts for kitchen and serving staff (using mixed pattern).
+        # Both sets share the same unassigned templates, so only missing ones are added.
+        existing = set(
+            StaffShift.objects.filter(
                 daily_schedule=daily_schedule,
-                start_time=pattern['start'],
-                end_time=pattern['end'],
-                duration_hours=pattern['duration'],
-                staff=None  # Unassigned
-            )
-            if created:
-                shifts_created += 1
+                staff__isnull=True
+            ).values_list('start_time', 'end_time', 'duration_hours')
+        )
 
-        # Create shifts for serving staff (using mixed pattern)
-        for pattern in self.SHIFT_PATTERN_MIXED:
-            shift, created = StaffShift.objects.get_or_create(
+        new_shifts = []
+        for pattern in self.SHIFT_PATTERN_MIXED + self.SHIFT_PATTERN_MIXED:
+            key = (pattern['start'], pattern['end'], pattern['duration'])
+            if key in existing:
+                continue
+            existing.add(key)
+            new_shifts.append(StaffShift(
                 daily_schedule=daily_schedule,
                 start_time=pattern['start'],
                 end_time=pattern['end'],
                 duration_hours=pattern['duration'],
                 staff=None  # Unassigned
-            )
-            if created:
-                shifts_created += 1
+            ))
 
-        return shifts_created, daily_schedule
+        with transaction.atomic():
+            created_shifts = bulk_create_validated(new_shifts)
+            changes = ChangeLog(daily_schedule.site_id)
+            for shift in created_shifts:
+                changes.add(target_date, ScheduleChange.KIND_SHIFT_ADDED, shift.id, None, None)
+            changes.save()
+        return len(created_shifts), daily_schedule
 
     def get_available_staff(self, target_date, staff_type):
         """
@@ -619,14 +1078,16 @@ class RestaurantSchedulingService:
         """
         from apps.scheduling.models import RestaurantStaff, StaffAvailability
 
-        # Get all active staff of this type
+        # Get all active staff of this type at the site
         staff_qs = RestaurantStaff.objects.filter(
+            site=self.site,
             is_active=True,
             staff_type=staff_type
         )
 
         # Exclude staff marked as unavailable
         unavailable_staff_ids = StaffAvailability.objects.filter(
+            site=self.site,
             date=target_date,
             is_available=False
         ).values_list('staff_id', flat=True)
@@ -636,6 +1097,7 @@ class RestaurantSchedulingService:
         # Exclude staff already assigned to a shift on this date
         from apps.scheduling.models import StaffShift
         assigned_staff_ids = StaffShift.objects.filter(
+            daily_schedule__site=self.site,
             daily_schedule__date=target_date,
             staff__isnull=False
         ).values_list('staff_id', flat=True)
@@ -644,7 +1106,9 @@ class RestaurantSchedulingService:
 
         return staff_qs.order_by('user__first_name', 'user__last_name')
 
-    def auto_schedule_day(self, daily_schedule, pattern='mixed'):
+    @forbid_lazy_loads()
+    @transaction.atomic
+    def auto_schedule_day(self, daily_schedule, pattern='mixed', source=SchedulerRun.SOURCE_OTHER):
         """
         Auto-assign staff to all shifts for a day.
 
@@ -653,6 +1117,7 @@ class RestaurantSchedulingService:
         Args:
             daily_schedule: DailyRestaurantSchedule instance
             pattern: 'mixed' (default) or 'all_8h'
+            source: SchedulerRun source recorded for this call
 
         Returns:
             dict with results:
@@ -661,9 +1126,20 @@ class RestaurantSchedulingService:
                 - total_staff: total staff assigned
                 - unfillable_count: shifts that couldn't be filled
                 - errors: list of error messages
+                - run_id: the SchedulerRun recorded for this call
         """
-        from apps.scheduling.models import StaffShift, RestaurantStaff
+        run = RunRecorder(SchedulerRun.KIND_RESTAURANT, daily_schedule.site_id, daily_schedule.date, source)
+        with run.recording():
+            results = self._auto_schedule_day(run, daily_schedule, pattern)
+        results['run_id'] = run.save(results['total_staff'], results['unfillable_count']).id
+        return results
+
+    def _auto_schedule_day(self, run, daily_schedule, pattern):
+        """Body of auto_schedule_day(), reporting phases and counters to `run`."""
+        from apps.scheduling.models import StaffShift, RestaurantStaff, StaffAvailability, DailyRestaurantSchedule
 
+        run.enter('load')
+        run.algorithm = f'pattern:{pattern}'
         results = {
             'kitchen_assigned': 0,
             'serving_assigned': 0,
@@ -675,105 +1151,103 @@ class RestaurantSchedulingService:
 
         target_date = daily_schedule.date
 
+        # One auto-schedule run per day at a time; other dates are not blocked
+        DailyRestaurantSchedule.objects.select_for_update().filter(pk=daily_schedule.pk).first()
+
         # Select shift pattern
         if pattern == 'all_8h':
             shift_patterns = self.SHIFT_PATTERN_ALL_8H
         else:
             shift_patterns = self.SHIFT_PATTERN_MIXED
 
-        # Clear existing assignments for this day
-        StaffShift.objects.filter(daily_schedule=daily_schedule).delete()
+        # Load active staff and the day's unavailability once. Existing shifts
+        # for the day are replaced below, so nobody counts as already assigned.
+        unavailable_staff_ids = set(
+            StaffAvailability.objects.filter(
+                site_id=daily_schedule.site_id,
+                date=target_date,
+                is_available=False
+            ).values_list('staff_id', flat=True)
+        )
+        available_staff = {'kitchen': [], 'serving': []}
+        active_staff = list(RestaurantStaff.objects.filter(
+            site_id=daily_schedule.site_id,
+            is_active=True
+        ).order_by('user__first_name', 'user__last_name'))
+
+        run.set_inputs(
+            target_date, pattern,
+            [(staff.id, staff.staff_type) for staff in active_staff],
+            sorted(unavailable_staff_ids),
+        )
+        run.enter('eligibility')
 
-        # Get all available kitchen staff
-        available_kitchen_staff = list(self.get_available_staff(target_date, 'kitchen'))
+        for staff in active_staff:
+            run.candidates_evaluated += 1
+            if staff.id not in unavailable_staff_ids and staff.staff_type in available_staff:
+                available_staff[staff.staff_type].append(staff)
 
-        if len(available_kitchen_staff) < 4:
-            results['errors'].append(
-                f"Insufficient kitchen staff: need 4, have {len(available_kitchen_staff)}"
-            )
-            results['unfillable_count'] += (4 - len(available_kitchen_staff))
-
-        # Assign kitchen staff (one staff per shift, no overlaps)
-        kitchen_staff_used = set()
-        for i, pattern_def in enumerate(shift_patterns):
-            # Find next available kitchen staff
-            assigned = False
-            for staff in available_kitchen_staff:
-                if staff.id not in kitchen_staff_used:
-                    StaffShift.objects.create(
-                        daily_schedule=daily_schedule,
-                        staff=staff,
-                        start_time=pattern_def['start'],
-                        end_time=pattern_def['end'],
-                        duration_hours=pattern_def['duration']
-                    )
-                    kitchen_staff_used.add(staff.id)
-                    results['kitchen_assigned'] += 1
-                    assigned = True
-                    break
-
-            if not assigned:
-                # Create unassigned shift
-                StaffShift.objects.create(
-                    daily_schedule=daily_schedule,
-                    staff=None,
-                    start_time=pattern_def['start'],
-                    end_time=pattern_def['end'],
-                    duration_hours=pattern_def['duration']
-                )
-                results['unfillable_shifts'].append({
-                    'type': 'kitchen',
-                    'start': pattern_def['start'],
-                    'end': pattern_def['end']
-                })
+        run.enter('search')
 
-        # Get all available serving staff
-        available_serving_staff = list(self.get_available_staff(target_date, 'serving'))
+        # Build all shifts in memory (one staff per shift, no overlaps)
+        new_shifts = []
+        for staff_type in ('kitchen', 'serving'):
+            candidates = available_staff[staff_type]
 
-        if len(available_serving_staff) < 4:
-            results['errors'].append(
-                f"Insufficient serving staff: need 4, have {len(available_serving_staff)}"
-            )
-            results['unfillable_count'] += (4 - len(available_serving_staff))
-
-        # Assign serving staff (one staff per shift, no overlaps)
-        serving_staff_used = set()
-        for i, pattern_def in enumerate(shift_patterns):
-            # Find next available serving staff
-            assigned = False
-            for staff in available_serving_staff:
-                if staff.id not in serving_staff_used:
-                    StaffShift.objects.create(
-                        daily_schedule=daily_schedule,
-                        staff=staff,
-                        start_time=pattern_def['start'],
-                        end_time=pattern_def['end'],
-                        duration_hours=pattern_def['duration']
-                    )
-                    serving_staff_used.add(staff.id)
-                    results['serving_assigned'] += 1
-                    assigned = True
-                    break
-
-            if not assigned:
-                # Create unassigned shift
-                StaffShift.objects.create(
+            if len(candidates) < 4:
+                results['errors'].append(
+                    f"Insufficient {staff_type} staff: need 4, have {len(candidates)}"
+                )
+                results['unfillable_count'] += (4 - len(candidates))
+
+            for i, pattern_def in enumerate(shift_patterns):
+                staff = candidates[i] if i < len(candidates) else None
+                new_shifts.append(StaffShift(
                     daily_schedule=daily_schedule,
-                    staff=None,
+                    staff=staff,
                     start_time=pattern_def['start'],
                     end_time=pattern_def['end'],
                     duration_hours=pattern_def['duration']
-                )
-                results['unfillable_shifts'].append({
-                    'type': 'serving',
-                    'start': pattern_def['start'],
-                    'end': pattern_def['end']
-                })
+                ))
+
+                if staff:
+                    results[f'{staff_type}_assigned'] += 1
+                else:
+                    # Leave the shift unassigned
+                    results['unfillable_shifts'].append({
+                        'type': staff_type,
+                        'start': pattern_def['start'],
+                        'end': pattern_def['end']
+                    })
+
+        coverage = self.compute_coverage(
+            (shift.start_time, shift.end_time, shift.staff.staff_type) for shift in new_shifts if shift.staff
+        )
+
+        run.enter('write')
+
+        # Replace the day's shifts in one transaction
+        with transaction.atomic():
+            old_shifts = StaffShift.objects.filter(daily_schedule=daily_schedule)
+            changes = ChangeLog(daily_schedule.site_id)
+            for shift_id, staff_id in old_shifts.values_list('id', 'staff_id'):
+                changes.add(target_date, ScheduleChange.KIND_SHIFT_REMOVED, shift_id, staff_id, None)
+            old_shifts.delete()
+            for shift in bulk_create_validated(new_shifts):
+                changes.add(target_date, ScheduleChange.KIND_SHIFT_ADDED, shift.id, None, shift.staff_id)
+            changes.save()
 
         results['total_staff'] = results['kitchen_assigned'] + results['serving_assigned']
 
+        run.objective = {
+            'assigned': results['total_staff'],
+            'unfillable': results['unfillable_count'],
+            'coverage_gaps': len(coverage['gaps']),
+            'total_hours': sum(shift.duration_hours for shift in new_shifts if shift.staff),
+        }
         return results
 
+    @forbid_lazy_loads()
     def validate_coverage(self, daily_schedule):
         """
         Validate that minimum coverage (2 kitchen + 2 serving) is met at all times.
@@ -789,20 +1263,30 @@ class RestaurantSchedulingService:
         """
         from apps.scheduling.models import StaffShift
 
-        # Operating hours: 10:00 AM - 9:30 PM
-        # Check coverage for each 30-minute period
+        # Get all assigned shifts for this day
+        shifts = StaffShift.objects.filter(
+            daily_schedule=daily_schedule,
+            staff__isnull=False
+        ).order_by().values_list('start_time', 'end_time', 'staff__staff_type')
+
+        return self.compute_coverage(shifts)
 
+    def compute_coverage(self, shifts):
+        """
+        Coverage check over in-memory shifts, shared by validate_coverage()
+        and the range/heatmap views.
+
+        Args:
+            shifts: iterable of (start_time, end_time, staff_type) for assigned shifts
+
+        Returns: same dict as validate_coverage()
+        """
         validation = {
             'is_valid': True,
             'gaps': [],
             'coverage_by_hour': {}
         }
-
-        # Get all assigned shifts for this day
-        shifts = StaffShift.objects.filter(
-            daily_schedule=daily_schedule,
-            staff__isnull=False
-        ).select_related('staff')
+        shifts = list(shifts)
 
         # Check coverage for each half-hour period
         # Operating hours: 10:00 AM - 9:30 PM
@@ -815,12 +1299,12 @@ class RestaurantSchedulingService:
             kitchen_count = 0
             serving_count = 0
 
-            for shift in shifts:
+            for shift_start, shift_end, staff_type in shifts:
                 # Check if this shift covers current_time
-                if shift.start_time <= current_time < shift.end_time:
-                    if shift.staff.staff_type == 'kitchen':
+                if shift_start <= current_time < shift_end:
+                    if staff_type == 'kitchen':
                         kitchen_count += 1
-                    elif shift.staff.staff_type == 'serving':
+                    elif staff_type == 'serving':
                         serving_count += 1
 
             # Store coverage
@@ -852,6 +1336,98 @@ class RestaurantSchedulingService:
 
         return validation
 
+    @forbid_lazy_loads()
+    def get_range_data(self, start_date, end_date, include_assignments=True):
+        """
+        Per-day summary, coverage and shifts for a date range in a fixed
+        number of queries (schedules, shifts, staff).
+
+        Returns a columnar dict like SchedulingService.get_range_data():
+        staff and days are referenced by their index in their table. With
+        include_assignments=False only the per-day summary is returned.
+        """
+        from apps.scheduling.models import DailyRestaurantSchedule, StaffShift, RestaurantStaff
+
+        site = self.site
+        schedules = list(
+            DailyRestaurantSchedule.objects.filter(
+                site=site,
+                date__gte=start_date,
+                date__lte=end_date
+            ).order_by('date').values_list('id', 'date', 'is_published')
+        )
+        shifts = StaffShift.objects.filter(
+            daily_schedule__site=site,
+            daily_schedule__date__gte=start_date,
+            daily_schedule__date__lte=end_date
+        ).order_by('start_time', 'id').values_list(
+            'daily_schedule_id', 'id', 'staff_id', 'staff__staff_type',
+            'start_time', 'end_time', 'duration_hours'
+        )
+
+        shifts_by_day = {}
+        staff_ids = set()
+        for row in shifts:
+            shifts_by_day.setdefault(row[0], []).append(row[1:])
+            if row[2]:
+                staff_ids.add(row[2])
+        staff = {}
+        if include_assignments:
+            staff = {
+                member.id: member
+                for member in RestaurantStaff.objects.filter(id__in=staff_ids).select_related('user')
+            }
+        staff_index = {staff_id: i for i, staff_id in enumerate(staff)}
+
+        data = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'staff': {
+                'id': list(staff),
+                'name': [member.get_full_name() for member in staff.values()],
+                'staff_type': [member.staff_type for member in staff.values()],
+            },
+            'days': {key: [] for key in (
+                'date', 'is_published', 'total_shifts', 'assigned_shifts', 'unassigned_shifts',
+                'kitchen_staff', 'serving_staff', 'total_hours', 'coverage_valid', 'coverage_gaps'
+            )},
+            'shifts': {key: [] for key in (
+                'day', 'id', 'staff', 'start_time', 'end_time', 'duration_hours'
+            )},
+        }
+        days, columns = data['days'], data['shifts']
+
+        for day_index, (schedule_id, day, is_published) in enumerate(schedules):
+            day_shifts = shifts_by_day.get(schedule_id, [])
+            assigned = [s for s in day_shifts if s[1]]
+            coverage = self.compute_coverage((s[3], s[4], s[2]) for s in assigned)
+
+            days['date'].append(day.isoformat())
+            days['is_published'].append(is_published)
+            days['total_shifts'].append(len(day_shifts))
+            days['assigned_shifts'].append(len(assigned))
+            days['unassigned_shifts'].append(len(day_shifts) - len(assigned))
+            days['kitchen_staff'].append(len({s[1] for s in assigned if s[2] == 'kitchen'}))
+            days['serving_staff'].append(len({s[1] for s in assigned if s[2] == 'serving'}))
+            days['total_hours'].append(sum(s[5] for s in assigned))
+            days['coverage_valid'].append(coverage['is_valid'])
+            days['coverage_gaps'].append(len(coverage['gaps']))
+
+            if not include_assignments:
+                continue
+            for shift_id, staff_id, _, start_time, end_time, duration_hours in day_shifts:
+                columns['day'].append(day_index)
+                columns['id'].append(shift_id)
+                columns['staff'].append(staff_index.get(staff_id))
+                columns['start_time'].append(start_time.strftime('%H:%M'))
+                columns['end_time'].append(end_time.strftime('%H:%M'))
+                columns['duration_hours'].append(duration_hours)
+
+        if not include_assignments:
+            del data['staff'], data['shifts']
+        return data
+
+    @forbid_lazy_loads()
     def get_schedule_summary(self, daily_schedule):
         """
         Get a summary of the schedule for a specific day.
@@ -863,35 +1439,41 @@ class RestaurantSchedulingService:
 
         shifts = StaffShift.objects.filter(
             daily_schedule=daily_schedule
-        ).select_related('staff')
-
-        summary = {
-            'total_shifts': shifts.count(),
-            'assigned_shifts': shifts.filter(staff__isnull=False).count(),
-            'unassigned_shifts': shifts.filter(staff__isnull=True).count(),
-            'kitchen_staff': shifts.filter(
-                staff__staff_type='kitchen',
-                staff__isnull=False
-            ).values('staff').distinct().count(),
-            'serving_staff': shifts.filter(
-                staff__staff_type='serving',
-                staff__isnull=False
-            ).values('staff').distinct().count(),
-            'total_staff': shifts.filter(
-                staff__isnull=False
-            ).values('staff').distinct().count(),
-            'full_day_shifts': shifts.filter(duration_hours=8).count(),
-            'half_day_shifts': shifts.filter(duration_hours=4).count(),
-            'total_hours': sum(shift.duration_hours for shift in shifts if shift.staff),
-        }
+        ).order_by().values_list('staff_id', 'staff__staff_type', 'duration_hours')
 
-        # Add coverage validation
-        validation = self.validate_coverage(daily_schedule)
-        summary['coverage_valid'] = validation['is_valid']
-        summary['coverage_gaps'] = len(validation['gaps'])
+        return self.summarise_shifts(shifts, self.validate_coverage(daily_schedule))
+
+    def summarise_shifts(self, shifts, validation):
+        """
+        Summary statistics over in-memory shifts, shared by
+        get_schedule_summary() and the schedule data API.
 
-        return summary
+        Args:
+            shifts: iterable of (staff_id, staff_type, duration_hours);
+                staff_id is None for unassigned shifts
+            validation: compute_coverage() result for the same day
 
+        Returns: same dict as get_schedule_summary()
+        """
+        shifts = list(shifts)
+        assigned = [shift for shift in shifts if shift[0] is not None]
+
+        return {
+            'total_shifts': len(shifts),
+            'assigned_shifts': len(assigned),
+            'unassigned_shifts': len(shifts) - len(assigned),
+            'kitchen_staff': len({staff_id for staff_id, staff_type, _ in assigned if staff_type == 'kitchen'}),
+            'serving_staff': len({staff_id for staff_id, staff_type, _ in assigned if staff_type == 'serving'}),
+            'total_staff': len({staff_id for staff_id, _, _ in assigned}),
+            'full_day_shifts': sum(1 for _, _, hours in shifts if hours == 8),
+            'half_day_shifts': sum(1 for _, _, hours in shifts if hours == 4),
+            'total_hours': sum(hours for _, _, hours in assigned),
+            # Add coverage validation
+            'coverage_valid': validation['is_valid'],
+            'coverage_gaps': len(validation['gaps']),
+        }
+
+    @forbid_lazy_loads()
     def can_publish_schedule(self, daily_schedule):
         """
         Check if a schedule can be published.
@@ -923,3 +1505,142 @@ class RestaurantSchedulingService:
         can_publish = len(errors) == 0
 
         return can_publish, errors
+
+    def publish_blockers(self, start_date, end_date):
+        """
+        What stops each day from start_date to end_date being published, from
+        one get_range_data() pass instead of can_publish_schedule() per day.
+
+        Returns: dict of ISO date -> list of blockers (empty if publishable)
+        """
+        days = self.get_range_data(start_date, end_date, include_assignments=False)['days']
+        blockers = {}
+        for i, day in enumerate(days['date']):
+            errors = blockers[day] = []
+            if days['coverage_gaps'][i]:
+                errors.append(f"Insufficient coverage in {days['coverage_gaps'][i]} half-hour period(s)")
+            if days['unassigned_shifts'][i]:
+                errors.append(f"{days['unassigned_shifts'][i]} shift(s) not assigned to any staff")
+        return blockers
+
+    @transaction.atomic
+    def publish_range(self, start_date, end_date, publish=True):
+        """
+        Publish (or with publish=False, unpublish) the site's restaurant days
+        from start_date to end_date in one UPDATE, like
+        SchedulingService.publish_range(). Returns the same dict.
+        """
+        from apps.scheduling.models import DailyRestaurantSchedule
+
+        schedules = list(DailyRestaurantSchedule.objects.select_for_update().filter(
+            site=self.site,
+            date__gte=start_date,
+            date__lte=end_date
+        ).order_by('date'))
+        blockers = self.publish_blockers(start_date, end_date) if publish else {}
+
+        results = {'changed': [], 'blocked': {}, 'unchanged': []}
+        changed = []
+        for schedule in schedules:
+            key = schedule.date.isoformat()
+            if schedule.is_published == publish:
+                results['unchanged'].append(key)
+            elif blockers.get(key):
+                results['blocked'][key] = blockers[key]
+            else:
+                changed.append(schedule)
+                results['changed'].append(key)
+
+        now = timezone.now()
+        DailyRestaurantSchedule.objects.filter(id__in=[schedule.id for schedule in changed]).update(
+            is_published=publish,
+            published_at=now if publish else None,
+            updated_at=now
+        )
+        changes = ChangeLog(self.site.id)
+        for schedule in changed:
+            changes.add(
+                schedule.date, ScheduleChange.KIND_RESTAURANT_PUBLISHED, schedule.id, int(not publish), int(publish)
+            )
+        changes.save()
+
+        # Staff see published days through their feeds and rosters
+        refresh_feeds_for_restaurant_dates(changed)
+        for schedule in changed:
+            schedule.is_published = publish
+            materialise_restaurant_date(schedule)
+
+        return results
+
+
+# ============================================================================
+# COMBINED TOUR + RESTAURANT VIEWS
+# ============================================================================
+
+@forbid_lazy_loads()
+def get_coverage_heatmap(start_date, end_date, site=None):
+    """
+    Problem indicators for every date from start_date to end_date at a
+    site (default: the default site), for the month-at-a-glance heatmap. Built from the bulk range data of both
+    services (a fixed number of queries), never per-day validation.
+
+    Returns a list of per-day dicts; tour_*/restaurant_* values are None
+    for dates without that schedule. `level` summarises the day:
+    'empty', 'ok' (published, no problems), 'draft' (no problems, not
+    published), 'warning' (unassigned or coverage gaps), 'error'
+    (assignment rule violations).
+    """
+    site = site or Site.objects.get_default()
+    tour = SchedulingService(site).get_range_data(start_date, end_date, include_assignments=False)['days']
+    restaurant = RestaurantSchedulingService(site).get_range_data(start_date, end_date, include_assignments=False)['days']
+    tour_by_date = {d: i for i, d in enumerate(tour['date'])}
+    restaurant_by_date = {d: i for i, d in enumerate(restaurant['date'])}
+
+    heatmap = []
+    day = start_date
+    while day <= end_date:
+        key = day.isoformat()
+        entry = {
+            'date': key,
+            'tour_unassigned': None,
+            'tour_errors': None,
+            'tour_no_standby': None,
+            'tour_published': None,
+            'restaurant_unassigned': None,
+            'restaurant_gaps': None,
+            'restaurant_published': None,
+        }
+
+        if key in tour_by_date:
+            i = tour_by_date[key]
+            entry.update({
+                'tour_unassigned': tour['unassigned'][i],
+                'tour_errors': tour['error_count'][i] + int(tour['standby_unavailable'][i]),
+                'tour_no_standby': tour['standby'][i] is None,
+                'tour_published': tour['is_published'][i],
+            })
+        if key in restaurant_by_date:
+            i = restaurant_by_date[key]
+            entry.update({
+                'restaurant_unassigned': restaurant['unassigned_shifts'][i],
+                'restaurant_gaps': restaurant['coverage_gaps'][i],
+                'restaurant_published': restaurant['is_published'][i],
+            })
+
+        entry['level'] = _heatmap_level(entry)
+        heatmap.append(entry)
+        day += timedelta(days=1)
+
+    return heatmap
+
+
+def _heatmap_level(entry):
+    exists = [entry['tour_published'] is not None, entry['restaurant_published'] is not None]
+    if not any(exists):
+        return 'empty'
+    if entry['tour_errors']:
+        return 'error'
+    if entry['tour_unassigned'] or entry['tour_no_standby'] or entry['restaurant_unassigned'] or entry['restaurant_gaps']:
+        return 'warning'
+    published = [p for p in (entry['tour_published'], entry['restaurant_published']) if p is not None]
+    return 'ok' if all(published) else 'draft'
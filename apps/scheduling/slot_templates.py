@@ -0,0 +1,240 @@
+"""
+Versioned tour slot templates.
+
+A SlotTemplate lists the tour start times (and durations) for the dates it
+is effective on at one site, with optional per-weekday variants.
+TourTimeSlot stays the site's catalogue of distinct (start, end) pairs;
+templates pick from it, creating missing slots as needed. Dates no
+template covers keep using every slot in the site's catalogue, as before
+templates existed.
+
+When a template changes, migrate_sessions() moves future, unpublished days
+onto it in bulk:
+- sessions whose slot is still in the template are kept
+- sessions whose start time is still in the template but whose end changed
+  are moved onto the new slot, keeping their booking details and their
+  guide if the guide can still work the new slot (guide type, 30-minute
+  breaks); otherwise the guide is unassigned and reported
+- sessions for dropped start times are deleted, unless they hold booking
+  details (those are kept and reported)
+- sessions are created for new start times
+"""
+from datetime import datetime, date, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.scheduling.bulk import bulk_create_validated
+from apps.scheduling.changelog import ChangeLog
+from apps.scheduling.models import TourTimeSlot, TourSession, DailySchedule, SlotTemplate, ScheduleChange
+
+# Used when no template exists yet: tours on the hour from 10am to 8pm,
+# 1.5 hours long (last tour ends at 9:30pm)
+DEFAULT_SLOT_STARTS = [time(hour, 0) for hour in range(10, 21)]
+DEFAULT_TOUR_MINUTES = 90
+
+
+def active_templates(start_date, end_date, site):
+    """A site's active templates overlapping the range, most specific (latest start, newest version) first."""
+    return list(
+        SlotTemplate.objects.filter(
+            site=site,
+            is_active=True,
+            effective_from__lte=end_date
+        ).filter(
+            Q(effective_to__isnull=True) | Q(effective_to__gte=start_date)
+        ).prefetch_related('entries').order_by('-effective_from', '-version')
+    )
+
+
+def template_for(day, templates):
+    """The template in effect on `day` (from active_templates()), or None."""
+    for template in templates:
+        if template.effective_from <= day and (template.effective_to is None or day <= template.effective_to):
+            return template
+    return None
+
+
+def template_times(template, weekday):
+    """[(start_time, duration_minutes)] of a template on a weekday."""
+    entries = list(template.entries.all())
+    variant = [entry for entry in entries if entry.weekday == weekday]
+    chosen = variant or [entry for entry in entries if entry.weekday is None]
+    return sorted((entry.start_time, entry.duration_minutes) for entry in chosen)
+
+
+def ensure_slots(times, site):
+    """A site's TourTimeSlot for each (start_time, duration_minutes), creating missing ones in bulk."""
+    wanted = {(start, _end_time(start, minutes)): minutes for start, minutes in times}
+    slots = TourTimeSlot.objects.filter(site=site, start_time__in={start for start, _ in wanted})
+    existing = {(slot.start_time, slot.end_time): slot for slot in slots}
+    missing = [
+        TourTimeSlot(site=site, start_time=start, end_time=end, duration_minutes=minutes)
+        for (start, end), minutes in wanted.items() if (start, end) not in existing
+    ]
+    if missing:
+        bulk_create_validated(missing, ignore_conflicts=True)
+        existing = {(slot.start_time, slot.end_time): slot for slot in slots.all()}
+    return sorted((existing[key] for key in wanted), key=lambda slot: slot.start_time)
+
+
+def slots_for_date(day, site, templates=None):
+    """Tour slots a new schedule at `site` for `day` gets: its template's, else the site's catalogue."""
+    if templates is None:
+        templates = active_templates(day, day, site)
+    template = template_for(day, templates)
+    if template is None:
+        return list(TourTimeSlot.objects.filter(site=site).order_by('start_time'))
+    return ensure_slots(template_times(template, day.weekday()), site)
+
+
+def slots_for_schedule(daily_schedule, view_date, site):
+    """
+    Columns for a day's grid: the slots of its sessions, or the slots a
+    schedule at `site` for view_date would get when there is none yet.
+    """
+    if daily_schedule is not None:
+        slots = list(
+            TourTimeSlot.objects.filter(toursession__daily_schedule=daily_schedule).order_by('start_time')
+        )
+        if slots:
+            return slots
+    return slots_for_date(view_date, site)
+
+
+@transaction.atomic
+def migrate_sessions(site, start_date=None, end_date=None, dry_run=False):
+    """
+    Move a site's sessions on unpublished days from start_date (default:
+    tomorrow) to end_date (default: the last schedule) onto their
+    template's slots. Days no template covers are left alone.
+
+    Returns a summary dict; with dry_run the plan is computed and nothing
+    is written.
+    """
+    start_date = start_date or timezone.localdate() + timedelta(days=1)
+    if end_date is None:
+        end_date = DailySchedule.objects.filter(site=site, date__gte=start_date).order_by('-date').values_list(
+            'date', flat=True
+        ).first() or start_date
+
+    summary = {
+        'site': site.code,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'days_migrated': 0,
+        'kept': 0,
+        'remapped': 0,
+        'created': 0,
+        'deleted': 0,
+        'skipped_published': [],
+        'kept_with_bookings': [],
+        'unassigned_guides': [],
+        'dry_run': dry_run,
+    }
+
+    templates = active_templates(start_date, end_date, site)
+    schedules = list(
+        DailySchedule.objects.select_for_update().filter(
+            site=site, date__range=(start_date, end_date)
+        ).order_by('date')
+    )
+    sessions_by_day = {}
+    for session in TourSession.objects.filter(
+        daily_schedule__in=schedules
+    ).select_related('time_slot', 'assigned_guide').order_by('time_slot__start_time'):
+        sessions_by_day.setdefault(session.daily_schedule_id, []).append(session)
+
+    from apps.scheduling.services import SchedulingService
+    service = SchedulingService(site)
+
+    now = timezone.now()
+    changes = ChangeLog(site.id)
+    remaps, creates, deletes = [], [], []
+    slots_by_variant = {}   # (template id, weekday) -> slots
+    for schedule in schedules:
+        template = template_for(schedule.date, templates)
+        if template is None:
+            continue
+        if schedule.is_published:
+            summary['skipped_published'].append(schedule.date.isoformat())
+            continue
+
+        variant = (template.id, schedule.date.weekday())
+        if variant not in slots_by_variant:
+            slots_by_variant[variant] = ensure_slots(template_times(template, variant[1]), site)
+        wanted = {slot.start_time: slot for slot in slots_by_variant[variant]}
+        changed = False
+        day_sessions, day_remaps = [], []   # sessions the day keeps, and those moved
+        for session in sessions_by_day.get(schedule.id, []):
+            slot = wanted.pop(session.time_slot.start_time, None)
+            if slot is None:
+                if session.has_booking_details():
+                    summary['kept_with_bookings'].append(session.id)
+                    day_sessions.append(session)
+                    continue
+                if session.assigned_guide_id:
+                    summary['unassigned_guides'].append({
+                        'date': schedule.date.isoformat(),
+                        'time_slot': str(session.time_slot),
+                        'guide_id': session.assigned_guide_id,
+                    })
+                    changes.add(schedule.date, ScheduleChange.KIND_GUIDE, session.id, session.assigned_guide_id, None)
+                deletes.append(session.id)
+                changed = True
+            elif slot.id != session.time_slot_id:
+                # Same start time, new length: keep the session, move it
+                session.time_slot = slot
+                session.version += 1
+                session.updated_at = now
+                remaps.append(session)
+                day_remaps.append(session)
+                day_sessions.append(session)
+                changed = True
+            else:
+                summary['kept'] += 1
+                day_sessions.append(session)
+
+        # A moved session keeps its guide only if the new slot still fits
+        # them; checked in start order against the guide's other tours
+        for session in day_remaps:
+            guide_id = session.assigned_guide_id
+            if guide_id is None:
+                continue
+            guide_sessions = [other for other in day_sessions if other.assigned_guide_id == guide_id]
+            errors = service.find_session_errors(
+                schedule.date,
+                [(other.id, other.time_slot_id, guide_id) for other in guide_sessions],
+                {other.time_slot_id: other.time_slot for other in guide_sessions},
+                {guide_id: session.assigned_guide},
+                set()
+            )
+            if session.id in errors:
+                summary['unassigned_guides'].append({
+                    'date': schedule.date.isoformat(),
+                    'time_slot': str(session.time_slot),
+                    'guide_id': guide_id,
+                })
+                changes.add(schedule.date, ScheduleChange.KIND_GUIDE, session.id, guide_id, None)
+                session.assigned_guide = None
+
+        for slot in wanted.values():
+            creates.append(TourSession(daily_schedule=schedule, time_slot=slot))
+            changed = True
+        summary['days_migrated'] += int(changed)
+
+    summary.update(remapped=len(remaps), created=len(creates), deleted=len(deletes))
+    if dry_run:
+        transaction.set_rollback(True)
+        return summary
+
+    TourSession.objects.filter(id__in=deletes).delete()
+    TourSession.objects.bulk_update(remaps, ['time_slot', 'assigned_guide', 'version', 'updated_at'])
+    bulk_create_validated(creates)
+    changes.save()
+    return summary
+
+
+def _end_time(start, minutes):
+    return (datetime.combine(date.min, start) + timedelta(minutes=minutes)).time()
@@ -0,0 +1,308 @@
+"""
+Shift swap matching for tour sessions.
+
+A ShiftSwapRequest either hands a guide's session to another guide (no
+target session: a cover) or exchanges it for one of the other guide's
+sessions. SwapIndex loads a site's sessions, guides and unavailability for
+a date window once and answers, without further queries:
+
+- covers(session_id): guides who could take the session as it is
+- swaps(session_id): (guide, session) pairs the holder could exchange with
+- check(...): why a given cover or swap breaks the rules, if it does
+
+The rules are those of validate_session_assignment(): the guide's type can
+work the slot, the guide isn't unavailable that day, and their tours keep
+a 30-minute gap. Slots are bits, so a guide's day is one integer and each
+check is a couple of mask operations:
+
+    type_mask[guide type]  slots the type can work
+    conflicts[slot]        slots overlapping or within 30 minutes of it
+    busy[(guide, date)]    slots the guide holds that day
+
+approve_swap() re-checks a request against fresh data under lock and
+applies it in one transaction.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.guides.models import Guide, GuideAvailability
+from apps.scheduling.calendar_feeds import refresh_feeds_for_tour_date
+from apps.scheduling.changelog import ChangeLog
+from apps.scheduling.local_search import MIN_GAP_MINUTES
+from apps.scheduling.models import TourSession, TourTimeSlot, DailySchedule, ShiftSwapRequest, ScheduleChange, VersionConflict
+from apps.scheduling.rosters import materialise_tour_date
+
+# Days either side of a session searched for swap partners
+SWAP_WINDOW_DAYS = getattr(settings, 'SWAP_WINDOW_DAYS', 7)
+
+
+class SwapIndex:
+    """Eligibility index of one site's tour sessions over a date window."""
+
+    def __init__(self, site_id, start_date, end_date):
+        self.site_id = site_id
+        self.start_date = start_date
+        self.end_date = end_date
+
+        # session_id -> (date, slot_id, guide_id)
+        self.sessions = {
+            session_id: (day, slot_id, guide_id)
+            for session_id, day, slot_id, guide_id in TourSession.objects.filter(
+                daily_schedule__site_id=site_id,
+                daily_schedule__date__range=(start_date, end_date)
+            ).values_list('id', 'daily_schedule__date', 'time_slot_id', 'assigned_guide_id')
+        }
+
+        self.slots = TourTimeSlot.objects.in_bulk({slot_id for _, slot_id, _ in self.sessions.values()})
+        slot_ids = sorted(self.slots, key=lambda slot_id: (self.slots[slot_id].start_time, slot_id))
+        self.bit = {slot_id: 1 << i for i, slot_id in enumerate(slot_ids)}
+        self.conflicts = {
+            slot_id: sum(
+                self.bit[other_id] for other_id in slot_ids
+                if _too_close(self.slots[slot_id], self.slots[other_id])
+            )
+            for slot_id in slot_ids
+        }
+
+        self.guides = Guide.objects.filter(site_id=site_id, is_active=True).select_related('user').in_bulk()
+        type_mask = {}
+        for guide in self.guides.values():
+            if guide.guide_type not in type_mask:
+                type_mask[guide.guide_type] = sum(
+                    self.bit[slot_id] for slot_id in slot_ids
+                    if guide.can_work_timeslot(self.slots[slot_id])
+                )
+        self.type_mask = {guide_id: type_mask[guide.guide_type] for guide_id, guide in self.guides.items()}
+
+        self.unavailable = set(GuideAvailability.objects.filter(
+            site_id=site_id,
+            date__range=(start_date, end_date),
+            is_available=False
+        ).values_list('guide_id', 'date'))
+
+        self.busy = {}
+        self.sessions_by_guide = {}
+        for session_id, (day, slot_id, guide_id) in self.sessions.items():
+            if guide_id is not None:
+                self.busy[(guide_id, day)] = self.busy.get((guide_id, day), 0) | self.bit[slot_id]
+                self.sessions_by_guide.setdefault(guide_id, []).append(session_id)
+
+    @classmethod
+    def around(cls, session, days=SWAP_WINDOW_DAYS):
+        """Index for the days around a session (expects daily_schedule loaded), from today on."""
+        day = session.daily_schedule.date
+        start = max(day - timedelta(days=days), timezone.localdate())
+        return cls(session.daily_schedule.site_id, min(start, day), day + timedelta(days=days))
+
+    def _can_take(self, guide_id, day, slot_id, releasing=None):
+        """True if the guide could work slot_id on day, giving up session `releasing` first."""
+        if guide_id not in self.guides or (guide_id, day) in self.unavailable:
+            return False
+        if not self.type_mask[guide_id] & self.bit[slot_id]:
+            return False
+        busy = self.busy.get((guide_id, day), 0)
+        if releasing is not None:
+            released_day, released_slot, _ = self.sessions[releasing]
+            if released_day == day:
+                busy &= ~self.bit[released_slot]
+        return not busy & self.conflicts[slot_id]
+
+    def covers(self, session_id):
+        """Ids of guides, other than the holder, who could take the session as it is."""
+        day, slot_id, holder_id = self.sessions[session_id]
+        return [
+            guide_id for guide_id in self.guides
+            if guide_id != holder_id and self._can_take(guide_id, day, slot_id)
+        ]
+
+    def swaps(self, session_id):
+        """
+        (guide_id, session_id) pairs the session's guide could exchange with:
+        each side can work the other's session once their own is given up.
+        """
+        day, slot_id, holder_id = self.sessions[session_id]
+        if holder_id is None:
+            return []
+
+        # Slots the holder could take on each day, with this session given up
+        holder_takes = {}
+
+        def takeable(other_day):
+            if other_day not in holder_takes:
+                if (holder_id, other_day) in self.unavailable:
+                    holder_takes[other_day] = 0
+                else:
+                    busy = self.busy.get((holder_id, other_day), 0)
+                    if other_day == day:
+                        busy &= ~self.bit[slot_id]
+                    holder_takes[other_day] = self.type_mask[holder_id] & ~self._blocked(busy)
+            return holder_takes[other_day]
+
+        pairs = []
+        for guide_id in self.guides:
+            if (guide_id == holder_id or (guide_id, day) in self.unavailable or
+                    not self.type_mask[guide_id] & self.bit[slot_id]):
+                continue
+            partner_busy = self.busy.get((guide_id, day), 0)
+            for other_id in self.sessions_by_guide.get(guide_id, ()):
+                other_day, other_slot, _ = self.sessions[other_id]
+                busy = partner_busy & ~self.bit[other_slot] if other_day == day else partner_busy
+                if not busy & self.conflicts[slot_id] and takeable(other_day) & self.bit[other_slot]:
+                    pairs.append((guide_id, other_id))
+        return pairs
+
+    def _blocked(self, busy):
+        """Slots that conflict with any slot in the mask `busy`."""
+        blocked = 0
+        for slot_id, bit in self.bit.items():
+            if busy & bit:
+                blocked |= self.conflicts[slot_id]
+        return blocked
+
+    def check(self, session_id, guide_id, target_session_id=None):
+        """
+        Reasons the cover (no target) or swap can't be made; empty if it can.
+        """
+        errors = []
+        day, slot_id, holder_id = self.sessions[session_id]
+        errors.extend(self._errors(guide_id, day, slot_id, releasing=target_session_id))
+        if target_session_id is not None:
+            target_day, target_slot, _ = self.sessions[target_session_id]
+            if holder_id is None:
+                errors.append(f"Session {session_id} has no guide to swap")
+            else:
+                errors.extend(self._errors(holder_id, target_day, target_slot, releasing=session_id))
+        return errors
+
+    def _errors(self, guide_id, day, slot_id, releasing=None):
+        guide = self.guides.get(guide_id)
+        if guide is None:
+            return [f"Guide {guide_id} is not an active guide at this site"]
+        slot = self.slots[slot_id]
+        if not self.type_mask[guide_id] & self.bit[slot_id]:
+            return [f"{guide} cannot work {slot} time slot"]
+        if (guide_id, day) in self.unavailable:
+            return [f"{guide} is marked as unavailable on {day}"]
+        if not self._can_take(guide_id, day, slot_id, releasing):
+            return [f"{guide} has another tour within {MIN_GAP_MINUTES} minutes of {slot} on {day}"]
+        return []
+
+    def candidates_payload(self, session_id):
+        """covers() and swaps() for the candidates API."""
+        def guide_payload(guide_id):
+            guide = self.guides[guide_id]
+            return {'guide_id': guide_id, 'guide_name': guide.user.get_full_name(), 'guide_type': guide.guide_type}
+
+        def session_info(other_id):
+            day, slot_id, _ = self.sessions[other_id]
+            return {'session_id': other_id, 'date': day.isoformat(), 'time_slot': str(self.slots[slot_id])}
+
+        return {
+            'covers': [guide_payload(guide_id) for guide_id in self.covers(session_id)],
+            'swaps': [
+                {**guide_payload(guide_id), **session_info(other_id)}
+                for guide_id, other_id in self.swaps(session_id)
+            ],
+        }
+
+
+def _too_close(slot, other):
+    """True if a guide can't work both slots: they overlap or leave under 30 minutes between them."""
+    if slot.end_time <= other.start_time:
+        return _minutes(other.start_time) - _minutes(slot.end_time) < MIN_GAP_MINUTES
+    if other.end_time <= slot.start_time:
+        return _minutes(slot.start_time) - _minutes(other.end_time) < MIN_GAP_MINUTES
+    return True
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+# ============================================================================
+# APPROVAL
+# ============================================================================
+
+@transaction.atomic
+def approve_swap(swap_request, admin_notes=''):
+    """
+    Re-check a pending request against the live schedule and apply it.
+
+    Locks both days and sessions, so it can't interleave with edits or an
+    auto-schedule run on them. Raises VersionConflict if either session no
+    longer has the guide the request names, and ValueError if the request
+    isn't pending or the swap breaks the rules. Returns the updated request.
+    """
+    swap_request = ShiftSwapRequest.objects.select_for_update().get(pk=swap_request.pk)
+    if swap_request.status != 'pending':
+        raise ValueError(f"Swap request {swap_request.pk} is already {swap_request.status}")
+
+    session_ids = [swap_request.original_session_id]
+    if swap_request.target_session_id:
+        session_ids.append(swap_request.target_session_id)
+
+    # Same lock order as auto_schedule_day(): the day first, then its sessions
+    day_ids = set(TourSession.objects.filter(id__in=session_ids).values_list('daily_schedule_id', flat=True))
+    days = list(DailySchedule.objects.select_for_update().filter(id__in=day_ids).order_by('id'))
+    sessions = TourSession.objects.select_for_update().filter(id__in=session_ids).in_bulk()
+
+    original = sessions[swap_request.original_session_id]
+    if original.assigned_guide_id != swap_request.requesting_guide_id:
+        raise VersionConflict(original)
+    target = sessions.get(swap_request.target_session_id)
+    if target is not None and target.assigned_guide_id != swap_request.target_guide_id:
+        raise VersionConflict(target)
+
+    site_ids = {day.site_id for day in days}
+    if len(site_ids) > 1:
+        raise ValueError("Sessions at different sites can't be swapped")
+    dates = [day.date for day in days]
+    index = SwapIndex(site_ids.pop(), min(dates), max(dates))
+    errors = index.check(original.id, swap_request.target_guide_id, target.id if target else None)
+    if errors:
+        raise ValueError('; '.join(errors))
+
+    now = timezone.now()
+    day_dates = {day.id: day.date for day in days}
+    changes = ChangeLog(days[0].site_id)
+    changes.add(day_dates[original.daily_schedule_id], ScheduleChange.KIND_GUIDE, original.id,
+                original.assigned_guide_id, swap_request.target_guide_id)
+    original.assigned_guide_id = swap_request.target_guide_id
+    if target is not None:
+        changes.add(day_dates[target.daily_schedule_id], ScheduleChange.KIND_GUIDE, target.id,
+                    target.assigned_guide_id, swap_request.requesting_guide_id)
+        target.assigned_guide_id = swap_request.requesting_guide_id
+    for session in sessions.values():
+        session.version += 1
+        session.updated_at = now
+    TourSession.objects.bulk_update(list(sessions.values()), ['assigned_guide', 'version', 'updated_at'])
+    changes.save()
+
+    swap_request.status = 'approved'
+    if admin_notes:
+        swap_request.admin_notes = admin_notes
+    swap_request.save()
+
+    # Guides see published days through their feeds and rosters
+    for day in days:
+        if day.is_published:
+            refresh_feeds_for_tour_date(day, {swap_request.requesting_guide_id, swap_request.target_guide_id})
+            materialise_tour_date(day)
+
+    return swap_request
+
+
+def reject_swap(swap_request, admin_notes=''):
+    """Mark a pending request rejected. Raises ValueError if it was already decided."""
+    updated = ShiftSwapRequest.objects.filter(pk=swap_request.pk, status='pending').update(
+        status='rejected',
+        admin_notes=admin_notes or swap_request.admin_notes,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        raise ValueError(f"Swap request {swap_request.pk} is no longer pending")
+    swap_request.refresh_from_db()
+    return swap_request
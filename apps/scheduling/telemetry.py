@@ -0,0 +1,126 @@
+"""
+Per-run telemetry for the auto-schedulers.
+
+Every auto_schedule_day() call (tour or restaurant, from the API or a
+management command) records a SchedulerRun: a hash of its inputs, wall
+time and queries per phase, candidates evaluated and the objective values
+reached. Auto-schedule on a what-if scenario is recorded too, under
+source 'sandbox' with no write phase, since it only changes the fork. Runs are listed in the admin and at
+/schedule/api/scheduler-runs/ to spot slow days and track trends.
+
+Phases are switched with enter(); time spent in a phase nested with
+`with run.phase(...)` (e.g. a save inside the search loop) counts towards
+the nested phase only.
+"""
+import hashlib
+import time as time_module
+from contextlib import contextmanager
+
+from django.db import connection
+
+from apps.scheduling.models import SchedulerRun
+
+PHASES = ('load', 'eligibility', 'search', 'write')
+
+
+class RunRecorder:
+    """Collects one run's timings and counters; save() stores them."""
+
+    def __init__(self, kind, site_id, day, source=SchedulerRun.SOURCE_OTHER):
+        self.kind = kind
+        self.site_id = site_id
+        self.day = day
+        self.source = source
+        self.algorithm = ''
+        self.seed = None
+        self.inputs_hash = ''
+        self.candidates_evaluated = 0
+        self.objective = {}
+        self.queries = 0
+        self.total_ms = 0.0
+        self.phase_ms = dict.fromkeys(PHASES, 0.0)
+        self.phase_queries = dict.fromkeys(PHASES, 0)
+        self._phase = None
+        self._mark = 0.0
+        self._query_mark = 0
+
+    def set_inputs(self, *parts):
+        """Hash everything the solver was given (reprs must be stable)."""
+        self.inputs_hash = hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+    @contextmanager
+    def recording(self):
+        """Time the whole run and count its queries on the default connection."""
+        def count_query(execute, sql, params, many, context):
+            self.queries += 1
+            return execute(sql, params, many, context)
+
+        started = time_module.perf_counter()
+        with connection.execute_wrapper(count_query):
+            try:
+                yield self
+            finally:
+                self.enter(None)
+                self.total_ms = (time_module.perf_counter() - started) * 1000
+
+    def enter(self, name):
+        """Close the current phase and start `name` (None: stop timing)."""
+        now = time_module.perf_counter()
+        if self._phase is not None:
+            self.phase_ms[self._phase] += (now - self._mark) * 1000
+            self.phase_queries[self._phase] += self.queries - self._query_mark
+        self._phase, self._mark, self._query_mark = name, now, self.queries
+
+    @contextmanager
+    def phase(self, name):
+        """Run a block in `name`, then return to the enclosing phase."""
+        outer = self._phase
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.enter(outer)
+
+    def save(self, assigned_count, unfillable_count, fingerprint=''):
+        return SchedulerRun.objects.create(
+            kind=self.kind,
+            site_id=self.site_id,
+            source=self.source,
+            date=self.day,
+            algorithm=self.algorithm,
+            seed=self.seed,
+            inputs_hash=self.inputs_hash,
+            total_ms=round(self.total_ms, 1),
+            phase_ms={name: round(ms, 1) for name, ms in self.phase_ms.items()},
+            queries=self.queries,
+            phase_queries=self.phase_queries,
+            candidates_evaluated=self.candidates_evaluated,
+            assigned_count=assigned_count,
+            unfillable_count=unfillable_count,
+            objective=self.objective or {'assigned': assigned_count, 'unfillable': unfillable_count},
+            fingerprint=fingerprint or '',
+        )
+
+
+def run_summary(run):
+    """JSON-ready dict for one SchedulerRun."""
+    return {
+        'id': run.id,
+        'kind': run.kind,
+        'site_id': run.site_id,
+        'source': run.source,
+        'date': run.date.isoformat(),
+        'algorithm': run.algorithm,
+        'seed': run.seed,
+        'inputs_hash': run.inputs_hash,
+        'started_at': run.started_at.isoformat(),
+        'total_ms': run.total_ms,
+        'phase_ms': run.phase_ms,
+        'queries': run.queries,
+        'phase_queries': run.phase_queries,
+        'candidates_evaluated': run.candidates_evaluated,
+        'assigned_count': run.assigned_count,
+        'unfillable_count': run.unfillable_count,
+        'objective': run.objective,
+        'fingerprint': run.fingerprint,
+    }
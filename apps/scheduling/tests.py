@@ -1,3 +1,729 @@
+import json
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.query import QuerySet
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.models import Site
+from apps.guides.models import Guide, GuideAvailability
+from apps.scheduling import undo
+from apps.scheduling.local_search import (
+    UNFILLED_COST, STANDBY_TOUR_COST, GUIDE_COST, improve_assignment, _span, _fits
+)
+from apps.scheduling.calendar_feeds import refresh_feeds_for_tour_date
+from apps.scheduling.changelog import record
+from apps.scheduling.grid_cache import tour_day_stamp, restaurant_day_stamp
+from apps.scheduling.models import (
+    TourSession, DailySchedule, DailyRestaurantSchedule, StaffShift, RestaurantStaff, DaySnapshot,
+    SlotTemplate, CalendarFeed, ScheduleChange
+)
+from apps.scheduling.services import SchedulingService, RestaurantSchedulingService
+from apps.scheduling.slot_templates import DEFAULT_SLOT_STARTS, migrate_sessions
+from apps.scheduling.swaps import SwapIndex
+
+
+class SchedulingTestCase(TestCase):
+    """
+    Shared fixture, created once per class: the default site with a mix of
+    guides, restaurant staff, the default tour slots and a staff user.
+    Days are built per test with tour_day() / restaurant_day().
+    """
+    GUIDE_TYPES = ['FT', 'FT', 'FT', 'PTM', 'PTM', 'PTA', 'PTA', 'FT']
+    STAFF_TYPES = ['kitchen'] * 4 + ['serving'] * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.get_default()
+        cls.guides = [
+            Guide.objects.create(
+                user=User.objects.create(username=f'guide{i}', first_name=f'Guide{i}'),
+                guide_type=guide_type
+            )
+            for i, guide_type in enumerate(cls.GUIDE_TYPES)
+        ]
+        cls.staff = [
+            RestaurantStaff.objects.create(
+                user=User.objects.create(username=f'staff{i}', first_name=f'Staff{i}'),
+                staff_type=staff_type
+            )
+            for i, staff_type in enumerate(cls.STAFF_TYPES)
+        ]
+        cls.manager = User.objects.create_superuser('manager', 'manager@example.com', 'pw')
+        SchedulingService(cls.site).generate_tour_time_slots()
+        cls.day = date.today() + timedelta(days=7)
+
+    def tour_day(self, day=None, auto_schedule=False):
+        """A tour day with one session per slot; returns (schedule, sessions by start time)."""
+        service = SchedulingService(self.site)
+        _, daily_schedule = service.generate_sessions_for_date(day or self.day)
+        if auto_schedule:
+            service.auto_schedule_day(daily_schedule)
+            daily_schedule.refresh_from_db()
+        sessions = list(
+            TourSession.objects.filter(daily_schedule=daily_schedule).select_related('time_slot').order_by('time_slot__start_time')
+        )
+        return daily_schedule, sessions
+
+    def restaurant_day(self, shifts, day=None, **fields):
+        """A restaurant day with (staff or None, start, end, hours[, notes]) shifts."""
+        daily_schedule = DailyRestaurantSchedule.objects.create(site=self.site, date=day or self.day, **fields)
+        for staff, start, end, hours, *notes in shifts:
+            StaffShift.objects.create(
+                daily_schedule=daily_schedule, staff=staff,
+                start_time=start, end_time=end, duration_hours=hours, notes=notes[0] if notes else ''
+            )
+        return daily_schedule
+
+    def login(self):
+        self.client.force_login(self.manager)
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+
+# ============================================================================
+# LOCAL SEARCH
+# ============================================================================
+
+class ImproveAssignmentTests(SchedulingTestCase):
+    """The incremental (delta) cost of improve_assignment() against a full recompute."""
+
+    def setUp(self):
+        _, self.sessions = self.tour_day()
+
+    def objective(self, assignment, fixed_slots, standby_id):
+        """The documented objective, computed from scratch."""
+        tours = Counter(guide_id for guide_id in assignment.values() if guide_id is not None)
+        for guide_id, slots in fixed_slots.items():
+            tours[guide_id] += len(slots)
+        cost = UNFILLED_COST * sum(1 for guide_id in assignment.values() if guide_id is None)
+        for guide in self.guides:
+            n = tours[guide.id]
+            cost += (GUIDE_COST if n else 0) + n * n
+            if guide.id == standby_id:
+                cost += STANDBY_TOUR_COST * n
+        return cost
+
+    def test_delta_cost_matches_full_recompute(self):
+        # Guide 0 keeps the 10:00 and 12:00 tours
+        fixed = [self.sessions[0], self.sessions[2]]
+        movable = [session for session in self.sessions if session not in fixed]
+        fixed_slots = {self.guides[0].id: [session.time_slot for session in fixed]}
+        standby_id = self.guides[1].id
+        start = {session.id: None for session in movable}
+        start[movable[0].id] = standby_id
+
+        for seed in range(5):
+            result = improve_assignment(
+                movable, self.guides, start, fixed_slots=fixed_slots, standby_id=standby_id,
+                time_budget_ms=10000, seed=seed, max_iterations=3000
+            )
+            self.assertEqual(result['cost_before'], self.objective(start, fixed_slots, standby_id))
+            self.assertEqual(
+                result['cost_after'], self.objective(result['assignment'], fixed_slots, standby_id)
+            )
+            self.assertLess(result['cost_after'], result['cost_before'])
+
+            # Every guide's day still keeps the rules
+            spans = {guide_id: [_span(slot) for slot in slots] for guide_id, slots in fixed_slots.items()}
+            for session in movable:
+                guide_id = result['assignment'][session.id]
+                if guide_id is not None:
+                    spans.setdefault(guide_id, []).append(_span(session.time_slot))
+            for guide_spans in spans.values():
+                guide_spans.sort()
+                self.assertTrue(_fits(guide_spans[:-1], guide_spans[-1]))
+
+
+# ============================================================================
+# SWAP INDEX
+# ============================================================================
+
+class SwapIndexTests(SchedulingTestCase):
+    """SwapIndex.check() answers as validate_session_assignment() would."""
+
+    def setUp(self):
+        self.daily_schedule, _ = self.tour_day(auto_schedule=True)
+        self.service = SchedulingService(self.site)
+        GuideAvailability.objects.create(guide=self.guides[2], date=self.day, is_available=False)
+
+    def test_check_agrees_with_validate_session_assignment(self):
+        index = SwapIndex(self.daily_schedule.site_id, self.day, self.day)
+        sessions = TourSession.objects.filter(daily_schedule=self.daily_schedule).with_people()
+
+        outcomes = Counter()
+        for session in sessions:
+            for guide in self.guides:
+                if guide.id == session.assigned_guide_id:
+                    continue
+                cover = TourSession(
+                    id=session.id,
+                    daily_schedule=self.daily_schedule,
+                    time_slot=session.time_slot,
+                    assigned_guide=guide
+                )
+                expected = bool(self.service.validate_session_assignment(cover))
+                with self.subTest(session=session.id, guide=guide.id):
+                    self.assertEqual(bool(index.check(session.id, guide.id)), expected)
+                outcomes[expected] += 1
+
+        # Both answers were exercised
+        self.assertTrue(outcomes[True] and outcomes[False])
+
+
+# ============================================================================
+# UNDO SNAPSHOTS
+# ============================================================================
+
+class SnapshotTests(SchedulingTestCase):
+    """Encoded day snapshots decode, and restore, to the same day."""
+
+    def tour_state(self, daily_schedule):
+        daily_schedule.refresh_from_db()
+        return daily_schedule.standby_guide_id, daily_schedule.is_published, {
+            slot_id: (guide_id, visitors, visitor_type, channel)
+            for slot_id, guide_id, visitors, visitor_type, channel in TourSession.objects.filter(
+                daily_schedule=daily_schedule
+            ).values_list('time_slot_id', 'assigned_guide_id', 'visitor_count', 'visitor_type', 'booking_channel')
+        }
+
+    def test_tour_day_round_trip(self):
+        daily_schedule, sessions = self.tour_day(auto_schedule=True)
+        TourSession.objects.filter(id=sessions[0].id).update(
+            visitor_count=12, visitor_type='local', booking_channel=TourSession.BOOKING_CHANNEL_CHOICES[0][0]
+        )
+        TourSession.objects.filter(id=sessions[1].id).update(assigned_guide=None, visitor_count=0)
+        daily_schedule.is_published = True
+        daily_schedule.save()
+        state = self.tour_state(daily_schedule)
+
+        data = undo.encode_tour_day(daily_schedule)
+        self.assertEqual(undo.decode_tour_day(data), state)
+
+        undo.push_snapshot(DaySnapshot.KIND_TOUR, daily_schedule, 'Clear all')
+        TourSession.objects.filter(daily_schedule=daily_schedule).update(
+            assigned_guide=None, visitor_count=None, visitor_type=None, booking_channel=None
+        )
+        daily_schedule.standby_guide = None
+        daily_schedule.is_published = False
+        daily_schedule.save()
+
+        undo.undo(DaySnapshot.KIND_TOUR, daily_schedule.site, self.day)
+        self.assertEqual(self.tour_state(daily_schedule), state)
+
+    def test_restaurant_day_round_trip(self):
+        published_at = datetime(2026, 1, 5, 2, 30, tzinfo=dt_timezone.utc)
+        shifts = [
+            (self.staff[0], time(10, 0), time(18, 0), 8, ''),
+            (self.staff[4], time(11, 30), time(15, 30), 4, 'Late start ✓'),
+            (None, time(13, 30), time(21, 30), 8, ''),
+        ]
+        daily_schedule = self.restaurant_day(shifts, is_published=True, published_at=published_at)
+
+        data = undo.encode_restaurant_day(daily_schedule)
+        self.assertEqual(undo.decode_restaurant_day(data), (True, published_at, [
+            (staff.id if staff else None, start, end, hours, notes) for staff, start, end, hours, notes in shifts
+        ]))
+
+        undo.push_snapshot(DaySnapshot.KIND_RESTAURANT, daily_schedule, 'Clear all')
+        StaffShift.objects.filter(daily_schedule=daily_schedule).delete()
+        undo.undo(DaySnapshot.KIND_RESTAURANT, daily_schedule.site, self.day)
+        daily_schedule.refresh_from_db()
+        self.assertEqual(undo.encode_restaurant_day(daily_schedule), data)
+
+
+# ============================================================================
+# RESTAURANT COVERAGE
+# ============================================================================
+
+class RestaurantCoverageTests(SchedulingTestCase):
+    """Coverage is checked every half hour up to 21:00, whatever the shifts' end times."""
+
+    def full_day(self):
+        kitchen, serving = self.staff[:4], self.staff[4:]
+        return [
+            (people[i], *hours)
+            for people in (kitchen, serving)
+            for i, hours in enumerate([
+                (time(10, 0), time(18, 0), 8), (time(10, 0), time(18, 0), 8),
+                (time(13, 30), time(21, 30), 8), (time(13, 30), time(21, 30), 8),
+            ])
+        ]
+
+    def test_coverage_checked_until_closing(self):
+        # No serving staff after 18:00, and the last shift listed ends at 14:00
+        validation = RestaurantSchedulingService(self.site).compute_coverage([
+            (time(10, 0), time(21, 30), 'kitchen'),
+            (time(10, 0), time(21, 30), 'kitchen'),
+            (time(10, 0), time(18, 0), 'serving'),
+            (time(10, 0), time(18, 0), 'serving'),
+            (time(10, 0), time(14, 0), 'kitchen'),
+        ])
+        self.assertFalse(validation['is_valid'])
+        self.assertEqual(list(validation['coverage_by_hour'])[-1], '21:00')
+        self.assertEqual(
+            [gap['time'] for gap in validation['gaps']],
+            ['18:00', '18:30', '19:00', '19:30', '20:00', '20:30', '21:00']
+        )
+
+    def test_coverage_gap_blocks_publish(self):
+        shifts = self.full_day()
+        # Both closing servers moved to a lunch half-day, listed last
+        shifts[6:] = [(self.staff[6], time(10, 0), time(14, 0), 4), (self.staff[7], time(10, 0), time(14, 0), 4)]
+        daily_schedule = self.restaurant_day(shifts)
+        self.login()
+
+        response = self.post_json('/schedule/api/restaurant/publish/', {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient coverage at 18:00', response.json()['error'])
+        daily_schedule.refresh_from_db()
+        self.assertFalse(daily_schedule.is_published)
+
+    def test_full_coverage_publishes(self):
+        daily_schedule = self.restaurant_day(self.full_day())
+        self.login()
+
+        response = self.post_json('/schedule/api/restaurant/publish/', {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        daily_schedule.refresh_from_db()
+        self.assertTrue(daily_schedule.is_published)
+
+
+# ============================================================================
+# TOUR AUTO-SCHEDULER
+# ============================================================================
+
+class AutoScheduleTests(SchedulingTestCase):
+    """auto_schedule_day(): in-memory checks, one write, reproducible from its seed."""
+
+    def queries_for_day(self, day):
+        daily_schedule, _ = self.tour_day(day)
+        with CaptureQueriesContext(connection) as queries:
+            results = SchedulingService(self.site).auto_schedule_day(daily_schedule)
+        return len(queries), results
+
+    def test_queries_do_not_grow_with_guides(self):
+        GuideAvailability.objects.create(guide=self.guides[0], date=self.day, is_available=False)
+        before, results = self.queries_for_day(self.day)
+        self.assertEqual(results['unfillable_count'], 0)
+
+        for i in range(10):
+            Guide.objects.create(user=User.objects.create(username=f'extra{i}'), guide_type='FT')
+        after, _ = self.queries_for_day(self.day + timedelta(days=1))
+        self.assertEqual(after, before)
+
+    def test_sessions_written_in_one_update(self):
+        daily_schedule, sessions = self.tour_day()
+        with CaptureQueriesContext(connection) as queries:
+            results = SchedulingService(self.site).auto_schedule_day(daily_schedule, time_budget_ms=50)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "scheduling_toursession"')]
+        self.assertEqual(len(updates), 1)
+
+        written = TourSession.objects.filter(daily_schedule=daily_schedule, assigned_guide__isnull=False)
+        self.assertEqual(written.count(), results['assigned_count'])
+        # Editors holding the old version see the change
+        self.assertTrue(all(session.version == 1 for session in written))
+
+    def rerun(self, daily_schedule, seed):
+        """Clear the day and auto-schedule it again; returns the run results."""
+        TourSession.objects.filter(daily_schedule=daily_schedule).update(assigned_guide=None)
+        DailySchedule.objects.filter(id=daily_schedule.id).update(standby_guide=None)
+        daily_schedule.refresh_from_db()
+        return SchedulingService(self.site).auto_schedule_day(daily_schedule, seed=seed)
+
+    def test_same_seed_same_schedule(self):
+        daily_schedule, _ = self.tour_day()
+        first = self.rerun(daily_schedule, seed=7)
+        again = self.rerun(daily_schedule, seed=7)
+
+        self.assertEqual(first['seed'], 7)
+        self.assertEqual(again['fingerprint'], first['fingerprint'])
+        self.assertEqual(SchedulingService(self.site).solution_fingerprint(daily_schedule), first['fingerprint'])
+
+    def test_seed_changes_tie_breaks(self):
+        daily_schedule, _ = self.tour_day()
+        fingerprints = {self.rerun(daily_schedule, seed)['fingerprint'] for seed in range(5)}
+        self.assertGreater(len(fingerprints), 1)
+
+
+# ============================================================================
+# SLOT TEMPLATES
+# ============================================================================
+
+class SlotTemplateTests(SchedulingTestCase):
+    """Per-site template versions, and migrate_sessions() re-checking moved guides."""
+
+    def template(self, site, longer=(), effective_from=None):
+        """A template with the default starts; those in longer run 2 hours."""
+        template = SlotTemplate.objects.create(site=site, name='Tours', effective_from=effective_from or self.day)
+        for start in DEFAULT_SLOT_STARTS:
+            template.entries.create(start_time=start, duration_minutes=120 if start in longer else 90)
+        return template
+
+    def test_versions_count_per_site(self):
+        other = Site.objects.create(code='east', name='East')
+        self.assertEqual(self.template(self.site).version, 1)
+        self.assertEqual(self.template(other).version, 1)
+        self.assertEqual(self.template(self.site, effective_from=self.day + timedelta(days=1)).version, 2)
+
+    def test_remapped_guide_kept_only_if_still_fits(self):
+        _, sessions = self.tour_day()
+        by_start = {session.time_slot.start_time: session for session in sessions}
+        # guide0: 10:00 and 12:00 (30-minute break); guide1: 16:00 alone
+        for start, guide in [(time(10), self.guides[0]), (time(12), self.guides[0]), (time(16), self.guides[1])]:
+            TourSession.objects.filter(id=by_start[start].id).update(assigned_guide=guide)
+
+        # 10:00 and 16:00 now run to 12:00 and 18:00
+        self.template(self.site, longer=[time(10), time(16)])
+        summary = migrate_sessions(self.site, self.day, self.day)
+
+        self.assertEqual(summary['remapped'], 2)
+        self.assertEqual([entry['guide_id'] for entry in summary['unassigned_guides']], [self.guides[0].id])
+        guides = dict(
+            TourSession.objects.filter(id__in=[session.id for session in sessions]).values_list(
+                'time_slot__start_time', 'assigned_guide'
+            )
+        )
+        # guide0 no longer has a break between 10:00 and 12:00
+        self.assertEqual(sum(1 for guide_id in guides.values() if guide_id == self.guides[0].id), 1)
+        self.assertEqual(guides[time(16)], self.guides[1].id)
+        self.assertEqual(TourSession.objects.get(id=by_start[time(10)].id).time_slot.end_time, time(12))
+
+
+# ============================================================================
+# CALENDAR FEEDS
+# ============================================================================
+
+class CalendarFeedTests(SchedulingTestCase):
+    """Feeds exist from the person's creation and are rebuilt by person id."""
+
+    def published_day(self):
+        """A published tour day with guide0 on the first tour, feeds built."""
+        daily_schedule, sessions = self.tour_day()
+        TourSession.objects.filter(id=sessions[0].id).update(assigned_guide=self.guides[0])
+        daily_schedule.is_published = True
+        daily_schedule.save()
+        refresh_feeds_for_tour_date(daily_schedule)
+        return CalendarFeed.objects.get(guide=self.guides[0])
+
+    def test_feed_created_with_person(self):
+        guide = Guide.objects.create(user=User.objects.create(username='newguide'), guide_type='FT')
+        staff = RestaurantStaff.objects.create(user=User.objects.create(username='newstaff'), staff_type='kitchen')
+        self.assertTrue(CalendarFeed.objects.filter(guide=guide).exists())
+        self.assertTrue(CalendarFeed.objects.filter(staff=staff).exists())
+
+    def test_dashboard_does_not_create_feeds(self):
+        CalendarFeed.objects.filter(guide=self.guides[0]).delete()
+        self.client.force_login(self.guides[0].user)
+
+        response = self.client.get('/guides/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['calendar_feed_url'])
+        self.assertFalse(CalendarFeed.objects.filter(guide=self.guides[0]).exists())
+
+    def test_unchanged_feed_answers_not_modified(self):
+        feed = self.published_day()
+        url = f'/schedule/feeds/{feed.token}.ics'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'SUMMARY:Tour', response.content)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_clear_drops_day_from_removed_guides_feed(self):
+        feed = self.published_day()
+        self.assertIn('SUMMARY:Tour', feed.body)
+        self.login()
+
+        response = self.post_json('/schedule/api/clear-all/', {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        feed.refresh_from_db()
+        self.assertNotIn('SUMMARY:Tour', feed.body)
+
+
+# ============================================================================
+# RANGE PUBLISH
+# ============================================================================
+
+class PublishRangeTests(SchedulingTestCase):
+    """publish_range() publishes the ready days, keeps the rest as drafts."""
+
+    def test_days_with_blockers_stay_drafts(self):
+        ready, _ = self.tour_day(auto_schedule=True)
+        draft, _ = self.tour_day(self.day + timedelta(days=1))
+        self.login()
+
+        response = self.post_json(
+            f'/schedule/api/publish/range/?start={self.day}&end={self.day + timedelta(days=1)}', {}
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual(results['changed'], [self.day.isoformat()])
+        self.assertIn('11 session(s) not assigned to any guide', results['blocked'][draft.date.isoformat()])
+
+        ready.refresh_from_db()
+        draft.refresh_from_db()
+        self.assertTrue(ready.is_published)
+        self.assertIsNotNone(ready.published_at)
+        self.assertFalse(draft.is_published)
+        self.assertIsNone(draft.published_at)
+
+    def test_feeds_looked_up_once_per_range(self):
+        days = [self.day + timedelta(days=i) for i in range(3)]
+        for day in days:
+            self.tour_day(day, auto_schedule=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            results = SchedulingService(self.site).publish_range(days[0], days[-1])
+        self.assertEqual(len(results['changed']), 3)
+        lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and '"scheduling_calendarfeed"' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+
+
+# ============================================================================
+# ROW LOCKS
+# ============================================================================
+
+@contextmanager
+def rows_locked(*pks):
+    """
+    Run the block as if another editor held the row locks on pks:
+    select_for_update(skip_locked=True) leaves those rows out, as
+    PostgreSQL does. SQLite has no row locks, so this stands in for a
+    second connection. Yields the select_for_update() kwargs seen.
+    """
+    select_for_update = QuerySet.select_for_update
+    calls = []
+
+    def skip_locked_rows(queryset, **kwargs):
+        calls.append(kwargs)
+        queryset = select_for_update(queryset, **kwargs)
+        return queryset.exclude(pk__in=pks) if kwargs.get('skip_locked') else queryset
+
+    with mock.patch.object(QuerySet, 'select_for_update', skip_locked_rows):
+        yield calls
+
+
+class RowLockTests(SchedulingTestCase):
+    """Editors don't wait on a locked row: 423, and auto-assign leaves it alone."""
+
+    def test_locked_session_answers_423(self):
+        _, sessions = self.tour_day()
+        self.login()
+
+        with rows_locked(sessions[0].id) as calls:
+            response = self.post_json('/schedule/api/assign/', {
+                'session_id': sessions[0].id, 'guide_id': self.guides[0].id
+            })
+        self.assertEqual(response.status_code, 423)
+        self.assertTrue(response.json()['locked'])
+        self.assertIn({'skip_locked': True, 'of': ('self',)}, calls)
+        sessions[0].refresh_from_db()
+        self.assertIsNone(sessions[0].assigned_guide_id)
+
+    def test_locked_shift_answers_423(self):
+        daily_schedule = self.restaurant_day([(None, time(10, 0), time(14, 0), 4)])
+        shift = daily_schedule.shifts.get()
+        self.login()
+
+        with rows_locked(shift.id):
+            response = self.post_json('/schedule/api/restaurant/assign-shift/', {
+                'shift_id': shift.id, 'staff_id': self.staff[0].id
+            })
+        self.assertEqual(response.status_code, 423)
+        shift.refresh_from_db()
+        self.assertIsNone(shift.staff_id)
+
+    def test_auto_schedule_skips_locked_sessions(self):
+        daily_schedule, sessions = self.tour_day()
+
+        with rows_locked(sessions[0].id):
+            SchedulingService(self.site).auto_schedule_day(daily_schedule)
+        assigned = dict(
+            TourSession.objects.filter(daily_schedule=daily_schedule).values_list('id', 'assigned_guide')
+        )
+        self.assertIsNone(assigned.pop(sessions[0].id))
+        self.assertTrue(all(assigned.values()))
+
+
+# ============================================================================
+# EDIT CONFLICTS
+# ============================================================================
+
+class EditConflictTests(SchedulingTestCase):
+    """An edit made against a stale version gets 409 and the row as it is now."""
+
+    def test_stale_session_edit_answers_409_with_current(self):
+        _, sessions = self.tour_day()
+        self.login()
+
+        # Two editors open the session at version 0; the first save wins
+        first = self.post_json('/schedule/api/assign/', {
+            'session_id': sessions[0].id, 'guide_id': self.guides[0].id, 'version': 0
+        })
+        self.assertEqual(first.json()['version'], 1)
+        response = self.post_json('/schedule/api/assign/', {
+            'session_id': sessions[0].id, 'guide_id': self.guides[1].id, 'version': 0
+        })
+
+        self.assertEqual(response.status_code, 409)
+        body = response.json()
+        self.assertTrue(body['conflict'])
+        self.assertEqual(body['current']['assigned_guide_id'], self.guides[0].id)
+        self.assertEqual(body['current']['version'], 1)
+        sessions[0].refresh_from_db()
+        self.assertEqual(sessions[0].assigned_guide_id, self.guides[0].id)
+
+    def test_stale_shift_edit_answers_409_with_current(self):
+        daily_schedule = self.restaurant_day([(None, time(10, 0), time(14, 0), 4)])
+        shift = daily_schedule.shifts.get()
+        self.login()
+
+        self.post_json('/schedule/api/restaurant/assign-shift/', {
+            'shift_id': shift.id, 'staff_id': self.staff[0].id, 'version': 0
+        })
+        response = self.post_json('/schedule/api/restaurant/assign-shift/', {
+            'shift_id': shift.id, 'staff_id': self.staff[1].id, 'version': 0
+        })
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['current']['staff_id'], self.staff[0].id)
+        shift.refresh_from_db()
+        self.assertEqual((shift.staff_id, shift.version), (self.staff[0].id, 1))
+
+
+# ============================================================================
+# GRID FRAGMENT CACHE
+# ============================================================================
+
+class GridStampTests(SchedulingTestCase):
+    """Any write to a day's rows gives its grids a new cache key."""
+
+    def test_assign_changes_tour_stamp(self):
+        _, sessions = self.tour_day()
+        self.tour_day(self.day + timedelta(days=1))
+        before = tour_day_stamp(self.site, self.day)
+        next_day = tour_day_stamp(self.site, self.day + timedelta(days=1))
+        self.login()
+
+        self.post_json('/schedule/api/assign/', {'session_id': sessions[0].id, 'guide_id': self.guides[0].id})
+        self.assertNotEqual(tour_day_stamp(self.site, self.day), before)
+        self.assertEqual(tour_day_stamp(self.site, self.day + timedelta(days=1)), next_day)
+
+    def test_overview_not_served_stale_after_assign(self):
+        _, sessions = self.tour_day()
+        self.login()
+        url = f'/schedule/guide/overview/?date={self.day}'
+
+        self.assertNotContains(self.client.get(url), 'class="cell-working"')
+        self.post_json('/schedule/api/assign/', {'session_id': sessions[0].id, 'guide_id': self.guides[0].id})
+        self.assertContains(self.client.get(url), 'class="cell-working"', count=1)
+
+    def test_assign_shift_changes_restaurant_stamp(self):
+        daily_schedule = self.restaurant_day([(None, time(10, 0), time(14, 0), 4)])
+        before = restaurant_day_stamp(self.site, self.day)
+        self.login()
+
+        self.post_json('/schedule/api/restaurant/assign-shift/', {
+            'shift_id': daily_schedule.shifts.get().id, 'staff_id': self.staff[0].id
+        })
+        self.assertNotEqual(restaurant_day_stamp(self.site, self.day), before)
+
+
+# ============================================================================
+# SITES
+# ============================================================================
+
+class SiteScopeTests(SchedulingTestCase):
+    """Edits and choices stay within the day's site."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_site = Site.objects.create(code='east', name='East')
+        cls.outsider = Guide.objects.create(
+            user=User.objects.create(username='eastguide'), guide_type='FT', site=cls.other_site
+        )
+
+    def test_guide_from_other_site_rejected(self):
+        _, sessions = self.tour_day()
+        self.login()
+
+        response = self.post_json('/schedule/api/assign/', {'session_id': sessions[0].id, 'guide_id': self.outsider.id})
+        self.assertEqual(response.status_code, 400)
+        sessions[0].refresh_from_db()
+        self.assertIsNone(sessions[0].assigned_guide_id)
+
+    def test_standby_from_other_site_rejected(self):
+        daily_schedule, _ = self.tour_day()
+        self.login()
+
+        response = self.post_json('/schedule/api/standby/', {'date': self.day.isoformat(), 'guide_id': self.outsider.id})
+        self.assertEqual(response.status_code, 400)
+        daily_schedule.refresh_from_db()
+        self.assertIsNone(daily_schedule.standby_guide_id)
+
+    def test_eligible_guides_from_session_site_only(self):
+        _, sessions = self.tour_day()
+        self.login()
+
+        response = self.client.get(f'/schedule/api/session/{sessions[0].id}/eligible/')
+        guide_ids = {guide['id'] for guide in response.json()['guides']}
+        self.assertTrue(guide_ids)
+        self.assertNotIn(self.outsider.id, guide_ids)
+
+
+# ============================================================================
+# CHANGE LOG
+# ============================================================================
+
+class ChangeLogTests(SchedulingTestCase):
+    """Edits land in the change log, read back page by page from a cursor."""
+
+    def changes(self, **params):
+        return self.client.get('/schedule/api/changes/', params).json()
+
+    def test_cursor_pages_through_changes(self):
+        _, sessions = self.tour_day()
+        self.login()
+        cursor = self.changes()['cursor']
+
+        for session, guide in zip(sessions[:3], self.guides):
+            self.post_json('/schedule/api/assign/', {'session_id': session.id, 'guide_id': guide.id})
+        self.post_json('/schedule/api/standby/', {'date': self.day.isoformat(), 'guide_id': self.guides[3].id})
+
+        pages = []
+        while True:
+            page = self.changes(cursor=cursor, limit=3)
+            pages.append(page['changes'])
+            cursor = page['cursor']
+            if not page['has_more']:
+                break
+        self.assertEqual([len(page['id']) for page in pages], [3, 1])
+        self.assertEqual(pages[0]['object_id'], [session.id for session in sessions[:3]])
+        self.assertEqual(pages[0]['new'], [guide.id for guide in self.guides[:3]])
+        self.assertEqual(pages[1]['kind'], ['standby'])
+        self.assertEqual(set(pages[0]['user_id']), {self.manager.id})
+
+        # Nothing new: empty page, same cursor
+        page = self.changes(cursor=cursor)
+        self.assertEqual((page['changes']['id'], page['cursor']), ([], cursor))
+
+        # Kinds filter
+        page = self.changes(cursor=0, kind='standby')
+        self.assertEqual(page['changes']['new'], [self.guides[3].id])
+
+    def test_other_sites_changes_not_listed(self):
+        other = Site.objects.create(code='east', name='East')
+        record(other.id, self.day, ScheduleChange.KIND_STANDBY, 1, None, 2)
+        self.login()
 
-# Create your tests here.
+        self.assertEqual(self.changes(cursor=0)['changes']['id'], [])
+        self.assertEqual(self.changes(cursor=0, site='east')['changes']['new'], [2])
@@ -0,0 +1,358 @@
+"""
+Per-day undo/redo for manager bulk edits.
+
+Before a bulk edit (clear all, auto-assign, committing a scenario) the
+view pushes a snapshot of the day onto its undo stack:
+
+    push_snapshot(DaySnapshot.KIND_TOUR, daily_schedule, 'Clear all')
+
+undo() swaps the day's current state onto the redo stack and restores the
+newest snapshot with one bulk write; redo() does the reverse. Any later
+edit to the day clears its redo stack, so a redo can't overwrite it:
+bulk edits through push_snapshot(), single edits (assign, unassign,
+standby, shift staff) through clear_redo(). Each stack keeps UNDO_LEVELS
+snapshots per day.
+
+Snapshots are packed with struct rather than stored as rows or JSON:
+
+    tour        header (version, standby id, published) then per session
+                (slot id, guide id, visitor count, visitor type, channel):
+                22 bytes a session, about 250 bytes for an 11-tour day
+    restaurant  header (version, published, published_at) then per shift
+                (staff id, start and end minute, hours, notes): 15 bytes
+                a shift plus any notes
+
+Tour sessions are matched by time slot, so a snapshot still restores
+after sessions are regenerated; sessions no longer on the day are
+skipped. Guides and staff removed since the snapshot come back
+unassigned. Restores are written to the schedule change log.
+"""
+import struct
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.guides.models import Guide
+from apps.scheduling.bulk import bulk_create_validated
+from apps.scheduling.calendar_feeds import (
+    refresh_feeds_for_tour_date, refresh_feeds_for_restaurant_date, tour_guide_ids
+)
+from apps.scheduling.changelog import ChangeLog, current_user_id
+from apps.scheduling.models import (
+    DailySchedule, TourSession, DailyRestaurantSchedule, StaffShift, RestaurantStaff,
+    DaySnapshot, ScheduleChange
+)
+from apps.scheduling.rosters import materialise_tour_date, materialise_restaurant_date
+
+# Snapshots kept per day on each of the undo and redo stacks
+UNDO_LEVELS = getattr(settings, 'UNDO_LEVELS', 20)
+
+_FORMAT_VERSION = 1
+
+_TOUR_HEADER = struct.Struct('<BQB')          # version, standby id (0: none), published
+_TOUR_SESSION = struct.Struct('<QQIBB')       # slot, guide (0), visitors, visitor type, channel
+_RESTAURANT_HEADER = struct.Struct('<BBq')    # version, published, published_at (0: none)
+_RESTAURANT_SHIFT = struct.Struct('<QHHBH')   # staff (0), start minute, end minute, hours, notes length
+
+_NO_VISITORS = 0xFFFFFFFF
+
+_VISITOR_TYPES = [None] + [value for value, _ in TourSession.VISITOR_TYPE_CHOICES]
+_BOOKING_CHANNELS = [None] + [value for value, _ in TourSession.BOOKING_CHANNEL_CHOICES]
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def encode_tour_day(daily_schedule):
+    """Pack a tour day's assignments, bookings, standby and publish flag."""
+    parts = [_TOUR_HEADER.pack(
+        _FORMAT_VERSION, daily_schedule.standby_guide_id or 0, int(daily_schedule.is_published)
+    )]
+    for slot_id, guide_id, visitors, visitor_type, channel in TourSession.objects.filter(
+        daily_schedule=daily_schedule
+    ).order_by('time_slot_id').values_list(
+        'time_slot_id', 'assigned_guide_id', 'visitor_count', 'visitor_type', 'booking_channel'
+    ):
+        parts.append(_TOUR_SESSION.pack(
+            slot_id,
+            guide_id or 0,
+            _NO_VISITORS if visitors is None else visitors,
+            _VISITOR_TYPES.index(visitor_type or None),
+            _BOOKING_CHANNELS.index(channel or None),
+        ))
+    return b''.join(parts)
+
+
+def decode_tour_day(data):
+    """(standby_id, published, {slot_id: (guide_id, visitor_count, visitor_type, channel)})"""
+    version, standby_id, published = _TOUR_HEADER.unpack_from(data)
+    _check_version(version)
+    sessions = {}
+    for slot_id, guide_id, visitors, visitor_type, channel in _TOUR_SESSION.iter_unpack(
+        memoryview(data)[_TOUR_HEADER.size:]
+    ):
+        sessions[slot_id] = (
+            guide_id or None,
+            None if visitors == _NO_VISITORS else visitors,
+            _VISITOR_TYPES[visitor_type],
+            _BOOKING_CHANNELS[channel],
+        )
+    return standby_id or None, bool(published), sessions
+
+
+def encode_restaurant_day(daily_schedule):
+    """Pack a restaurant day's shifts and publish state."""
+    published_at = daily_schedule.published_at
+    parts = [_RESTAURANT_HEADER.pack(
+        _FORMAT_VERSION,
+        int(daily_schedule.is_published),
+        int(published_at.timestamp()) if published_at else 0,
+    )]
+    for staff_id, start, end, hours, notes in StaffShift.objects.filter(
+        daily_schedule=daily_schedule
+    ).order_by('start_time', 'end_time', 'id').values_list(
+        'staff_id', 'start_time', 'end_time', 'duration_hours', 'notes'
+    ):
+        notes = notes.encode()
+        parts.append(_RESTAURANT_SHIFT.pack(staff_id or 0, _minute(start), _minute(end), hours, len(notes)))
+        parts.append(notes)
+    return b''.join(parts)
+
+
+def decode_restaurant_day(data):
+    """(published, published_at, [(staff_id, start_time, end_time, hours, notes)])"""
+    version, published, published_at = _RESTAURANT_HEADER.unpack_from(data)
+    _check_version(version)
+    shifts = []
+    offset = _RESTAURANT_HEADER.size
+    while offset < len(data):
+        staff_id, start, end, hours, notes_length = _RESTAURANT_SHIFT.unpack_from(data, offset)
+        offset += _RESTAURANT_SHIFT.size
+        notes = bytes(data[offset:offset + notes_length]).decode()
+        offset += notes_length
+        shifts.append((staff_id or None, _time(start), _time(end), hours, notes))
+    published_at = datetime.fromtimestamp(published_at, tz=dt_timezone.utc) if published_at else None
+    return bool(published), published_at, shifts
+
+
+def _check_version(version):
+    if version != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {version}")
+
+
+def _minute(value):
+    return value.hour * 60 + value.minute
+
+
+def _time(minute):
+    return time(minute // 60, minute % 60)
+
+
+# ============================================================================
+# RESTORING
+# ============================================================================
+
+def _restore_tour_day(daily_schedule, data):
+    """Write a tour snapshot back to the (locked) day. Returns sessions changed."""
+    standby_id, published, snapshot = decode_tour_day(data)
+    known_guides = set(Guide.objects.filter(
+        site_id=daily_schedule.site_id,
+        id__in={entry[0] for entry in snapshot.values()} | {standby_id}
+    ).values_list('id', flat=True))
+
+    guide_ids = tour_guide_ids(daily_schedule)
+    now = timezone.now()
+    changes = ChangeLog(daily_schedule.site_id)
+    updates = []
+    for session in TourSession.objects.select_for_update().filter(daily_schedule=daily_schedule):
+        if session.time_slot_id not in snapshot:
+            continue
+        guide_id, visitors, visitor_type, channel = snapshot[session.time_slot_id]
+        guide_id = guide_id if guide_id in known_guides else None
+        current = (
+            session.assigned_guide_id, session.visitor_count, session.visitor_type or None, session.booking_channel or None
+        )
+        if current == (guide_id, visitors, visitor_type, channel):
+            continue
+        changes.add(daily_schedule.date, ScheduleChange.KIND_GUIDE, session.id, session.assigned_guide_id, guide_id)
+        session.assigned_guide_id = guide_id
+        session.visitor_count = visitors
+        session.visitor_type = visitor_type
+        session.booking_channel = channel
+        session.version += 1
+        session.updated_at = now
+        updates.append(session)
+    TourSession.objects.bulk_update(
+        updates, ['assigned_guide', 'visitor_count', 'visitor_type', 'booking_channel', 'version', 'updated_at']
+    )
+
+    standby_id = standby_id if standby_id in known_guides else None
+    was_published = daily_schedule.is_published
+    changes.add(daily_schedule.date, ScheduleChange.KIND_STANDBY, daily_schedule.id,
+                daily_schedule.standby_guide_id, standby_id)
+    changes.add(daily_schedule.date, ScheduleChange.KIND_TOUR_PUBLISHED, daily_schedule.id,
+                int(was_published), int(published))
+    # Tour snapshots don't carry published_at: a restore that publishes
+    # the day stamps it now
+    if published != was_published:
+        daily_schedule.published_at = now if published else None
+    DailySchedule.objects.filter(id=daily_schedule.id).update(
+        standby_guide_id=standby_id,
+        is_published=published,
+        published_at=daily_schedule.published_at,
+        updated_at=now
+    )
+    daily_schedule.standby_guide_id = standby_id
+    daily_schedule.is_published = published
+    changes.save()
+
+    # Guides see published days through their feeds and rosters
+    if was_published or published:
+        refresh_feeds_for_tour_date(daily_schedule, guide_ids | tour_guide_ids(daily_schedule))
+        materialise_tour_date(daily_schedule)
+    return len(updates)
+
+
+def _restore_restaurant_day(daily_schedule, data):
+    """Replace the (locked) day's shifts with a restaurant snapshot. Returns shifts written."""
+    published, published_at, snapshot = decode_restaurant_day(data)
+    known_staff = set(RestaurantStaff.objects.filter(
+        site_id=daily_schedule.site_id,
+        id__in={shift[0] for shift in snapshot}
+    ).values_list('id', flat=True))
+
+    changes = ChangeLog(daily_schedule.site_id)
+    old_shifts = StaffShift.objects.filter(daily_schedule=daily_schedule)
+    staff_ids = set()
+    for shift_id, staff_id in old_shifts.values_list('id', 'staff_id'):
+        changes.add(daily_schedule.date, ScheduleChange.KIND_SHIFT_REMOVED, shift_id, staff_id, None)
+        staff_ids.add(staff_id)
+    old_shifts.delete()
+
+    new_shifts = bulk_create_validated(
+        StaffShift(
+            daily_schedule=daily_schedule,
+            staff_id=staff_id if staff_id in known_staff else None,
+            start_time=start,
+            end_time=end,
+            duration_hours=hours,
+            notes=notes
+        )
+        for staff_id, start, end, hours, notes in snapshot
+    )
+    for shift in new_shifts:
+        changes.add(daily_schedule.date, ScheduleChange.KIND_SHIFT_ADDED, shift.id, None, shift.staff_id)
+        staff_ids.add(shift.staff_id)
+
+    was_published = daily_schedule.is_published
+    changes.add(daily_schedule.date, ScheduleChange.KIND_RESTAURANT_PUBLISHED, daily_schedule.id,
+                int(was_published), int(published))
+    DailyRestaurantSchedule.objects.filter(id=daily_schedule.id).update(
+        is_published=published,
+        published_at=published_at,
+        updated_at=timezone.now()
+    )
+    daily_schedule.is_published = published
+    daily_schedule.published_at = published_at
+    changes.save()
+
+    # Staff see published days through their feeds and rosters
+    if was_published or published:
+        refresh_feeds_for_restaurant_date(daily_schedule, staff_ids)
+        materialise_restaurant_date(daily_schedule)
+    return len(new_shifts)
+
+
+# kind -> (day model, encode, restore)
+_KINDS = {
+    DaySnapshot.KIND_TOUR: (DailySchedule, encode_tour_day, _restore_tour_day),
+    DaySnapshot.KIND_RESTAURANT: (DailyRestaurantSchedule, encode_restaurant_day, _restore_restaurant_day),
+}
+
+
+# ============================================================================
+# STACKS
+# ============================================================================
+
+def _stack(kind, daily_schedule, stack):
+    return DaySnapshot.objects.filter(
+        site_id=daily_schedule.site_id, kind=kind, date=daily_schedule.date, stack=stack
+    )
+
+
+def _push(kind, daily_schedule, stack, label, data):
+    DaySnapshot.objects.create(
+        site_id=daily_schedule.site_id,
+        kind=kind,
+        date=daily_schedule.date,
+        stack=stack,
+        label=label[:50],
+        data=data,
+        user_id=current_user_id()
+    )
+    expired = list(_stack(kind, daily_schedule, stack).order_by('-id').values_list('id', flat=True)[UNDO_LEVELS:])
+    if expired:
+        DaySnapshot.objects.filter(id__in=expired).delete()
+
+
+def push_snapshot(kind, daily_schedule, label):
+    """
+    Save the day as it is now onto its undo stack, before a bulk edit
+    labelled `label`. Call inside the edit's transaction with the day
+    locked. Clears the redo stack; a snapshot identical to the newest
+    undo level isn't stored twice.
+    """
+    data = _KINDS[kind][1](daily_schedule)
+    _stack(kind, daily_schedule, DaySnapshot.STACK_REDO).delete()
+    newest = _stack(kind, daily_schedule, DaySnapshot.STACK_UNDO).order_by('-id').values_list(
+        'data', flat=True
+    ).first()
+    if newest is None or bytes(newest) != data:
+        _push(kind, daily_schedule, DaySnapshot.STACK_UNDO, label, data)
+
+
+def clear_redo(kind, daily_schedule):
+    """Drop the day's redo stack after a single edit; call in the edit's transaction."""
+    _stack(kind, daily_schedule, DaySnapshot.STACK_REDO).delete()
+
+
+def history(kind, daily_schedule):
+    """Labels on the day's undo and redo stacks, newest first."""
+    labels = {DaySnapshot.STACK_UNDO: [], DaySnapshot.STACK_REDO: []}
+    for stack, label in DaySnapshot.objects.filter(
+        site_id=daily_schedule.site_id, kind=kind, date=daily_schedule.date
+    ).order_by('-id').values_list('stack', 'label'):
+        labels[stack].append(label)
+    return {'undo': labels[DaySnapshot.STACK_UNDO], 'redo': labels[DaySnapshot.STACK_REDO]}
+
+
+@transaction.atomic
+def _step(kind, site, day, source, target):
+    model, encode, restore = _KINDS[kind]
+    daily_schedule = model.objects.select_for_update().get(site=site, date=day)
+    snapshot = _stack(kind, daily_schedule, source).select_for_update().order_by('-id').first()
+    if snapshot is None:
+        raise ValueError(f"Nothing to {source} for {day}")
+
+    _push(kind, daily_schedule, target, snapshot.label, encode(daily_schedule))
+    written = restore(daily_schedule, bytes(snapshot.data))
+    snapshot.delete()
+    return {'label': snapshot.label, 'written': written, **history(kind, daily_schedule)}
+
+
+def undo(kind, site, day):
+    """
+    Restore the day's newest undo snapshot, keeping the current state for
+    redo(). Raises the day model's DoesNotExist, or ValueError if there is
+    nothing to undo. Returns the label undone, the sessions or shifts
+    written and the remaining history().
+    """
+    return _step(kind, site, day, DaySnapshot.STACK_UNDO, DaySnapshot.STACK_REDO)
+
+
+def redo(kind, site, day):
+    """Re-apply the edit last undone on the day. Same errors and result as undo()."""
+    return _step(kind, site, day, DaySnapshot.STACK_REDO, DaySnapshot.STACK_UNDO)
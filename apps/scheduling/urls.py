@@ -7,12 +7,16 @@ urlpatterns = [
 
     # Tour Guide Schedule
     path('guide/overview/', views.schedule_overview, name='schedule_overview'),
+    path('month/', views.coverage_heatmap, name='coverage_heatmap'),
     path('guide/', views.schedule_manager, name='schedule_manager'),
 
     # Restaurant Schedule
     path('restaurant/', views.restaurant_schedule_manager, name='restaurant_schedule_manager'),
     path('restaurant/grid/', views.kitchen_staff_grid, name='kitchen_staff_grid'),
 
+    # Calendar feeds (token-addressed, no login)
+    path('feeds/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+
     # API endpoints (Phase 2)
     path('api/assign/', api_views.assign_guide, name='api_assign_guide'),
     path('api/unassign/', api_views.unassign_guide, name='api_unassign_guide'),
@@ -20,6 +24,9 @@ urlpatterns = [
     path('api/session/<int:session_id>/', api_views.get_session_data, name='api_session_data'),
     path('api/standby/', api_views.update_standby, name='api_update_standby'),
     path('api/stats/<str:date_str>/', api_views.get_schedule_stats, name='api_schedule_stats'),
+    path('api/range/', api_views.schedule_range, name='api_schedule_range'),
+    path('api/heatmap/', api_views.coverage_heatmap_data, name='api_coverage_heatmap'),
+    path('api/forecast/', api_views.demand_forecast, name='api_demand_forecast'),
 
     # API endpoints (Phase 3)
     path('api/auto-assign/', api_views.auto_assign_day, name='api_auto_assign'),
@@ -28,12 +35,48 @@ urlpatterns = [
     # API endpoints (Phase 4)
     path('api/export/<str:date_str>/', api_views.export_schedule_csv, name='api_export_csv'),
     path('api/publish/', api_views.publish_schedule, name='api_publish'),
+    path('api/publish/range/', api_views.publish_schedule_range, name='api_publish_range'),
 
     # Restaurant API endpoints (Phase 5)
     path('api/restaurant/auto-assign/', api_views.restaurant_auto_assign, name='api_restaurant_auto_assign'),
     path('api/restaurant/clear-all/', api_views.restaurant_clear_all, name='api_restaurant_clear_all'),
     path('api/restaurant/publish/', api_views.restaurant_publish, name='api_restaurant_publish'),
+    path('api/restaurant/publish/range/', api_views.restaurant_publish_range, name='api_restaurant_publish_range'),
     path('api/restaurant/assign-shift/', api_views.restaurant_assign_shift, name='api_restaurant_assign_shift'),
     path('api/restaurant/schedule/<str:date_str>/', api_views.restaurant_schedule_data, name='api_restaurant_schedule_data'),
+    path('api/restaurant/range/', api_views.restaurant_schedule_range, name='api_restaurant_schedule_range'),
     path('api/restaurant/export/<str:date_str>/', api_views.restaurant_export_csv, name='api_restaurant_export_csv'),
+
+    # Published roster API
+    path('api/roster/me/', api_views.my_roster, name='api_my_roster'),
+    path('api/roster/<str:person_type>/<int:person_id>/', api_views.person_roster, name='api_person_roster'),
+
+    # What-if scenarios (in-memory forks of a day)
+    path('api/scenarios/', api_views.scenario_fork, name='api_scenario_fork'),
+    path('api/scenarios/<str:token>/', api_views.scenario_detail, name='api_scenario_detail'),
+    path('api/scenarios/<str:token>/apply/', api_views.scenario_apply, name='api_scenario_apply'),
+    path('api/scenarios/<str:token>/commit/', api_views.scenario_commit, name='api_scenario_commit'),
+    path('api/scenarios/<str:token>/discard/', api_views.scenario_discard, name='api_scenario_discard'),
+
+    # Shift swaps
+    path('api/swaps/candidates/<int:session_id>/', api_views.swap_candidates, name='api_swap_candidates'),
+    path('api/swaps/<int:swap_id>/approve/', api_views.swap_decide, {'decision': 'approve'}, name='api_swap_approve'),
+    path('api/swaps/<int:swap_id>/reject/', api_views.swap_decide, {'decision': 'reject'}, name='api_swap_reject'),
+
+    # Undo / redo of bulk edits
+    path('api/undo/', api_views.undo_redo, {'kind': 'tour', 'action': 'undo'}, name='api_undo'),
+    path('api/redo/', api_views.undo_redo, {'kind': 'tour', 'action': 'redo'}, name='api_redo'),
+    path('api/undo/history/', api_views.undo_history, {'kind': 'tour'}, name='api_undo_history'),
+    path('api/restaurant/undo/', api_views.undo_redo, {'kind': 'restaurant', 'action': 'undo'},
+         name='api_restaurant_undo'),
+    path('api/restaurant/redo/', api_views.undo_redo, {'kind': 'restaurant', 'action': 'redo'},
+         name='api_restaurant_redo'),
+    path('api/restaurant/undo/history/', api_views.undo_history, {'kind': 'restaurant'},
+         name='api_restaurant_undo_history'),
+
+    # Schedule change log
+    path('api/changes/', api_views.schedule_changes, name='api_schedule_changes'),
+
+    # Scheduler run telemetry
+    path('api/scheduler-runs/', api_views.scheduler_runs, name='api_scheduler_runs'),
 ]
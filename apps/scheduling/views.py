@@ -1,20 +1,30 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_http_methods
 from datetime import date, timedelta, datetime, time
-from apps.scheduling.models import DailySchedule, TourSession, TourTimeSlot, DailyRestaurantSchedule, StaffShift, RestaurantStaff
+from apps.scheduling.models import DailySchedule, TourSession, TourTimeSlot, DailyRestaurantSchedule, StaffShift, RestaurantStaff, CalendarFeed
+from apps.core.models import Site
+from apps.core.sites import site_for_request
 from apps.guides.models import Guide
 from apps.scheduling.services import SchedulingService
+from apps.scheduling.slot_templates import slots_for_schedule
+from apps.scheduling.grid_cache import (
+    GRID_CACHE_TIMEOUT, tour_day_stamp, restaurant_day_stamp, lazy_grid_context
+)
 
 
 @staff_member_required
 def schedule_dashboard(request):
     """Main scheduling dashboard with links to all scheduling modules."""
     today = date.today()
+    site = site_for_request(request)
 
     # Get today's schedules for quick stats
-    tour_schedule = DailySchedule.objects.filter(date=today).first()
-    restaurant_schedule = DailyRestaurantSchedule.objects.filter(date=today).first()
+    tour_schedule = DailySchedule.objects.filter(site=site, date=today).first()
+    restaurant_schedule = DailyRestaurantSchedule.objects.filter(site=site, date=today).first()
 
     # Tour guide stats
     tour_stats = {}
@@ -48,6 +58,8 @@ def schedule_dashboard(request):
 
     context = {
         'today': today,
+        'site': site,
+        'sites': Site.objects.filter(is_active=True),
         'tour_stats': tour_stats,
         'restaurant_stats': restaurant_stats,
         'tour_schedule': tour_schedule,
@@ -70,115 +82,126 @@ def schedule_overview(request):
     else:
         view_date = date.today()
 
+    site = site_for_request(request)
+
     # Get or create daily schedule for this date
     try:
-        daily_schedule = DailySchedule.objects.get(date=view_date)
+        daily_schedule = DailySchedule.objects.get(site=site, date=view_date)
     except DailySchedule.DoesNotExist:
         daily_schedule = None
 
-    # Get all active guides
-    guides = Guide.objects.filter(is_active=True).select_related('user').order_by('user__first_name', 'user__last_name')
-
-    # Get all time slots
-    time_slots = TourTimeSlot.objects.all().order_by('start_time')
-
-    # Build schedule grid
-    # Structure: {time_slot_id: {guide_id: session_or_none}}
-    schedule_grid = {}
-
-    if daily_schedule:
-        sessions = TourSession.objects.filter(
-            daily_schedule=daily_schedule
-        ).select_related('time_slot', 'assigned_guide')
-
-        # Initialize grid
-        for time_slot in time_slots:
-            schedule_grid[time_slot.id] = {}
-            for guide in guides:
-                schedule_grid[time_slot.id][guide.id] = None
-
-        # Fill in assigned sessions
-        for session in sessions:
-            if session.assigned_guide:
-                schedule_grid[session.time_slot.id][session.assigned_guide.id] = session
-
-    # Get feasibility information if schedule exists
-    service = SchedulingService()
-    feasibility_map = {}
-    time_slot_feasibility = {}
-
-    if daily_schedule:
-        feasibility_map = service.get_daily_feasibility(daily_schedule)
-
-        # For each time slot, check if it can be filled by anyone
-        for time_slot in time_slots:
-            # Find the session for this time slot
-            session = sessions.filter(time_slot=time_slot).first()
-            if session:
-                can_fill, eligible = service.check_session_feasibility(session)
-                time_slot_feasibility[time_slot.id] = {
-                    'can_fill': can_fill,
-                    'eligible_count': len(eligible),
-                    'is_assigned': session.assigned_guide is not None
-                }
-
-    # Build rows for template (guides as rows, time slots as columns)
-    guide_rows = []
-    for guide in guides:
-        row = {
-            'guide': guide,
-            'cells': []
-        }
+    # Get all active guides at the site
+    guides = Guide.objects.filter(site=site, is_active=True).select_related('user').order_by(
+        'user__first_name', 'user__last_name'
+    )
 
-        for time_slot in time_slots:
-            session = schedule_grid.get(time_slot.id, {}).get(guide.id) if daily_schedule else None
-
-            # Determine cell status
-            if session:
-                # Guide is working this slot
-                cell_status = 'working'
-                cell_class = 'table-success'
-                cell_text = time_slot.start_time.strftime('%I:%M %p')
-            elif daily_schedule:
-                # Check if guide has a break requirement or is incompatible
-                if not guide.can_work_timeslot(time_slot):
-                    cell_status = 'incompatible'
-                    cell_class = 'table-secondary'
-                    cell_text = '-'
+    # Time slots of the day (its sessions, or its slot template)
+    time_slots = slots_for_schedule(daily_schedule, view_date, site)
+
+    # Grid rows are built lazily: skipped entirely on a fragment cache hit
+    def build_grid():
+        # Build schedule grid
+        # Structure: {time_slot_id: {guide_id: session_or_none}}
+        schedule_grid = {}
+
+        if daily_schedule:
+            sessions = TourSession.objects.filter(
+                daily_schedule=daily_schedule
+            ).select_related('time_slot', 'assigned_guide')
+
+            # Initialize grid
+            for time_slot in time_slots:
+                schedule_grid[time_slot.id] = {}
+                for guide in guides:
+                    schedule_grid[time_slot.id][guide.id] = None
+
+            # Fill in assigned sessions
+            for session in sessions:
+                if session.assigned_guide:
+                    schedule_grid[session.time_slot.id][session.assigned_guide.id] = session
+
+        # Get feasibility information if schedule exists
+        service = SchedulingService(site)
+        feasibility_map = {}
+        time_slot_feasibility = {}
+
+        if daily_schedule:
+            feasibility_map = service.get_daily_feasibility(daily_schedule)
+
+            # For each time slot, check if it can be filled by anyone
+            for time_slot in time_slots:
+                # Find the session for this time slot
+                session = sessions.filter(time_slot=time_slot).first()
+                if session:
+                    can_fill, eligible = service.check_session_feasibility(session)
+                    time_slot_feasibility[time_slot.id] = {
+                        'can_fill': can_fill,
+                        'eligible_count': len(eligible),
+                        'is_assigned': session.assigned_guide is not None
+                    }
+
+        # Build rows for template (guides as rows, time slots as columns)
+        guide_rows = []
+        for guide in guides:
+            row = {
+                'guide': guide,
+                'cells': []
+            }
+
+            for time_slot in time_slots:
+                session = schedule_grid.get(time_slot.id, {}).get(guide.id) if daily_schedule else None
+
+                # Determine cell status
+                if session:
+                    # Guide is working this slot
+                    cell_status = 'working'
+                    cell_class = 'table-success'
+                    cell_text = time_slot.start_time.strftime('%I:%M %p')
+                elif daily_schedule:
+                    # Check if guide has a break requirement or is incompatible
+                    if not guide.can_work_timeslot(time_slot):
+                        cell_status = 'incompatible'
+                        cell_class = 'table-secondary'
+                        cell_text = '-'
+                    else:
+                        # Guide could work but isn't assigned (resting)
+                        cell_status = 'resting'
+                        cell_class = 'table-light'
+                        cell_text = '-'
                 else:
-                    # Guide could work but isn't assigned (resting)
-                    cell_status = 'resting'
+                    cell_status = 'no_schedule'
                     cell_class = 'table-light'
                     cell_text = '-'
-            else:
-                cell_status = 'no_schedule'
-                cell_class = 'table-light'
-                cell_text = '-'
-
-            row['cells'].append({
-                'time_slot': time_slot,
-                'session': session,
-                'status': cell_status,
-                'class': cell_class,
-                'text': cell_text,
-                'feasibility': time_slot_feasibility.get(time_slot.id, {})
-            })
 
-        guide_rows.append(row)
+                row['cells'].append({
+                    'time_slot': time_slot,
+                    'session': session,
+                    'status': cell_status,
+                    'class': cell_class,
+                    'text': cell_text,
+                    'feasibility': time_slot_feasibility.get(time_slot.id, {})
+                })
+
+            guide_rows.append(row)
+
+        return {'guide_rows': guide_rows}
 
     # Navigation dates
     prev_date = view_date - timedelta(days=1)
     next_date = view_date + timedelta(days=1)
 
     context = {
+        'site': site,
         'view_date': view_date,
         'daily_schedule': daily_schedule,
         'guides': guides,
         'time_slots': time_slots,
-        'guide_rows': guide_rows,
         'prev_date': prev_date,
         'next_date': next_date,
         'today': date.today(),
+        'grid_stamp': tour_day_stamp(site, view_date),
+        'grid_cache_timeout': GRID_CACHE_TIMEOUT,
+        **lazy_grid_context(build_grid, ['guide_rows']),
     }
 
     return render(request, 'scheduling/schedule_overview.html', context)
@@ -237,105 +260,100 @@ def schedule_manager(request):
     else:
         view_date = date.today()
 
+    site = site_for_request(request)
+
     # Get or create daily schedule
-    daily_schedule, created = DailySchedule.objects.get_or_create(date=view_date)
+    daily_schedule, created = DailySchedule.objects.get_or_create(site=site, date=view_date)
 
-    # Get all active guides
-    guides = Guide.objects.filter(is_active=True).select_related('user').order_by('user__first_name')
+    # Get all active guides at the site
+    guides = Guide.objects.filter(site=site, is_active=True).select_related('user').order_by('user__first_name')
 
-    # Get all tour time slots (for creating sessions)
-    tour_time_slots = TourTimeSlot.objects.all().order_by('start_time')
+    # Create sessions for the day's slot template if they don't exist
+    if created or not TourSession.objects.filter(daily_schedule=daily_schedule).exists():
+        SchedulingService(site).generate_sessions_for_date(view_date)
 
     # Get all sessions for this day
     all_sessions = TourSession.objects.filter(
         daily_schedule=daily_schedule
     ).select_related('time_slot', 'assigned_guide')
 
-    # Create sessions if they don't exist
-    for time_slot in tour_time_slots:
-        TourSession.objects.get_or_create(
-            daily_schedule=daily_schedule,
-            time_slot=time_slot
-        )
-
-    # Refresh sessions after creation
-    all_sessions = TourSession.objects.filter(
-        daily_schedule=daily_schedule
-    ).select_related('time_slot', 'assigned_guide')
-
-    # Build guide sessions map for quick lookup
-    guide_sessions_map = {}
-    for guide in guides:
-        guide_sessions_map[guide.id] = list(all_sessions.filter(
-            assigned_guide=guide
-        ).order_by('time_slot__start_time'))
-
-    # Generate 30-minute display slots from 10:00 AM to 10:00 PM
-    # These are for display only, not actual tour slots
-    # Tours start on the hour, but we show 30-min increments for buffer visualization
-    display_slots = []
-    current_time = time(10, 0)  # 10:00 AM (first tour starts)
-    end_time = time(22, 0)  # 10:00 PM (covers last tour ending at 9:30 PM + buffer)
-
-    while current_time < end_time:
-        # Calculate slot end time (30 minutes later)
-        start_dt = datetime.combine(date.today(), current_time)
-        end_dt = start_dt + timedelta(minutes=30)
-
-        display_slots.append({
-            'start_time': current_time,
-            'end_time': end_dt.time()
-        })
-
-        # Move to next 30-minute slot
-        current_time = end_dt.time()
+    # Grid rows are built lazily: skipped entirely on a fragment cache hit
+    def build_grid():
+        # Build guide sessions map for quick lookup
+        guide_sessions_map = {}
+        for guide in guides:
+            guide_sessions_map[guide.id] = list(all_sessions.filter(
+                assigned_guide=guide
+            ).order_by('time_slot__start_time'))
+
+        # Generate 30-minute display slots from 10:00 AM to 10:00 PM
+        # These are for display only, not actual tour slots
+        # Tours start on the hour, but we show 30-min increments for buffer visualization
+        display_slots = []
+        current_time = time(10, 0)  # 10:00 AM (first tour starts)
+        end_time = time(22, 0)  # 10:00 PM (covers last tour ending at 9:30 PM + buffer)
+
+        while current_time < end_time:
+            # Calculate slot end time (30 minutes later)
+            start_dt = datetime.combine(date.today(), current_time)
+            end_dt = start_dt + timedelta(minutes=30)
+
+            display_slots.append({
+                'start_time': current_time,
+                'end_time': end_dt.time()
+            })
 
-    # Build schedule grid with 30-minute rows
-    schedule_rows = []
+            # Move to next 30-minute slot
+            current_time = end_dt.time()
 
-    for slot in display_slots:
-        slot_start = slot['start_time']
-        slot_end = slot['end_time']
+        # Build schedule grid with 30-minute rows
+        schedule_rows = []
 
-        row = {
-            'time_slot': slot,
-            'cells': []
-        }
+        for slot in display_slots:
+            slot_start = slot['start_time']
+            slot_end = slot['end_time']
 
-        for guide in guides:
-            # Get guide's sessions for the day
-            guide_sessions = guide_sessions_map.get(guide.id, [])
-
-            # Calculate cell status for this 30-min slot
-            cell_status, cell_detail, related_session = _calculate_cell_status(
-                guide, slot_start, slot_end, guide_sessions
-            )
-
-            # Check guide type compatibility for this slot
-            # We need to check if guide can work tours that overlap this 30-min slot
-            if cell_status == 'resting':  # Only check if not already assigned
-                # Create a dummy time slot to check compatibility
-                dummy_slot = TourTimeSlot(start_time=slot_start, end_time=slot_end)
-                if not guide.can_work_timeslot(dummy_slot):
-                    cell_status = 'incompatible'
-                    cell_detail = 'N/A'
-
-            # Find the session to edit (session that starts at this time)
-            editable_session = None
-            for session in all_sessions:
-                if session.time_slot.start_time == slot_start:
-                    editable_session = session
-                    break
-
-            row['cells'].append({
-                'guide': guide,
-                'session': editable_session,  # Session if tour starts here, else None
-                'status': cell_status,
-                'detail': cell_detail,
-                'related_session': related_session  # The tour this cell is part of
-            })
+            row = {
+                'time_slot': slot,
+                'cells': []
+            }
 
-        schedule_rows.append(row)
+            for guide in guides:
+                # Get guide's sessions for the day
+                guide_sessions = guide_sessions_map.get(guide.id, [])
+
+                # Calculate cell status for this 30-min slot
+                cell_status, cell_detail, related_session = _calculate_cell_status(
+                    guide, slot_start, slot_end, guide_sessions
+                )
+
+                # Check guide type compatibility for this slot
+                # We need to check if guide can work tours that overlap this 30-min slot
+                if cell_status == 'resting':  # Only check if not already assigned
+                    # Create a dummy time slot to check compatibility
+                    dummy_slot = TourTimeSlot(start_time=slot_start, end_time=slot_end)
+                    if not guide.can_work_timeslot(dummy_slot):
+                        cell_status = 'incompatible'
+                        cell_detail = 'N/A'
+
+                # Find the session to edit (session that starts at this time)
+                editable_session = None
+                for session in all_sessions:
+                    if session.time_slot.start_time == slot_start:
+                        editable_session = session
+                        break
+
+                row['cells'].append({
+                    'guide': guide,
+                    'session': editable_session,  # Session if tour starts here, else None
+                    'status': cell_status,
+                    'detail': cell_detail,
+                    'related_session': related_session  # The tour this cell is part of
+                })
+
+            schedule_rows.append(row)
+
+        return {'schedule_rows': schedule_rows}
 
     # Calculate statistics based on actual tour sessions
     assigned_count = all_sessions.filter(assigned_guide__isnull=False).count()
@@ -347,17 +365,20 @@ def schedule_manager(request):
     next_date = view_date + timedelta(days=1)
 
     context = {
+        'site': site,
         'view_date': view_date,
         'daily_schedule': daily_schedule,
         'guides': guides,
-        'schedule_rows': schedule_rows,
         'prev_date': prev_date,
         'next_date': next_date,
         'today': date.today(),
         'assigned_count': assigned_count,
-        'total_slots': len(tour_time_slots),  # Total tour slots (21)
+        'total_slots': assigned_count + unassigned_count,  # Tour sessions of the day
         'unassigned_count': unassigned_count,
         'guides_used_count': len(guides_used),
+        'grid_stamp': tour_day_stamp(site, view_date),
+        'grid_cache_timeout': GRID_CACHE_TIMEOUT,
+        **lazy_grid_context(build_grid, ['schedule_rows']),
     }
 
     return render(request, 'scheduling/schedule_manager.html', context)
@@ -384,18 +405,23 @@ def restaurant_schedule_manager(request):
     else:
         view_date = date.today()
 
+    site = site_for_request(request)
+
     # Get or create daily restaurant schedule
     daily_schedule, created = DailyRestaurantSchedule.objects.get_or_create(
+        site=site,
         date=view_date
     )
 
-    # Get all active staff
+    # Get all active staff at the site
     kitchen_staff = RestaurantStaff.objects.filter(
+        site=site,
         is_active=True,
         staff_type='kitchen'
     ).select_related('user').order_by('user__first_name')
 
     serving_staff = RestaurantStaff.objects.filter(
+        site=site,
         is_active=True,
         staff_type='serving'
     ).select_related('user').order_by('user__first_name')
@@ -409,7 +435,7 @@ def restaurant_schedule_manager(request):
     serving_shifts = all_shifts.filter(staff__staff_type='serving')
 
     # Get schedule summary
-    service = RestaurantSchedulingService()
+    service = RestaurantSchedulingService(site)
     summary = service.get_schedule_summary(daily_schedule)
     validation = service.validate_coverage(daily_schedule)
 
@@ -423,6 +449,7 @@ def restaurant_schedule_manager(request):
     next_date = view_date + timedelta(days=1)
 
     context = {
+        'site': site,
         'view_date': view_date,
         'daily_schedule': daily_schedule,
         'kitchen_staff': kitchen_staff,
@@ -461,23 +488,14 @@ def kitchen_staff_grid(request):
     else:
         view_date = date.today()
 
+    site = site_for_request(request)
+
     # Get or create daily restaurant schedule for this date
     try:
-        daily_schedule = DailyRestaurantSchedule.objects.get(date=view_date)
+        daily_schedule = DailyRestaurantSchedule.objects.get(site=site, date=view_date)
     except DailyRestaurantSchedule.DoesNotExist:
         daily_schedule = None
 
-    # Get all active restaurant staff
-    kitchen_staff = RestaurantStaff.objects.filter(
-        is_active=True,
-        staff_type='kitchen'
-    ).select_related('user').order_by('user__first_name', 'user__last_name')
-
-    serving_staff = RestaurantStaff.objects.filter(
-        is_active=True,
-        staff_type='serving'
-    ).select_related('user').order_by('user__first_name', 'user__last_name')
-
     # Generate hourly time slots from 10am to 10pm (10:00 to 22:00)
     time_slots = []
     for hour in range(10, 23):  # 10am to 10pm inclusive
@@ -487,139 +505,230 @@ def kitchen_staff_grid(request):
             'display_12h': time(hour, 0).strftime('%I:00 %p')
         })
 
-    # Build schedule grid
-    # Structure: {staff_id: {hour: shift_or_none}}
-    schedule_grid = {'kitchen': {}, 'serving': {}}
-
-    if daily_schedule:
-        shifts = StaffShift.objects.filter(
-            daily_schedule=daily_schedule
-        ).select_related('staff')
-
-        # Initialize grid
+    # Grid rows are built lazily: skipped entirely on a fragment cache hit
+    def build_grid():
+        # Get all active restaurant staff at the site
+        kitchen_staff = RestaurantStaff.objects.filter(
+            site=site,
+            is_active=True,
+            staff_type='kitchen'
+        ).select_related('user').order_by('user__first_name', 'user__last_name')
+
+        serving_staff = RestaurantStaff.objects.filter(
+            site=site,
+            is_active=True,
+            staff_type='serving'
+        ).select_related('user').order_by('user__first_name', 'user__last_name')
+
+        # Build schedule grid
+        # Structure: {staff_id: {hour: shift_or_none}}
+        schedule_grid = {'kitchen': {}, 'serving': {}}
+
+        if daily_schedule:
+            shifts = StaffShift.objects.filter(
+                daily_schedule=daily_schedule
+            ).select_related('staff')
+
+            # Initialize grid
+            for staff in kitchen_staff:
+                schedule_grid['kitchen'][staff.id] = {}
+                for slot in time_slots:
+                    schedule_grid['kitchen'][staff.id][slot['hour']] = None
+
+            for staff in serving_staff:
+                schedule_grid['serving'][staff.id] = {}
+                for slot in time_slots:
+                    schedule_grid['serving'][staff.id][slot['hour']] = None
+
+            # Fill in shifts
+            for shift in shifts:
+                if not shift.staff:
+                    continue
+
+                staff_type = shift.staff.staff_type
+                staff_id = shift.staff.id
+
+                # Determine which hours this shift covers
+                start_hour = shift.start_time.hour
+                end_hour = shift.end_time.hour
+                if shift.end_time.minute > 0:
+                    end_hour += 1  # Include partial hour
+
+                # Mark all hours covered by this shift
+                for hour in range(start_hour, end_hour):
+                    if 10 <= hour <= 22:  # Only within our display range
+                        if staff_id in schedule_grid[staff_type]:
+                            schedule_grid[staff_type][staff_id][hour] = shift
+
+        # Build rows for template (Kitchen staff)
+        kitchen_rows = []
         for staff in kitchen_staff:
-            schedule_grid['kitchen'][staff.id] = {}
-            for slot in time_slots:
-                schedule_grid['kitchen'][staff.id][slot['hour']] = None
+            row = {
+                'staff': staff,
+                'cells': []
+            }
 
-        for staff in serving_staff:
-            schedule_grid['serving'][staff.id] = {}
             for slot in time_slots:
-                schedule_grid['serving'][staff.id][slot['hour']] = None
-
-        # Fill in shifts
-        for shift in shifts:
-            if not shift.staff:
-                continue
-
-            staff_type = shift.staff.staff_type
-            staff_id = shift.staff.id
-
-            # Determine which hours this shift covers
-            start_hour = shift.start_time.hour
-            end_hour = shift.end_time.hour
-            if shift.end_time.minute > 0:
-                end_hour += 1  # Include partial hour
-
-            # Mark all hours covered by this shift
-            for hour in range(start_hour, end_hour):
-                if 10 <= hour <= 22:  # Only within our display range
-                    if staff_id in schedule_grid[staff_type]:
-                        schedule_grid[staff_type][staff_id][hour] = shift
-
-    # Build rows for template (Kitchen staff)
-    kitchen_rows = []
-    for staff in kitchen_staff:
-        row = {
-            'staff': staff,
-            'cells': []
-        }
-
-        for slot in time_slots:
-            hour = slot['hour']
-            shift = schedule_grid['kitchen'].get(staff.id, {}).get(hour)
-
-            if shift:
-                # Staff is working this hour
-                cell_status = 'working'
-                cell_class = 'table-danger'  # Red for kitchen
-                # Show shift details only at start hour
-                if shift.start_time.hour == hour:
-                    cell_text = f"{shift.start_time.strftime('%I:%M %p')}"
+                hour = slot['hour']
+                shift = schedule_grid['kitchen'].get(staff.id, {}).get(hour)
+
+                if shift:
+                    # Staff is working this hour
+                    cell_status = 'working'
+                    cell_class = 'table-danger'  # Red for kitchen
+                    # Show shift details only at start hour
+                    if shift.start_time.hour == hour:
+                        cell_text = f"{shift.start_time.strftime('%I:%M %p')}"
+                    else:
+                        cell_text = '●'  # Continued shift
+                elif daily_schedule:
+                    # Staff is not working (resting)
+                    cell_status = 'resting'
+                    cell_class = 'table-light'
+                    cell_text = '-'
                 else:
-                    cell_text = '●'  # Continued shift
-            elif daily_schedule:
-                # Staff is not working (resting)
-                cell_status = 'resting'
-                cell_class = 'table-light'
-                cell_text = '-'
-            else:
-                cell_status = 'no_schedule'
-                cell_class = 'table-light'
-                cell_text = '-'
-
-            row['cells'].append({
-                'status': cell_status,
-                'class': cell_class,
-                'text': cell_text,
-                'shift': shift
-            })
+                    cell_status = 'no_schedule'
+                    cell_class = 'table-light'
+                    cell_text = '-'
 
-        kitchen_rows.append(row)
+                row['cells'].append({
+                    'status': cell_status,
+                    'class': cell_class,
+                    'text': cell_text,
+                    'shift': shift
+                })
 
-    # Build rows for template (Serving staff)
-    serving_rows = []
-    for staff in serving_staff:
-        row = {
-            'staff': staff,
-            'cells': []
-        }
+            kitchen_rows.append(row)
+
+        # Build rows for template (Serving staff)
+        serving_rows = []
+        for staff in serving_staff:
+            row = {
+                'staff': staff,
+                'cells': []
+            }
 
-        for slot in time_slots:
-            hour = slot['hour']
-            shift = schedule_grid['serving'].get(staff.id, {}).get(hour)
-
-            if shift:
-                # Staff is working this hour
-                cell_status = 'working'
-                cell_class = 'table-primary'  # Blue for serving
-                # Show shift details only at start hour
-                if shift.start_time.hour == hour:
-                    cell_text = f"{shift.start_time.strftime('%I:%M %p')}"
+            for slot in time_slots:
+                hour = slot['hour']
+                shift = schedule_grid['serving'].get(staff.id, {}).get(hour)
+
+                if shift:
+                    # Staff is working this hour
+                    cell_status = 'working'
+                    cell_class = 'table-primary'  # Blue for serving
+                    # Show shift details only at start hour
+                    if shift.start_time.hour == hour:
+                        cell_text = f"{shift.start_time.strftime('%I:%M %p')}"
+                    else:
+                        cell_text = '●'  # Continued shift
+                elif daily_schedule:
+                    # Staff is not working (resting)
+                    cell_status = 'resting'
+                    cell_class = 'table-light'
+                    cell_text = '-'
                 else:
-                    cell_text = '●'  # Continued shift
-            elif daily_schedule:
-                # Staff is not working (resting)
-                cell_status = 'resting'
-                cell_class = 'table-light'
-                cell_text = '-'
-            else:
-                cell_status = 'no_schedule'
-                cell_class = 'table-light'
-                cell_text = '-'
-
-            row['cells'].append({
-                'status': cell_status,
-                'class': cell_class,
-                'text': cell_text,
-                'shift': shift
-            })
+                    cell_status = 'no_schedule'
+                    cell_class = 'table-light'
+                    cell_text = '-'
+
+                row['cells'].append({
+                    'status': cell_status,
+                    'class': cell_class,
+                    'text': cell_text,
+                    'shift': shift
+                })
 
-        serving_rows.append(row)
+            serving_rows.append(row)
+
+        return {'kitchen_rows': kitchen_rows, 'serving_rows': serving_rows}
 
     # Navigation dates
     prev_date = view_date - timedelta(days=1)
     next_date = view_date + timedelta(days=1)
 
     context = {
+        'site': site,
         'view_date': view_date,
         'daily_schedule': daily_schedule,
         'time_slots': time_slots,
-        'kitchen_rows': kitchen_rows,
-        'serving_rows': serving_rows,
         'prev_date': prev_date,
         'next_date': next_date,
         'today': date.today(),
+        'grid_stamp': restaurant_day_stamp(site, view_date),
+        'grid_cache_timeout': GRID_CACHE_TIMEOUT,
+        **lazy_grid_context(build_grid, ['kitchen_rows', 'serving_rows']),
     }
 
     return render(request, 'scheduling/kitchen_staff_grid.html', context)
+
+
+@staff_member_required
+def coverage_heatmap(request):
+    """Month-at-a-glance heatmap of problem days for tours and restaurant."""
+    import calendar
+    from apps.scheduling.services import get_coverage_heatmap
+
+    # Get month from query parameter or default to this month
+    month_str = request.GET.get('month')
+    try:
+        month_start = datetime.strptime(month_str, '%Y-%m').date() if month_str else date.today().replace(day=1)
+    except ValueError:
+        month_start = date.today().replace(day=1)
+    month_end = month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+
+    site = site_for_request(request)
+    days = {d['date']: d for d in get_coverage_heatmap(month_start, month_end, site)}
+
+    # Calendar grid: weeks of (date, heatmap entry or None for other months)
+    weeks = [
+        [(day, days.get(day.isoformat()) if day.month == month_start.month else None) for day in week]
+        for week in calendar.Calendar().monthdatescalendar(month_start.year, month_start.month)
+    ]
+
+    totals = {
+        'error': sum(1 for d in days.values() if d['level'] == 'error'),
+        'warning': sum(1 for d in days.values() if d['level'] == 'warning'),
+        'draft': sum(1 for d in days.values() if d['level'] == 'draft'),
+        'ok': sum(1 for d in days.values() if d['level'] == 'ok'),
+    }
+
+    context = {
+        'site': site,
+        'month_start': month_start,
+        'weeks': weeks,
+        'totals': totals,
+        'prev_month': (month_start - timedelta(days=1)).replace(day=1),
+        'next_month': month_end + timedelta(days=1),
+        'today': date.today(),
+    }
+
+    return render(request, 'scheduling/coverage_heatmap.html', context)
+
+
+@require_http_methods(["GET", "HEAD"])
+def calendar_feed(request, token):
+    """
+    iCalendar feed for one guide or staff member, addressed by secret token.
+
+    No login: calendar apps can't authenticate, so the token is the
+    credential. Serves the stored feed body and answers If-None-Match with
+    304, so polling costs one indexed lookup.
+    """
+    from apps.scheduling.calendar_feeds import feed_is_stale, rebuild_feed
+
+    feed = CalendarFeed.objects.filter(token=token).select_related('guide__user', 'staff__user').first()
+    if feed is None:
+        raise Http404("Unknown calendar feed")
+
+    # Roll the date window forward once a day
+    if feed_is_stale(feed):
+        rebuild_feed(feed)
+
+    etag = f'"{feed.etag}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(feed.body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=900'
+    return response
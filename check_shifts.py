@@ -5,7 +5,7 @@ d = date(2026, 2, 17)
 
 try:
     schedule = DailyRestaurantSchedule.objects.get(date=d)
-    shifts = StaffShift.objects.filter(daily_schedule=schedule)
+    shifts = StaffShift.objects.for_day(schedule)
 
     print(f'Total shifts: {shifts.count()}')
 
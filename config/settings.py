@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.scheduling.changelog.ChangeActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,6 +86,78 @@ DATABASES = {
     }
 }
 
+# PostgreSQL, for several managers and the auto-scheduler working at once.
+# Requires psycopg: pip install "psycopg[binary]". Not yet run against the
+# test suite; see DEPLOYMENT.md before using it in production.
+if os.environ.get('JIAK99_DB_ENGINE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'jiak99'),
+            'USER': os.environ.get('POSTGRES_USER', 'jiak99'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 60,
+        }
+    }
+
+# SQLite tuning profile, applied to every new connection by apps.core.db.
+# 'default' keeps SQLite's stock behaviour. 'production' switches to WAL so
+# readers don't block the writer, and waits on locks instead of failing
+# immediately with "database is locked".
+DATABASE_PROFILE = os.environ.get('JIAK99_DB_PROFILE', 'default')
+
+SQLITE_PRAGMAS = {}
+if DATABASE_PROFILE == 'production' and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Start transactions with BEGIN IMMEDIATE so writers wait on busy_timeout
+    DATABASES['default']['ENGINE'] = 'apps.core.sqlite_backend'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',      # Safe with WAL; fsync at checkpoints only
+        'busy_timeout': 20000,        # Milliseconds to wait for a lock
+        'mmap_size': 268435456,       # 256 MB memory-mapped I/O
+        'cache_size': -65536,         # 64 MB page cache (negative = KiB)
+        'temp_store': 'MEMORY',
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Holds the rendered schedule grid fragments (see apps.scheduling.grid_cache).
+# Local memory is per process; with several worker processes use a shared
+# backend (e.g. Redis or Memcached) so every worker sees the same fragments.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jiak99',
+    }
+}
+
+# Seconds a cached grid fragment may live. Keys include a version stamp of
+# the day's data, so this only bounds staleness for edits the stamp can't
+# see (e.g. a guide's name changed in the admin).
+GRID_CACHE_TIMEOUT = 600
+
+# Seconds an untouched what-if scenario stays in the cache (see
+# apps.scheduling.scenarios). Needs a shared cache with several workers.
+SCENARIO_TIMEOUT = 3600
+
+# Raise LazyLoadError when scheduler code reads a foreign key that wasn't
+# select_related (see apps.scheduling.lazy_loads). Development aid only.
+SCHEDULER_LAZY_LOAD_GUARD = DEBUG
+
+# Days either side of a session searched for shift swap partners (see
+# apps.scheduling.swaps).
+SWAP_WINDOW_DAYS = 7
+
+# Undo and redo levels kept per day for bulk edits such as Clear All
+# (see apps.scheduling.undo).
+UNDO_LEVELS = 20
+
+# Code of the site (apps.core.models.Site) used when a request or command
+# doesn't pick one; created on first use.
+DEFAULT_SITE_CODE = 'main'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
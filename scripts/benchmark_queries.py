@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Benchmark the scheduler's hot query shapes and show their query plans.
+
+Seeds a scratch database with a few months of schedules, then for each
+query used by services.py, views.py and guides/views.py prints the
+EXPLAIN QUERY PLAN output and the median run time. Queries filter by site
+as the scheduler does, so the plans use the site-leading indexes. With
+--compare the scheduler indexes are dropped and everything is run again,
+so each index can be checked against the plan it replaces.
+
+Usage:
+    python scripts/benchmark_queries.py
+    python scripts/benchmark_queries.py --compare --guides 60 --days 90
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def setup_django(db_path):
+    """Point Django at a scratch database and create the schema."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def seed_data(num_guides, num_staff, days):
+    """Create guides, staff, availability and assigned schedules."""
+    from datetime import date, timedelta
+    from django.contrib.auth.models import User
+    from apps.core.models import Site
+    from apps.guides.models import Guide, GuideAvailability
+    from apps.scheduling.bulk import bulk_create_validated
+    from apps.scheduling.models import (
+        TourSession, RestaurantStaff, StaffAvailability, DailyRestaurantSchedule, StaffShift
+    )
+    from apps.scheduling.services import SchedulingService, RestaurantSchedulingService
+
+    random.seed(42)
+    site = Site.objects.get_default()
+    users = User.objects.bulk_create([
+        User(username=f'bench_user_{i}', first_name=f'User{i}') for i in range(num_guides + num_staff)
+    ])
+    guides = bulk_create_validated([
+        Guide(user=user, guide_type=random.choice(['FT', 'FT', 'PTM', 'PTA']))
+        for user in users[:num_guides]
+    ])
+    staff = bulk_create_validated([
+        RestaurantStaff(user=user, staff_type='kitchen' if i % 2 else 'serving')
+        for i, user in enumerate(users[num_guides:])
+    ])
+
+    service = SchedulingService(site)
+    restaurant_service = RestaurantSchedulingService(site)
+    service.generate_tour_time_slots()
+
+    start = date.today() + timedelta(days=1)
+    dates = [start + timedelta(days=n) for n in range(days)]
+
+    GuideAvailability.objects.bulk_create([
+        GuideAvailability(guide=guide, site_id=guide.site_id, date=d, is_available=random.random() > 0.2)
+        for guide in guides for d in dates if random.random() < 0.5
+    ])
+    StaffAvailability.objects.bulk_create([
+        StaffAvailability(staff=member, site_id=member.site_id, date=d, is_available=random.random() > 0.2)
+        for member in staff for d in dates if random.random() < 0.5
+    ])
+
+    sessions = []
+    for d in dates:
+        sessions.extend(TourSession.objects.filter(daily_schedule=service.generate_sessions_for_date(d)[1]))
+        restaurant_service.auto_schedule_day(DailyRestaurantSchedule.objects.create(site=site, date=d))
+    for session in sessions:
+        if random.random() < 0.8:
+            session.assigned_guide = random.choice(guides)
+    TourSession.objects.bulk_update(sessions, ['assigned_guide'])
+
+    return {
+        'site': site,
+        'dates': dates,
+        'guides': guides,
+        'staff': staff,
+        'shift_count': StaffShift.objects.count(),
+    }
+
+
+def hot_queries(data):
+    """The query shapes the scheduler runs most, keyed by where they come from."""
+    from datetime import timedelta
+    from apps.guides.models import GuideAvailability
+    from apps.scheduling.models import (
+        TourSession, DailySchedule, StaffShift, StaffAvailability, DailyRestaurantSchedule
+    )
+
+    site = data['site']
+    d = random.choice(data['dates'])
+    guide = random.choice(data['guides'])
+    member = random.choice(data['staff'])
+    schedule = DailySchedule.objects.get(site=site, date=d)
+    restaurant_schedule = DailyRestaurantSchedule.objects.get(site=site, date=d)
+
+    # Counts, exists() and id subqueries drop the default ordering, so the
+    # benchmarked shapes do too
+    return {
+        'services._check_break_requirement: guide sessions on a date': TourSession.objects.filter(
+            daily_schedule__site=site, daily_schedule__date=d, assigned_guide=guide
+        ),
+        'guides.views.guide_dashboard: published sessions for a guide': TourSession.objects.filter(
+            assigned_guide=guide,
+            daily_schedule__date__gte=d,
+            daily_schedule__date__lte=d + timedelta(days=30),
+            daily_schedule__is_published=True
+        ),
+        'views/api_views: unassigned sessions for a day (count)': TourSession.objects.filter(
+            daily_schedule=schedule, assigned_guide__isnull=True
+        ).order_by().values('id'),
+        'services.get_available_guides_for_session: unavailable guides': GuideAvailability.objects.filter(
+            site=site, date=d, is_available=False
+        ).order_by().values_list('guide_id', flat=True),
+        'api_views.restaurant_assign_shift: staff already on shift (exists)': StaffShift.objects.filter(
+            daily_schedule=restaurant_schedule, staff=member
+        ).order_by().values('id'),
+        'services.auto_schedule_day (restaurant): unavailable staff': StaffAvailability.objects.filter(
+            site=site, date=d, is_available=False
+        ).order_by().values_list('staff_id', flat=True),
+    }
+
+
+def drop_scheduler_indexes():
+    """
+    Drop the indexes behind the hot queries. Migrating back to before them
+    would also drop the site columns the queries filter on.
+    """
+    from django.db import connection
+    from apps.guides.models import GuideAvailability
+    from apps.scheduling.models import TourSession, StaffShift, StaffAvailability
+
+    with connection.schema_editor() as editor:
+        for model in (TourSession, GuideAvailability, StaffShift, StaffAvailability):
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+
+
+def explain(queryset):
+    from django.db import connection
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def time_query(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset._chain())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(data, repeat, label):
+    from django.db import connection
+    connection.cursor().execute('ANALYZE')
+
+    print(f"\n{'=' * 78}\n{label}\n{'=' * 78}")
+    random.seed(7)
+    for name, queryset in hot_queries(data).items():
+        print(f"\n{name}")
+        for line in explain(queryset):
+            print(f"    {line}")
+        print(f"    median: {time_query(queryset, repeat):.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guides', type=int, default=40)
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--compare', action='store_true', help='Also run without the scheduler indexes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'benchmark.sqlite3'))
+        data = seed_data(args.guides, args.staff, args.days)
+        print(f"{args.guides} guides, {args.staff} staff, {args.days} days, {data['shift_count']} shifts")
+
+        run(data, args.repeat, 'WITH scheduler indexes')
+
+        if args.compare:
+            drop_scheduler_indexes()
+            run(data, args.repeat, 'WITHOUT scheduler indexes')
+
+
+if __name__ == '__main__':
+    main()
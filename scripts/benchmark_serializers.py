@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+Benchmark the schedule API payloads against the serialisation they replaced.
+
+Seeds a scratch database (same data as benchmark_queries.py), then for each
+endpoint builds the response the old way (model instances, per-figure
+summary queries, JsonResponse) and the new way (apps.scheduling.serializers)
+and prints query count, median time and payload size for both.
+
+Usage:
+    python scripts/benchmark_serializers.py
+    python scripts/benchmark_serializers.py --guides 60 --days 90 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmark_queries import setup_django, seed_data  # noqa: E402
+
+
+# ============================================================================
+# Payloads as built before apps.scheduling.serializers
+# ============================================================================
+
+def legacy_restaurant_day(daily_schedule):
+    from django.http import JsonResponse
+    from apps.scheduling.models import StaffShift
+    from apps.scheduling.services import RestaurantSchedulingService
+
+    service = RestaurantSchedulingService()
+    shifts = StaffShift.objects.filter(daily_schedule=daily_schedule).select_related('staff__user')
+
+    # Per-figure summary queries, as get_schedule_summary() used to run them
+    assigned = shifts.filter(staff__isnull=False)
+    validation = service.validate_coverage(daily_schedule)
+    summary = {
+        'total_shifts': shifts.count(),
+        'assigned_shifts': assigned.count(),
+        'unassigned_shifts': shifts.filter(staff__isnull=True).count(),
+        'kitchen_staff': assigned.filter(staff__staff_type='kitchen').values('staff').distinct().count(),
+        'serving_staff': assigned.filter(staff__staff_type='serving').values('staff').distinct().count(),
+        'total_staff': assigned.values('staff').distinct().count(),
+        'full_day_shifts': shifts.filter(duration_hours=8).count(),
+        'half_day_shifts': shifts.filter(duration_hours=4).count(),
+        'total_hours': sum(shift.duration_hours for shift in shifts if shift.staff),
+        'coverage_valid': validation['is_valid'],
+        'coverage_gaps': len(validation['gaps']),
+    }
+    validation = service.validate_coverage(daily_schedule)
+
+    shifts_data = [{
+        'id': shift.id,
+        'staff_id': shift.staff.id if shift.staff else None,
+        'staff_name': shift.staff.user.get_full_name() if shift.staff else None,
+        'staff_type': shift.staff.staff_type if shift.staff else None,
+        'start_time': shift.start_time.strftime('%H:%M'),
+        'end_time': shift.end_time.strftime('%H:%M'),
+        'duration_hours': shift.duration_hours,
+        'is_full_day': shift.is_full_day,
+        'version': shift.version
+    } for shift in shifts]
+
+    return JsonResponse({
+        'success': True,
+        'date': daily_schedule.date.isoformat(),
+        'is_published': daily_schedule.is_published,
+        'shifts': shifts_data,
+        'summary': summary,
+        'validation': validation
+    })
+
+
+def legacy_eligible_guides(guides):
+    from django.http import JsonResponse
+
+    return JsonResponse({
+        'success': True,
+        'guides': [{
+            'id': guide.id,
+            'name': guide.user.get_full_name() or guide.user.username,
+            'type': guide.get_guide_type_display(),
+            'type_code': guide.guide_type
+        } for guide in guides]
+    })
+
+
+def legacy_range(start, end):
+    from django.http import JsonResponse
+    from apps.scheduling.services import SchedulingService
+
+    return JsonResponse({'success': True, **SchedulingService().get_range_data(start, end)})
+
+
+# ============================================================================
+# Current payloads
+# ============================================================================
+
+def current_restaurant_day(daily_schedule):
+    from apps.scheduling.serializers import json_response, restaurant_day_payload
+
+    return json_response({
+        'success': True,
+        'date': daily_schedule.date.isoformat(),
+        'is_published': daily_schedule.is_published,
+        **restaurant_day_payload(daily_schedule)
+    })
+
+
+def current_eligible_guides(guides):
+    from apps.scheduling.serializers import json_response, eligible_guides_payload
+
+    return json_response({'success': True, 'guides': eligible_guides_payload(guides)})
+
+
+def current_range(start, end):
+    from apps.scheduling.serializers import json_response
+    from apps.scheduling.services import SchedulingService
+
+    return json_response({'success': True, **SchedulingService().get_range_data(start, end)})
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def measure(build, repeat):
+    """Median milliseconds, queries per call and response size in bytes."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        response = build()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(queries.captured_queries), len(response.content)
+
+
+def cases(data):
+    from datetime import timedelta
+    from apps.guides.models import Guide
+    from apps.scheduling.models import DailyRestaurantSchedule
+
+    d = random.choice(data['dates'])
+    restaurant_schedule = DailyRestaurantSchedule.objects.get(date=d)
+    # Every active guide, as a worst case for the assignment dropdown
+    guides = Guide.objects.filter(is_active=True)
+    start = data['dates'][0]
+    end = start + timedelta(days=30)
+
+    return {
+        'restaurant_schedule_data (one day)': (
+            lambda: legacy_restaurant_day(restaurant_schedule),
+            lambda: current_restaurant_day(restaurant_schedule),
+        ),
+        'get_eligible_guides (all active guides)': (
+            lambda: legacy_eligible_guides(guides.all()),
+            lambda: current_eligible_guides(guides.all()),
+        ),
+        'schedule_range (31 days, encoding only)': (
+            lambda: legacy_range(start, end),
+            lambda: current_range(start, end),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guides', type=int, default=40)
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--days', type=int, default=35)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'benchmark.sqlite3'))
+        data = seed_data(args.guides, args.staff, args.days)
+
+        from apps.scheduling import serializers
+        encoder = 'orjson' if serializers.orjson is not None else 'json (compact)'
+        print(f"{args.guides} guides, {args.staff} staff, {args.days} days, encoder: {encoder}")
+
+        random.seed(7)
+        for name, (legacy, current) in cases(data).items():
+            print(f"\n{name}")
+            for label, build in (('before', legacy), ('after', current)):
+                ms, queries, size = measure(build, args.repeat)
+                print(f"    {label:<7} {ms:8.2f} ms  {queries:4d} queries  {size:8d} bytes")
+
+
+if __name__ == '__main__':
+    main()
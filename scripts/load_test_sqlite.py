@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Load test for SQLite read/write concurrency under each database profile.
+
+Runs concurrent readers (schedule page queries) and writers (guide
+assignments inside long transactions, like the auto-scheduler) against a
+throwaway copy of the schema, once with the stock SQLite settings and once
+with the production pragmas from config/settings.py.
+
+Usage:
+    python scripts/load_test_sqlite.py                # compare both profiles
+    python scripts/load_test_sqlite.py --seconds 10 --readers 8 --writers 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def setup_django(db_path):
+    """Point Django at a scratch database and create the schema."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def seed_data(days):
+    """Create guides, time slots and a run of daily schedules."""
+    from datetime import date, timedelta
+    from django.contrib.auth.models import User
+    from apps.guides.models import Guide
+    from apps.scheduling.services import SchedulingService
+
+    guide_types = ['FT', 'FT', 'FT', 'FT', 'PTM', 'PTM', 'PTA', 'PTA']
+    for i, guide_type in enumerate(guide_types):
+        user = User.objects.create(username=f'load_guide_{i}', first_name=f'Guide{i}')
+        Guide.objects.create(user=user, guide_type=guide_type)
+
+    service = SchedulingService()
+    service.generate_tour_time_slots()
+    start = date.today() + timedelta(days=30)
+    return [service.generate_sessions_for_date(start + timedelta(days=n))[1] for n in range(days)]
+
+
+def run_profile(args):
+    """Worker process: run the load against one profile and print a summary line."""
+    import random
+    from django.db import connection, transaction, OperationalError
+    from apps.guides.models import Guide
+    from apps.scheduling.models import TourSession
+
+    schedules = seed_data(args.days)
+    guide_ids = list(Guide.objects.values_list('id', flat=True))
+    schedule_ids = [s.id for s in schedules]
+    journal_mode = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+
+    stats = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def count(key):
+        with lock:
+            stats[key] += 1
+
+    def reader():
+        while time.monotonic() < deadline:
+            try:
+                schedule_id = random.choice(schedule_ids)
+                list(TourSession.objects.filter(
+                    daily_schedule_id=schedule_id
+                ).select_related('time_slot', 'assigned_guide__user'))
+                TourSession.objects.filter(
+                    daily_schedule_id=schedule_id, assigned_guide__isnull=True
+                ).count()
+                count('reads')
+            except OperationalError:
+                count('read_errors')
+        connection.close()
+
+    def writer():
+        while time.monotonic() < deadline:
+            try:
+                with transaction.atomic():
+                    schedule_id = random.choice(schedule_ids)
+                    for session in TourSession.objects.filter(daily_schedule_id=schedule_id):
+                        session.assigned_guide_id = random.choice(guide_ids)
+                        session.save(update_fields=['assigned_guide', 'version'])
+                    # Hold the write lock like a long scheduler transaction
+                    time.sleep(args.hold_ms / 1000)
+                count('writes')
+            except OperationalError:
+                count('write_errors')
+        connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(
+        f"{os.environ.get('JIAK99_DB_PROFILE', 'default'):<12}"
+        f"{journal_mode:<10}"
+        f"{stats['reads'] / args.seconds:>10.0f}"
+        f"{stats['writes'] / args.seconds:>10.1f}"
+        f"{stats['read_errors']:>12}"
+        f"{stats['write_errors']:>13}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--hold-ms', type=int, default=50, help='Time each write transaction holds its lock')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with tempfile.TemporaryDirectory() as tmp:
+            setup_django(os.path.join(tmp, 'load_test.sqlite3'))
+            run_profile(args)
+        return
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s per profile\n")
+    print(f"{'Profile':<12}{'Journal':<10}{'Reads/s':>10}{'Writes/s':>10}{'Read errs':>12}{'Write errs':>13}")
+    print('-' * 67)
+    for profile in ('default', 'production'):
+        env = dict(os.environ, JIAK99_DB_PROFILE=profile)
+        subprocess.run([sys.executable, __file__, '--worker'] + sys.argv[1:], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()